@@ -0,0 +1,101 @@
+"""
+Compare running times of executors on the data of classifier test
+
+Usage: python3 scripts/benchmark_executors.py [--n_processes 4] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.executors import EXECUTORS
+from src.core.preprocessors import KBinsDiscretizer
+from src.core.classification.classifiers import SVC
+from src.core.classification.classification import ExhaustiveClassification
+from src.core.base import ExecutionOptions
+
+
+def get_test_data(n_samples=100, n_features=10):
+    # Same as in test/main/test_classifier.py
+    random.seed(0)
+    data = pd.DataFrame.from_dict({
+        f'feature_{feature_index}': [random.random() for _ in range(n_samples)]
+        for feature_index in range(n_features)
+    })
+    ann = pd.DataFrame.from_dict({
+        'Class': [random.randint(0, 1) for _ in range(n_samples)],
+        'Dataset': 'Testing',
+        'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(n_samples)],
+    })
+
+    return data, ann
+
+
+def run(data, ann, output_dir, n_k, executor, n_processes):
+    model = ExhaustiveClassification(
+        df=data,
+        ann=ann,
+        n_k=n_k,
+        output_dir=output_dir,
+        feature_pre_selector=None,
+        feature_pre_selector_kwargs={},
+        feature_selector=feature_selectors.t_test,
+        feature_selector_kwargs={},
+        preprocessor=KBinsDiscretizer,
+        preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+        model=SVC,
+        model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+        model_cv_ranges={'C': [0.00390625, 0.015625, 0.0625, 0.25, 1.0, 4.0, 16.0, 64.0, 256.0]},
+        model_cv_folds=5,
+        scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+        main_scoring_function='min_TPR_TNR',
+        main_scoring_threshold=0.3,
+        n_processes=n_processes,
+        execution=ExecutionOptions(executor=executor),
+        random_state=0,
+        verbose=False,
+    )
+
+    start_time = time.time()
+    res = model.exhaustive_run()
+
+    return res, time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare running times of executors')
+    parser.add_argument('--n_processes', type=int, default=os.cpu_count())
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    data, ann = get_test_data()
+    n_k = pd.DataFrame([{'n': 5, 'k': 2}, {'n': 10, 'k': 3}, {'n': 10, 'k': 9}])
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        reference, _ = run(data, ann, output_dir, n_k, 'serial', 1)
+
+        rows = []
+        for executor in EXECUTORS:
+            times = []
+            for _ in range(args.repeats):
+                res, spent_time = run(data, ann, output_dir, n_k, executor, args.n_processes)
+                if not res.equals(reference):
+                    raise AssertionError(f'Results of {executor} executor differ from serial run')
+                times.append(spent_time)
+
+            rows.append({'executor': executor, 'min_time': min(times), 'mean_time': sum(times) / len(times)})
+
+    print(f'n_processes = {args.n_processes}, {len(reference)} models, results are identical')
+    print(pd.DataFrame(rows).set_index('executor').round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,8 @@ setuptools.setup(
     install_requires=[
         'scipy',
         'scikit-learn',
+        'joblib>=1.3',
+        'threadpoolctl>=2.0',
         'numpy',
         'pandas',
         'lifelines',
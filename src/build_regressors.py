@@ -1,15 +1,29 @@
 from .utils import *
 
 
-def main(config_path):
+def main(config_path, shard=None, coordinator=None):
     # Load config and input data
     config, df, ann, n_k = load_config_and_input_data(config_path)
+    if shard is not None:
+        config["shard"] = shard
 
     output_dir = config["output_dir"]
 
     # Build regressors
     model = initialize_regression_model(config, df, ann, n_k)
-    res = model.exhaustive_run()
+    if coordinator is not None:
+        # Distribute feature subsets between connected workers
+        model.coordinator = coordinator
+        coordinator.start(model)
+    try:
+        res = model.exhaustive_run()
+    finally:
+        if coordinator is not None:
+            coordinator.close()
+
+    # Global summary is made by merge_shards.py
+    if config.get("shard"):
+        return res
 
     # Summary table #2: for each feature calculate
     # percentage of reliable regressors which use it
@@ -0,0 +1,14 @@
+from .utils import *
+
+
+def main(data_path, annotation_path, output_dir, dtype):
+    # Write binary store with data and annotation
+    data_store.write_data_store(data_path, output_dir, annotation_path=annotation_path, dtype=dtype)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Please specify data file, annotation file and output directory", file=sys.stderr)
+        sys.exit(1)
+
+    main(sys.argv[1], sys.argv[2], sys.argv[3], "float64")
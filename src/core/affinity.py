@@ -0,0 +1,198 @@
+"""
+Pinning of worker processes to CPU cores and NUMA nodes (Linux)
+
+Each worker takes a slot (NUMA node and set of cores) from a shared
+queue in the pool initializer and pins itself with sched_setaffinity.
+Optionally, the first worker of each node copies the binary data store
+to a node-local file (first touch allocates its pages on the node),
+which is then memory-mapped by all workers of the node.
+"""
+
+import os
+import glob
+import time
+import threading
+
+import numpy as np
+
+from src.core import data_store
+from src.core.utils import get_available_cores
+
+# Slot of the current worker (node and cores)
+WORKER = threading.local()
+
+# Maximal time (in seconds) a worker waits for a replica copied by
+# another worker of its node before it falls back to the shared store
+REPLICA_TIMEOUT = 600
+
+
+def parse_cpulist(cpulist):
+    """Parse Linux cpulist string (e.g. 0-3,8-11) to list of cores."""
+    cores = []
+    for part in cpulist.strip().split(','):
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        cores.extend(range(int(start), int(end or start) + 1))
+
+    return cores
+
+
+def get_numa_nodes():
+    """Available cores grouped by NUMA node (or by socket if NUMA
+    topology is not exposed).
+
+    Returns
+    -------
+    list
+        List of lists of cores, one per node.
+    """
+    available = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else set(range(get_available_cores()))
+
+    nodes = {}
+    for path in glob.glob('/sys/devices/system/node/node[0-9]*/cpulist'):
+        node = int(os.path.basename(os.path.dirname(path))[len('node'):])
+        with open(path, 'r') as f:
+            nodes[node] = parse_cpulist(f.read())
+
+    if not nodes:
+        for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/topology/physical_package_id'):
+            core = int(os.path.basename(os.path.dirname(os.path.dirname(path)))[len('cpu'):])
+            with open(path, 'r') as f:
+                nodes.setdefault(int(f.read()), []).append(core)
+
+    nodes = [sorted(set(nodes[node]) & available) for node in sorted(nodes)]
+    nodes = [cores for cores in nodes if cores]
+
+    return nodes or [sorted(available)]
+
+
+def get_worker_slots(n_workers, n_threads, policy='spread'):
+    """Assign NUMA node and cores to each worker
+
+    Parameters
+    ----------
+    n_workers : int
+        Number of workers.
+    n_threads : int
+        Number of cores per worker.
+    policy : str
+        "spread": workers are placed on nodes in round-robin order,
+        "compact": nodes are filled one by one.
+
+    Returns
+    -------
+    list
+        List of pairs (node index, list of cores).
+    """
+    if policy not in ['spread', 'compact']:
+        raise ValueError(f'Unknown CPU affinity policy {policy}, available: spread, compact')
+
+    nodes = get_numa_nodes()
+    if policy == 'spread':
+        node_indices = [i % len(nodes) for i in range(n_workers)]
+    else:
+        capacity = [max(1, len(cores) // n_threads) for cores in nodes]
+        node_indices = [
+            node for node, n_slots in enumerate(capacity) for _ in range(n_slots)
+        ][:n_workers]
+        node_indices += [i % len(nodes) for i in range(n_workers - len(node_indices))]
+
+    slots = []
+    used = [0] * len(nodes)
+    for node in node_indices:
+        cores = nodes[node]
+        slots.append((node, [cores[(used[node] + j) % len(cores)] for j in range(min(n_threads, len(cores)))]))
+        used[node] += n_threads
+
+    return slots
+
+
+def pin_worker(slots, store_dir=None, replica_dir=None):
+    """Pool initializer: take a slot from the queue and pin the worker
+    process (or thread) to its cores. If store_dir and replica_dir are given,
+    node-local replica of the data store is used by the worker.
+    """
+    node, cores = slots.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    WORKER.node, WORKER.cores = node, cores
+
+    if store_dir and replica_dir:
+        data_store.REPLICAS[store_dir] = make_replica(store_dir, replica_dir, node)
+
+
+def make_replica(store_dir, replica_dir, node, timeout=REPLICA_TIMEOUT):
+    """Copy data matrix of the store to replica_dir once per node
+    (by the first worker of the node) and return its path.
+
+    Other workers of the node wait for the copy; if it is not ready
+    within timeout seconds, or the copying worker died or failed,
+    path to the data matrix of the shared store is returned.
+    """
+    path = os.path.join(replica_dir, f'node_{node}.npy')
+    shared_path = os.path.join(store_dir, data_store.DATA_FILE)
+    try:
+        lock = os.open(path + '.lock', os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        # Another worker of the node is copying the data
+        return wait_for_replica(path, shared_path, timeout)
+
+    try:
+        os.write(lock, str(os.getpid()).encode())
+        os.close(lock)
+
+        source = np.load(shared_path, mmap_mode='r')
+        replica = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=source.dtype, shape=source.shape)
+        replica[:] = source
+        replica.flush()
+        del replica
+        os.replace(path + '.tmp', path)
+    except Exception:
+        # Waiting workers see the removed lock and use the shared store
+        for file_path in [path + '.tmp', path + '.lock']:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return shared_path
+
+    return path
+
+
+def wait_for_replica(path, shared_path, timeout):
+    """Wait for a replica copied by another worker (see make_replica)."""
+    start_time = time.time()
+    while not os.path.isfile(path):
+        try:
+            with open(path + '.lock', 'r') as f:
+                pid = f.read()
+        except FileNotFoundError:
+            # Copying failed
+            return shared_path
+
+        if pid and not is_process_alive(int(pid)) and not os.path.isfile(path):
+            return shared_path
+        if time.time() - start_time > timeout:
+            return shared_path
+        time.sleep(0.05)
+
+    return path
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def get_worker_info():
+    """Id (process or thread), node and cores of the current worker."""
+    return {
+        'worker': threading.get_native_id(),
+        'node': getattr(WORKER, 'node', None),
+        'cores': ' '.join(map(str, getattr(WORKER, 'cores', []))),
+    }
@@ -2,4 +2,8 @@ from .feature_pre_selector import FeaturePreSelector
 from .feature_selector import FeatureSelector
 from .preprocessor import Preprocessor
 from .model import Model
+from .search import SearchOptions, Search
+from .pruning import PruningOptions, Pruning
+from .time_budget import TimeBudgetOptions, TimeBudget
+from .execution import ExecutionOptions, Execution
 from .base import ExhaustiveBase
@@ -1,22 +1,49 @@
+import numpy as np
 import pandas as pd
 import random
 
-from multiprocessing import Pool
 import time
 import math
 import itertools
 
-from scipy.special import binom
+from sklearn.model_selection import ParameterGrid
 
-from src.core.regression.accuracy_scores import \
-    hazard_ratio, \
-    dynamic_auc, \
-    logrank
-from src.core.utils import seconds_to_hours
+from src.core.utils import seconds_to_hours, cast_data, get_available_cores, unrank_combination
+from src.core.cache import EvaluationCache, get_cache_key
+from src.core.data_store import read_data_store
+from src.core.affinity import get_worker_info
 from .feature_pre_selector import FeaturePreSelector
 from .feature_selector import FeatureSelector
 from .preprocessor import Preprocessor
-from .model import Model
+from .model import Model, CVEarlyStopped, THREAD_PARAMS
+from .search import SearchOptions, Search
+from .pruning import PruningOptions, Pruning
+from .time_budget import TimeBudgetOptions, TimeBudget
+from .execution import ExecutionOptions, Execution
+
+# How columns of summary_n_k table are combined when shard tables
+# are merged (see merge_shards.py): counts over shard slices are summed up,
+# counts over all feature subsets are the same in every shard, and
+# coverage is averaged since shards are (almost) equal slices.
+# percentage_reliable is recomputed from the merged counts.
+SUMMARY_N_K_AGGREGATIONS = {
+    'num_training_reliable': 'sum',
+    'num_validation_reliable': 'sum',
+    'percentage_reliable': 'first',
+    'num_distinct_features': 'first',
+    'num_evaluated_subsets': 'sum',
+    'num_subsets': 'sum',
+    'num_correlation_clusters': 'first',
+    'num_pruned_subsets': 'first',
+    'num_stage_1_subsets': 'sum',
+    'num_stage_2_subsets': 'sum',
+    'num_beam_subsets': 'sum',
+    'num_cv_fits': 'sum',
+    'num_cv_fits_saved': 'sum',
+    'num_cv_stopped_subsets': 'sum',
+    'num_seeded_subsets': 'sum',
+    'coverage': 'mean',
+}
 
 
 class ExhaustiveBase(
@@ -24,6 +51,10 @@ class ExhaustiveBase(
     FeatureSelector,
     Preprocessor,
     Model,
+    Search,
+    Pruning,
+    TimeBudget,
+    Execution,
 ):
     y_features = None
 
@@ -39,6 +70,8 @@ class ExhaustiveBase(
             limit_feature_subsets=False, n_feature_subsets=None,
             shuffle_feature_subsets=True,
             n_processes=1, random_state=None, verbose=True,
+            cache_dir=None, dtype=None, dtype_rtol=1e-5,
+            search=None, pruning=None, time_budget=None, execution=None,
     ):
         """Class constructor
 
@@ -90,7 +123,9 @@ class ExhaustiveBase(
          n_feature_subsets : int
              Number of processed feature subsets.
          shuffle_feature_subsets : bool
-             If true, processed feature subsets are selected randomly.
+             If true, processed feature subsets are selected randomly
+             (without repetitions, seeded by random_state), otherwise the
+             first ones in the order of enumeration are processed.
          max_n : int
              Maximal number of selected features.
          max_estimated_time : float
@@ -108,33 +143,78 @@ class ExhaustiveBase(
              A number defining threshold for model filtering:
              models with score below this threshold on
              training/filtration sets will not be further evaluated.
-         n_processes : int
-             Number of processes.
+         n_processes : int or str
+             Number of processes (or threads, see executor). If "auto",
+             number of processes and chunks per process are chosen by
+             a microbenchmark at the start of the run (see
+             choose_n_processes).
          random_state : int
              Random seed (set to an arbitrary integer for reproducibility).
          verbose : bool
              If True, print running time for each pair of n, k.
+         cache_dir : str
+             Path to directory for caching feature pre-selection and
+             selection results across runs (None disables caching).
+             Subsets evaluated by running time estimator are also cached
+             there and are not refit by the pipeline (see EvaluationCache).
+         dtype : str
+             Data type of features matrix and preprocessed data
+             (e.g. float32 to halve memory usage). By default (None),
+             data is used as is.
+         dtype_rtol : float
+             Maximal error of data casting to dtype relative to
+             maximal absolute value of each feature.
+         search : SearchOptions
+             Search strategy: exhaustive or beam search, successive
+             halving and cross-validation early stopping (see search.py).
+         pruning : PruningOptions
+             Pruning of the search space: collapsing of duplicate
+             features and correlated features (see pruning.py).
+         time_budget : TimeBudgetOptions
+             Time limit of the whole run (see time_budget.py).
+         execution : ExecutionOptions
+             Execution backend: executor, threads per process,
+             CPU affinity and sharding (see execution.py).
          """
+        search = search or SearchOptions()
+        pruning = pruning or PruningOptions()
+        time_budget = time_budget or TimeBudgetOptions()
+        execution = execution or ExecutionOptions()
+        if execution.shard is not None and search.mode == 'beam':
+            raise ValueError('Sharding is not supported in beam search mode')
+
+        if dtype:
+            df = self.cast_data(
+                df, dtype, dtype_rtol, verbose,
+                get_available_cores() if n_processes == 'auto' else n_processes,
+            )
 
         FeaturePreSelector.__init__(
             self,
             df, ann,
             preselector_function=feature_pre_selector, kwargs=feature_pre_selector_kwargs,
+            cache_dir=cache_dir,
         )
         Preprocessor.__init__(
             self,
-            preprocessor_model=preprocessor, kwargs=preprocessor_kwargs,
+            preprocessor_model=preprocessor, kwargs=preprocessor_kwargs, dtype=dtype,
         )
         FeatureSelector.__init__(
             self,
             self.df, self.ann,
             output_dir,
             selector_function=feature_selector, kwargs=feature_selector_kwargs,
+            cache_dir=cache_dir,
         )
         Model.__init__(
             self,
             model=model, kwargs=model_kwargs, random_state=random_state,
+            cv_early_stopping=search.cv_early_stopping,
         )
+        Search.__init__(self, search)
+        Pruning.__init__(self, pruning)
+        TimeBudget.__init__(self, time_budget)
+        Execution.__init__(self, execution)
 
         self.model_cv_ranges = model_cv_ranges
         self.model_cv_folds = model_cv_folds
@@ -142,7 +222,10 @@ class ExhaustiveBase(
         self.n_k = n_k
         self.output_dir = output_dir
 
+        if n_processes != 'auto' and (not isinstance(n_processes, int) or n_processes < 1):
+            raise ValueError(f'Invalid n_processes {n_processes}')
         self.n_processes = n_processes
+
         self.random_state = random_state
         self.verbose = verbose
 
@@ -154,8 +237,79 @@ class ExhaustiveBase(
         self.main_scoring_function = main_scoring_function
         self.main_scoring_threshold = main_scoring_threshold
 
+        self.cache_dir = cache_dir
+        self.dtype_rtol = dtype_rtol
+        # Evaluations of running time estimator (loaded on first use)
+        self._evaluations = None
+
+        # Additional columns of summary_n_k table for each (n, k) pair
+        self.n_k_stats = {}
+
         self.datasets_ids = self.ann[['Dataset', 'Dataset type']].drop_duplicates().to_numpy()
 
+    @staticmethod
+    def cast_data(df, dtype, rtol, verbose=True, n_processes=1):
+        """Cast data matrix once and report saved memory."""
+        nbytes = df.memory_usage(index=False).sum()
+        df = cast_data(df, dtype, rtol)
+
+        if verbose:
+            saved = (nbytes - df.memory_usage(index=False).sum()) / 2 ** 20
+            print(
+                f'Data matrix cast to {dtype}: {saved:.1f} MB saved per worker '
+                f'({saved * n_processes:.1f} MB for n_processes = {n_processes})'
+            )
+
+        return df
+
+    def __getstate__(self):
+        # Send path to the binary store instead of the data itself,
+        # so worker processes share memory-mapped pages
+        state = self.__dict__.copy()
+        state['coordinator'] = None
+        state['_evaluations'] = None
+        data_store = self.df.attrs.get('data_store')
+        if data_store:
+            state['df'] = (data_store, self.df.columns.to_list())
+        elif self.coordinator is not None:
+            # Workers of coordinator load data themselves (see attach_worker_data)
+            state['df'] = (None, self.df.columns.to_list())
+        if self.coordinator is not None:
+            state['ann'] = self.ann.index
+
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state.get('df'), tuple) and state['df'][0]:
+            data_store, columns = state['df']
+            df = read_data_store(data_store)
+            state['df'] = df if columns == df.columns.to_list() else df[columns]
+        self.__dict__.update(state)
+
+    def attach_worker_data(self, load_data):
+        """Replace data which is not sent by coordinator of a distributed
+        run (see __getstate__) by data loaded on the worker.
+
+        Parameters
+        ----------
+        load_data : callable
+            Function of a list of features returning data and
+            annotation of the same config as of coordinator.
+        """
+        if not isinstance(self.df, tuple) and not isinstance(self.ann, pd.Index):
+            return
+        if load_data is None:
+            raise ValueError('Data is not sent to workers, start them with the config of coordinator')
+
+        columns = self.df[1] if isinstance(self.df, tuple) else self.df.columns.to_list()
+        df, ann = load_data(columns)
+        if isinstance(self.ann, pd.Index):
+            # Samples of coordinator in its order
+            self.ann = ann.loc[self.ann]
+        if isinstance(self.df, tuple):
+            df = df[columns]
+            self.df = cast_data(df, self.dtype, self.dtype_rtol) if self.dtype else df
+
     def exhaustive_run(self):
         """Run the pipeline for classifier construction
         using exhaustive feature selection.
@@ -166,7 +320,23 @@ class ExhaustiveBase(
             DataFrame with constructed classifiers and their
             quality scores.
         """
-        self.df = self.df[self.pre_selected_features]
+        if self.time_budget_hours is not None:
+            # Benchmarks below are counted to the budget
+            self._deadline = time.time() + self.time_budget_hours * 3600
+
+        # Avoid copying (e.g. memory-mapped) data if nothing is filtered out
+        if self.pre_selected_features != self.df.columns.to_list():
+            self.df = self.df[self.pre_selected_features]
+
+        auto_n_processes = self.n_processes == 'auto'
+        if self.threads_per_process == 'auto':
+            self.choose_thread_budget()
+        if auto_n_processes:
+            self.choose_n_processes()
+
+        if self.time_budget_hours is not None:
+            self.start_time_budget()
+        self.start_search()
 
         # Iterate over n, k pairs
         all_result_dfs = []
@@ -193,7 +363,7 @@ class ExhaustiveBase(
             res.index.name = 'features'
             res['n'] = res['n'].astype(int)
             res['k'] = res['k'].astype(int)
-            res.to_csv('{}/models.csv'.format(self.output_dir))
+            res.to_csv(self.get_output_path('models'))
 
             # Summary table #1: number of models which passed
             # scoring threshold on training + filtration sets,
@@ -218,39 +388,172 @@ class ExhaustiveBase(
                 'n': n, 'k': k,
                 'num_training_reliable': tf_num,
                 'num_validation_reliable': all_num,
-                'percentage_reliable': all_num / tf_num * 100 if tf_num != 0 else 0
+                'percentage_reliable': all_num / tf_num * 100 if tf_num != 0 else 0,
+                **self.n_k_stats.get((n, k), {}),
             }, ignore_index=True)
 
             summary_n_k['n'] = summary_n_k['n'].astype(int)
             summary_n_k['k'] = summary_n_k['k'].astype(int)
             summary_n_k['num_training_reliable'] = summary_n_k['num_training_reliable'].astype(int)
             summary_n_k['num_validation_reliable'] = summary_n_k['num_validation_reliable'].astype(int)
-            summary_n_k.to_csv('{}/summary_n_k.csv'.format(self.output_dir), index=None)
+            summary_n_k.to_csv(self.get_output_path('summary_n_k'), index=None)
 
         return res
 
+    def get_output_path(self, name):
+        """Path to output csv table (shard-tagged if sharding is used)."""
+        if self.shard is None:
+            return '{}/{}.csv'.format(self.output_dir, name)
+
+        return '{}/{}_shard_{}_of_{}.csv'.format(self.output_dir, name, *self.shard)
+
     def get_feature_subsets(self, n, k):
         # Do feature selection
         features = self.select_features(n)
 
+        if self.collapse_duplicate_features:
+            # Enumerate subsets of distinct features only
+            self.duplicate_features = self.get_duplicate_features(features)
+            features = list(self.duplicate_features)
+
+        if self.search_mode == 'beam':
+            return self.get_beam_feature_subsets(features, n, k)
+
+        if self.correlation_threshold is not None:
+            return self.get_pruned_feature_subsets(features, n, k)
+
         if self.limit_feature_subsets:
-            # Generate random subsets, fix for large C_{n}^{k}
-            feature_subsets = [random.sample(features, k) for _ in range(self.n_feature_subsets)]
+            feature_subsets = self.sample_feature_subsets(features, n, k)
         else:
             # Split feature subsets to chunks for multiprocessing
             feature_subsets = list(itertools.combinations(features, k))
 
         return feature_subsets
 
-    def get_process_args(self, feature_subsets):
-        chunk_size = math.ceil(len(feature_subsets) / self.n_processes)
-        process_args = []
-        for i in range(self.n_processes):
-            start = chunk_size * i
-            end = chunk_size * (i + 1) if i < self.n_processes - 1 else len(feature_subsets)
-            process_args.append(feature_subsets[start:end])
+    def get_random_generator(self, n, k):
+        """Random generator of (n, k) pair seeded with random_state."""
+        return random.Random(None if self.random_state is None else f'{self.random_state};{n};{k}')
+
+    def sample_feature_subsets(self, features, n, k):
+        """Choose n_feature_subsets of k-subsets of features by their
+        ranks in the order of enumeration (itertools.combinations).
+
+        Ranks are sampled without replacement (so there are no duplicate
+        subsets) by a generator seeded with random_state, n and k (so
+        subsets do not depend on other (n, k) pairs or on n_processes),
+        or the first ones are taken if shuffle_feature_subsets is false.
+        Subsets are returned in the order of ranks, features of each
+        subset in the order of features.
 
-        return process_args
+        Returns
+        -------
+        list
+            List of tuples of features.
+        """
+        return [
+            tuple(features[i] for i in unrank_combination(rank, len(features), k))
+            for rank in self.sample_ranks(math.comb(len(features), k), n, k)
+        ]
+
+    def sample_ranks(self, n_subsets, n, k):
+        """Sorted ranks of n_feature_subsets of n_subsets feature subsets
+        (see sample_feature_subsets), each subset is equally likely.
+        """
+        n_sampled = min(self.n_feature_subsets, n_subsets)
+
+        if not self.shuffle_feature_subsets:
+            return range(n_sampled)
+
+        rng = self.get_random_generator(n, k)
+        if 2 * n_sampled > n_subsets:
+            return sorted(rng.sample(range(n_subsets), n_sampled))
+
+        # Rejection sampling, C(n, k) may be too large for random.sample
+        ranks = set()
+        while len(ranks) < n_sampled:
+            ranks.add(rng.randrange(n_subsets))
+
+        return sorted(ranks)
+
+    def get_evaluation_cache(self):
+        """Cache of evaluated feature subsets (None if cache_dir is not set).
+
+        Cache key covers everything results of a single subset depend on:
+        data, annotation, preprocessor, model and its parameters (except
+        number of threads), cross-validation and scoring settings.
+        """
+        if not self.cache_dir:
+            return None
+
+        df = self.df
+        if self.pre_selected_features != df.columns.to_list():
+            df = df[self.pre_selected_features]
+
+        model_kwargs = {
+            key: value for key, value in self.get_model_kwargs(self.scoring_functions).items()
+            if key not in THREAD_PARAMS
+        }
+        key = get_cache_key(df, self.ann, self.model, {
+            'model_kwargs': model_kwargs,
+            'preprocessor': repr(self.preprocessor),
+            'dtype': self.dtype,
+            'model_cv_ranges': self.model_cv_ranges,
+            'model_cv_folds': self.model_cv_folds,
+            'cv_early_stopping': self.cv_early_stopping,
+            'scoring_functions': {
+                name: '{}.{}'.format(function.__module__, function.__qualname__)
+                for name, function in self.scoring_functions.items()
+            },
+            'main_scoring_function': self.main_scoring_function,
+            'main_scoring_threshold': self.main_scoring_threshold,
+            'random_state': self.random_state,
+        })
+
+        return EvaluationCache(self.cache_dir, key)
+
+    def save_evaluations(self, df_evaluations):
+        """Add evaluations of feature subsets (see time_feature_subsets) to the cache."""
+        evaluation_cache = self.get_evaluation_cache()
+        if evaluation_cache is not None:
+            evaluation_cache.update(df_evaluations)
+
+    def seed_feature_subsets(self, feature_subsets, n, k):
+        """Split off feature subsets already evaluated by running
+        time estimator (not used in beam search mode, which needs
+        ranking scores of all evaluated subsets).
+
+        Returns
+        -------
+        list, pandas.DataFrame
+            Feature subsets which should be evaluated and cached
+            results of seeded subsets which passed filtration
+            (None if there is no cache).
+        """
+        if self.search_mode == 'beam':
+            return feature_subsets, None
+
+        if self._evaluations is None:
+            evaluation_cache = self.get_evaluation_cache()
+            self._evaluations = evaluation_cache.get() if evaluation_cache else None
+            if self._evaluations is None:
+                self._evaluations = pd.DataFrame(columns=['Filtration passed'])
+
+        if self._evaluations.empty:
+            return feature_subsets, None
+
+        is_seeded = [';'.join(features_subset) in self._evaluations.index for features_subset in feature_subsets]
+        seeded = {';'.join(features_subset) for features_subset, s in zip(feature_subsets, is_seeded) if s}
+
+        df_seeded = self._evaluations.loc[[
+            index for index in self._evaluations.index[self._evaluations['Filtration passed']] if index in seeded
+        ]]
+        df_seeded = df_seeded.drop(columns='Filtration passed').astype(object)
+
+        self.n_k_stats.setdefault((n, k), {})['num_seeded_subsets'] = sum(is_seeded)
+        if self.verbose and seeded:
+            print(f'{sum(is_seeded)} of {len(feature_subsets)} subsets for n={n}, k={k} seeded from cache')
+
+        return [features_subset for features_subset, s in zip(feature_subsets, is_seeded) if not s], df_seeded
 
     def exhaustive_run_n_k(self, n, k):
         """Run the pipeline for classifier construction
@@ -272,24 +575,47 @@ class ExhaustiveBase(
             quality scores, spent time in hours.
         """
 
-        feature_subsets = self.get_feature_subsets(n, k)
+        feature_subsets = self.get_shard(self.get_feature_subsets(n, k))
 
-        if self.n_processes > 1:
-            # Run exhaustive search in multiple processes
-            process_args = self.get_process_args(feature_subsets)
+        if self.halving_fraction is not None or self.halving_margin is not None:
+            feature_subsets = self.promote_feature_subsets(feature_subsets, n, k)
 
-            with Pool(self.n_processes) as p:
-                process_results = p.map(self.exhaustive_run_over_chunk,
-                                        process_args,
-                                        chunksize=1)
+        all_feature_subsets = feature_subsets
+        feature_subsets, df_seeded = self.seed_feature_subsets(feature_subsets, n, k)
+
+        if self.time_budget_hours is not None:
+            process_results, spent_time = self.run_with_time_budget(feature_subsets, n, k)
         else:
-            process_results = [self.exhaustive_run_over_chunk(feature_subsets)]
+            process_results = self.map_over_chunks(self.exhaustive_run_over_chunk, feature_subsets)
+            spent_time = None
 
         # Unpack processes results
-        df_results, spent_times = zip(*process_results)
+        df_results, spent_times, chunk_stats = zip(*process_results)
+
+        if self.search_mode == 'beam':
+            self.search_scores[(n, k)] = dict(itertools.chain.from_iterable(
+                stats['search_scores'].items() for stats in chunk_stats
+            ))
+            self.n_k_stats.setdefault((n, k), {})['num_beam_subsets'] = len(feature_subsets)
+            self.save_search_scores(n, k)
+
+        if self.cv_early_stopping:
+            cv_stats = {key: sum(stats['cv_stats'][key] for stats in chunk_stats) for key in self.cv_stats}
+            self.n_k_stats.setdefault((n, k), {}).update(cv_stats)
+            if self.verbose:
+                print(
+                    f'Cross-validation early stopping for n={n}, k={k}: {cv_stats["num_cv_fits_saved"]} of '
+                    f'{cv_stats["num_cv_fits"] + cv_stats["num_cv_fits_saved"]} fits saved, '
+                    f'{cv_stats["num_cv_stopped_subsets"]} subsets stopped'
+                )
+
+        if self.cpu_affinity:
+            self.save_worker_stats(n, k, spent_times, chunk_stats)
 
         # Spent time of exhaustive search is max spent time of all processes
-        spent_time = max(spent_times)
+        # (or time of all rounds in time-budgeted mode)
+        if spent_time is None:
+            spent_time = max(spent_times)
 
         if self.verbose:
             main_info = f'Pipeline iteration finished in {spent_time} seconds for n={n}, k={k}'
@@ -302,8 +628,33 @@ class ExhaustiveBase(
         # Merge results
         df_n_k_results = pd.concat(df_results, axis=0)
 
-        if self.limit_feature_subsets and self.shuffle_feature_subsets:
-            df_n_k_results.sort_index()
+        if (df_seeded is not None and len(df_seeded)) or self.time_budget_hours is not None:
+            # Keep the order of results as if all subsets were evaluated
+            order = {}
+            for i, features_subset in enumerate(all_feature_subsets):
+                order.setdefault(';'.join(features_subset), i)
+            df_n_k_results = pd.concat([df_n_k_results, df_seeded], axis=0)
+            df_n_k_results = df_n_k_results.iloc[np.argsort(
+                df_n_k_results.index.map(order).to_numpy(), kind='stable',
+            )]
+
+        if self.collapse_duplicate_features:
+            num_evaluated = len(feature_subsets)
+            num_subsets = sum(
+                np.prod([len(self.duplicate_features[feature]) for feature in features_subset])
+                for features_subset in feature_subsets
+            )
+            df_n_k_results = self.expand_duplicate_features(df_n_k_results, self.select_features(n))
+            self.n_k_stats.setdefault((n, k), {}).update({
+                'num_distinct_features': len(self.duplicate_features),
+                'num_evaluated_subsets': num_evaluated,
+                'num_subsets': num_subsets,
+            })
+            if self.verbose:
+                print(
+                    f'Duplicate features collapsed for n={n}, k={k}: {len(self.duplicate_features)} '
+                    f'distinct features, {num_evaluated} of {num_subsets} subsets evaluated'
+                )
 
         return df_n_k_results, seconds_to_hours(spent_time)
 
@@ -319,21 +670,24 @@ class ExhaustiveBase(
 
         Returns
         -------
-        pandas.DataFrame, float
+        pandas.DataFrame, float, dict
             DataFrame with constructed classifiers and their
-            quality scores, spent time in seconds.
+            quality scores, spent time in seconds and dict with
+            ranking scores of all subsets (only in beam search mode),
+            cross-validation counters and worker info.
         """
 
         # Fix the start time of process
         start_time = time.time()
+        self.cv_stats = dict.fromkeys(self.cv_stats, 0)
 
         results = []
-        for features_subset in feature_subsets:
-            features_subset = list(features_subset)
-
+        search_scores = {}
+        for features_subset, model, best_params in self.fit_models(feature_subsets):
             try:
-                model, best_params = self.fit_model(features_subset)
                 scores, filtration_passed = self.evaluate_model(model, features_subset)
+                if self.search_mode == 'beam':
+                    search_scores[';'.join(features_subset)] = self.get_search_score(scores)
 
                 item = {
                     'Features subset': features_subset,
@@ -369,7 +723,42 @@ class ExhaustiveBase(
         # Calculate spent time of process
         spent_time = time.time() - start_time
 
-        return df_results, spent_time
+        return df_results, spent_time, {
+            'search_scores': search_scores,
+            'cv_stats': self.cv_stats,
+            'worker': get_worker_info(),
+            'num_subsets': len(feature_subsets),
+        }
+
+    def fit_models(self, feature_subsets):
+        """Fit models for each of given feature subsets
+
+        Parameters
+        ----------
+        feature_subsets : list
+            list of list of features
+
+        Yields
+        ------
+        list, sklearn.model-like, dict
+            Features subset, model fitted on the training set
+            and its best parameters. Subsets for which fitting
+            failed are skipped.
+        """
+        for features_subset in feature_subsets:
+            features_subset = list(features_subset)
+
+            try:
+                model, best_params = self.fit_model(features_subset)
+            except CVEarlyStopped:
+                continue
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                print('Excepted ', features_subset)
+                continue
+
+            yield features_subset, model, best_params
 
     def fit_model(self, features_subset):
         """Fit classifier given features subset
@@ -402,6 +791,7 @@ class ExhaustiveBase(
             main_scoring_function=self.main_scoring_function,
             cv_ranges=self.model_cv_ranges,
             cv_folds=self.model_cv_folds,
+            main_scoring_threshold=self.main_scoring_threshold,
         )
 
         model.fit(X_train, y_train)
@@ -432,40 +822,12 @@ class ExhaustiveBase(
         filtration_passed = True
         for dataset, dataset_type in self.datasets_ids:
             dataset_id = f'{dataset};{dataset_type}'
-            X_test = self.df.loc[
-                (self.ann['Dataset'] == dataset) & (self.ann['Dataset type'] == dataset_type),
+            X_test, y_test = self.get_preprocessed_data(
                 features_subset,
-            ]
-            y_test = self.ann.loc[
                 (self.ann['Dataset'] == dataset) & (self.ann['Dataset type'] == dataset_type),
-                self.y_features,
-            ]
-            if self.check_if_model_needs_numpy():
-                X_test, y_test = X_test.to_numpy(), y_test.to_numpy()
-
-            X_test = self.preprocess(X_test)
-
-            # Make predictions
-            y_pred = model.predict(X_test)
-
-            scores[dataset_id] = {}
-            for s in self.scoring_functions:
-                if self.check_if_method_needs_proba(s):
-                    y_proba = model.predict_proba(X_test)[:, 1]
-                    score = self.scoring_functions[s](y_test, y_proba)
-                else:
-                    if self.scoring_functions[s] in [hazard_ratio, logrank]:
-                        score = self.scoring_functions[s](y_test, X_test, model.coefs)
-                    elif self.scoring_functions[s] in [dynamic_auc]:
-                        score = self.scoring_functions[s](
-                            self.ann.loc[self.ann['Dataset type'] == 'Training', self.y_features],
-                            y_test,
-                            y_pred,
-                        )
-                    else:
-                        score = self.scoring_functions[s](y_test, y_pred)
-
-                scores[dataset_id][s] = score
+            )
+
+            scores[dataset_id] = self.score_model(model, X_test, y_test)
 
             if (
                     dataset_type in ['Training', 'Filtration']
@@ -475,32 +837,106 @@ class ExhaustiveBase(
 
         return scores, filtration_passed
 
-    def estimate_run_n_k_time(self, n, k, time_per_iteration):
-        """Estimate run time of the pipeline for classifiers
-        construction using exhaustive feature selection over
-        number of selected features and length of features subsets.
+    def get_preprocessed_data(self, features_subset, samples):
+        """Features subset of given samples transformed with the
+        preprocessor fitted on the training set (see fit_model)
 
         Parameters
         ----------
-        n : int
-            Number of selected features.
-        k : int
-            Length of features subsets.
-        time_per_iteration : float
-            Time spent on running of the pipeline over n selected features
-            and k features subsets using only restricted number of processed
-            feature subsets (given by self.n_feature_subsets).
+        features_subset : list
+            list of features.
+        samples : pandas.Series
+            Boolean mask of samples.
 
         Returns
         -------
-        float
-            Estimated time that the pipeline will spend on running over
-            n selected features and k features subsets without any restriction
-            on the number of processed feature subsets.
+        pandas.DataFrame or numpy.ndarray, pandas.Series or numpy.ndarray
+            Preprocessed features and true labels.
         """
-        if self.limit_feature_subsets:
-            coef = binom(n, k)
-            if coef > self.n_feature_subsets:
-                return coef * time_per_iteration / self.n_feature_subsets
+        X = self.df.loc[samples, features_subset]
+        y = self.ann.loc[samples, self.y_features]
+        if self.check_if_model_needs_numpy():
+            X, y = X.to_numpy(), y.to_numpy()
+
+        return self.preprocess(X), y
+
+    def score_model(self, model, X_test, y_test):
+        """Calculate all scoring functions for a single dataset
+
+        Parameters
+        ----------
+        model : sklearn.model-like
+            Fitted model object with a method predict(X).
+        X_test : pandas.DataFrame or numpy.ndarray
+            Preprocessed features of the dataset.
+        y_test : pandas.DataFrame or numpy.ndarray
+            True labels of the dataset.
+
+        Returns
+        -------
+        dict
+            Dict with scores: keys are names of scoring functions.
+        """
+
+        # Make predictions
+        y_pred = model.predict(X_test)
+
+        scores = {}
+        for s in self.scoring_functions:
+            if self.check_if_method_needs_proba(s):
+                y_proba = model.predict_proba(X_test)[:, 1]
+                scores[s] = self.scoring_functions[s](y_test, y_proba)
+            else:
+                scores[s] = self.scoring_functions[s](y_test, y_pred)
+
+        return scores
+
+    def time_feature_subsets(self, feature_subsets, batch_size=5):
+        """Time fitting and evaluation of models for batches of
+        feature subsets of the same length (pilot runs of running
+        time estimator)
+
+        Parameters
+        ----------
+        feature_subsets : list
+            list of list of features
+        batch_size : int
+            Maximal number of subsets timed together (batches allow
+            models fitted in batches, e.g. FastCoxRegression, to be
+            timed the same way as in the pipeline).
+
+        Returns
+        -------
+        list, pandas.DataFrame
+            List of tuples (k, number of subsets, time in seconds) and
+            results of all evaluated subsets in the format of
+            EvaluationCache.
+        """
+        timings = []
+        evaluations = []
+        for _, group in itertools.groupby(feature_subsets, key=len):
+            group = list(group)
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                df_results, spent_time, _ = self.exhaustive_run_over_chunk(batch)
+                timings.append((len(batch[0]), len(batch), spent_time))
+
+                # Subsets which did not pass filtration get empty scores
+                passed = df_results.index
+                df_results = df_results[~passed.duplicated()].reindex(list(dict.fromkeys(map(';'.join, batch))))
+                df_results['Filtration passed'] = df_results.index.isin(passed)
+                evaluations.append(df_results)
+
+        if not evaluations:
+            return timings, pd.DataFrame(columns=['Filtration passed'])
+
+        return timings, pd.concat(evaluations, axis=0)
+
+    def get_n_fits_per_subset(self):
+        """Number of model fits per feature subset (cross-validation
+        over the whole grid and the final fit).
+        """
+        if not self.model_cv_ranges:
+            return 1
 
-        return time_per_iteration
+        return len(ParameterGrid(self.model_cv_ranges)) * self.model_cv_folds + 1
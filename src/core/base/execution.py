@@ -0,0 +1,377 @@
+import os
+import copy
+import math
+import time
+import random
+import shutil
+import weakref
+import tempfile
+import contextlib
+import functools
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+from threadpoolctl import threadpool_limits
+
+from src.core.utils import get_available_cores
+from src.core.executors import EXECUTORS, get_executor
+from src.core.affinity import get_worker_slots, pin_worker
+
+
+class ExecutionOptions:
+    def __init__(
+            self,
+            executor='multiprocessing', threads_per_process=None,
+            cpu_affinity=None, numa_replicas=False,
+            shard=None,
+    ):
+        """Class constructor
+
+          Parameters
+          ----------
+          executor : str
+              Name of executor used if n_processes > 1: multiprocessing,
+              process_pool, thread, joblib or serial (see executors.py).
+          threads_per_process : int or str
+              If given, number of BLAS / OpenMP threads in each process
+              (limited with threadpoolctl) and number of threads of model
+              (n_jobs, nthread, etc. unless given in model_kwargs). If "auto",
+              available cores are split into n_processes x threads_per_process
+              by a microbenchmark of the model (see choose_thread_budget).
+              By default (None), libraries use all cores in each process.
+          cpu_affinity : str
+              If given, worker processes (threads) are pinned to cores:
+              "spread" places workers on NUMA nodes (sockets) in round-robin
+              order, "compact" fills nodes one by one. Each worker gets
+              threads_per_process cores (or an equal share of all cores).
+          numa_replicas : bool
+              If true and data is a binary store, the first pinned worker
+              of each NUMA node copies the data matrix to a node-local file
+              in shared memory, which is used by all workers of the node.
+          shard : tuple
+              Pair (i, N): only i-th of N equal slices (1 <= i <= N) of
+              feature subsets of each (n, k) pair is evaluated, and results
+              are written to shard-tagged files (see merge_shards.py).
+        """
+        # Name of executor, checked here and initialized for each run
+        get_executor(executor, 1)
+
+        if threads_per_process is not None and threads_per_process != 'auto' and threads_per_process < 1:
+            raise ValueError(f'Invalid threads_per_process {threads_per_process}')
+
+        if cpu_affinity not in [None, 'spread', 'compact']:
+            raise ValueError(f'Unknown CPU affinity policy {cpu_affinity}, available: spread, compact')
+
+        if shard is not None and not 1 <= shard[0] <= shard[1]:
+            raise ValueError(f'Invalid shard {shard[0]}/{shard[1]}')
+
+        self.executor = executor
+        self.threads_per_process = threads_per_process
+        self.cpu_affinity = cpu_affinity
+        self.numa_replicas = numa_replicas
+        self.shard = shard
+
+
+class Execution:
+    def __init__(self, options):
+        """Set up execution backend (model should be initialized
+        first, since its number of threads may be set here).
+        """
+        self.executor = options.executor
+        # Feature subsets of each (n, k) pair are split into
+        # n_processes x chunks_per_process chunks
+        self.chunks_per_process = 1
+
+        self.threads_per_process = options.threads_per_process
+        if isinstance(options.threads_per_process, int):
+            self.set_model_threads(options.threads_per_process)
+
+        self.cpu_affinity = options.cpu_affinity
+        self.numa_replicas = options.numa_replicas
+        self._replica_dir = None
+
+        # Throughput of each worker for each (n, k) pair
+        self.worker_stats = []
+
+        self.shard = options.shard
+
+        # Coordinator of distributed execution (see distributed.py)
+        self.coordinator = None
+
+    def get_shard(self, feature_subsets):
+        """Slice of feature subsets (by rank) processed by the shard."""
+        if self.shard is None:
+            return feature_subsets
+
+        i, n_shards = self.shard
+        start = (i - 1) * len(feature_subsets) // n_shards
+        end = i * len(feature_subsets) // n_shards
+
+        return feature_subsets[start:end]
+
+    def get_process_args(self, feature_subsets):
+        n_chunks = self.n_processes * self.chunks_per_process
+        chunk_size = math.ceil(len(feature_subsets) / n_chunks)
+        process_args = []
+        for i in range(n_chunks):
+            start = chunk_size * i
+            end = chunk_size * (i + 1) if i < n_chunks - 1 else len(feature_subsets)
+            process_args.append(feature_subsets[start:end])
+
+        return process_args
+
+    def map_over_chunks(self, function, feature_subsets):
+        """Apply function to chunks of feature subsets (on workers
+        of coordinator if it is set, or with executor if
+        n_processes > 1).
+
+        Returns
+        -------
+        list
+            List of results for each chunk.
+        """
+        if self.coordinator is not None:
+            return self.coordinator.map(function.__name__, feature_subsets)
+
+        if self.n_processes > 1:
+            # Run exhaustive search in multiple processes (threads)
+            process_args = self.get_process_args(feature_subsets)
+            with self.get_worker_initializer(EXECUTORS[self.executor]) as (initializer, initargs):
+                executor = get_executor(self.executor, self.n_processes, initializer, initargs)
+                if executor.uses_threads:
+                    # Thread limits are global for a process, so they are set once for all threads
+                    with self.limit_threads():
+                        return executor.map(functools.partial(self.run_on_copy, function.__name__), process_args)
+
+                return executor.map(functools.partial(self.run_with_thread_limits, function.__name__), process_args)
+
+        with self.limit_threads():
+            return [function(feature_subsets)]
+
+    @contextlib.contextmanager
+    def get_worker_initializer(self, executor_class):
+        """Context yielding initializer (and its arguments) which pins
+        workers of executor to cores according to cpu_affinity policy
+        (None if cpu_affinity is not set or executor has no workers).
+        """
+        if not self.cpu_affinity or not (executor_class.uses_processes or executor_class.uses_threads):
+            yield None, ()
+            return
+
+        if isinstance(self.threads_per_process, int):
+            n_threads = self.threads_per_process
+        else:
+            n_threads = max(1, get_available_cores() // self.n_processes)
+
+        store_dir = None
+        if self.numa_replicas and executor_class.uses_processes and self.df.attrs.get('data_store'):
+            store_dir = self.df.attrs['data_store']
+            if self._replica_dir is None:
+                # Replicas are shared by all iterations and removed with the pipeline
+                self._replica_dir = tempfile.mkdtemp(
+                    prefix='exhaufs_replicas_',
+                    dir='/dev/shm' if os.path.isdir('/dev/shm') else None,
+                )
+                weakref.finalize(self, shutil.rmtree, self._replica_dir, True)
+
+        with multiprocessing.Manager() as manager:
+            slots = manager.Queue()
+            for slot in get_worker_slots(self.n_processes, n_threads, self.cpu_affinity):
+                slots.put(slot)
+
+            yield pin_worker, (slots, store_dir, self._replica_dir)
+
+    def save_worker_stats(self, n, k, spent_times, chunk_stats):
+        """Append throughput of each worker to workers.csv (used if cpu_affinity is set)"""
+        rows = {}
+        for spent_time, stats in zip(spent_times, chunk_stats):
+            if not stats['num_subsets']:
+                continue
+
+            worker = stats['worker']
+            row = rows.setdefault(worker['worker'], {'n': n, 'k': k, **worker, 'num_subsets': 0, 'time': 0.0})
+            row['num_subsets'] += stats['num_subsets']
+            row['time'] += spent_time
+
+        for row in rows.values():
+            row['subsets_per_second'] = row['num_subsets'] / max(row['time'], 1e-9)
+        self.worker_stats.extend(rows.values())
+
+        pd.DataFrame(self.worker_stats).to_csv(self.get_output_path('workers'), index=False)
+
+        if self.verbose and rows:
+            throughputs = [row['subsets_per_second'] for row in rows.values()]
+            print(
+                f'Worker throughput for n={n}, k={k}: {len(rows)} workers, '
+                f'{min(throughputs):.2f} - {max(throughputs):.2f} subsets per second '
+                f'(mean {np.mean(throughputs):.2f})'
+            )
+
+    def limit_threads(self, n_threads=None):
+        """Context limiting BLAS / OpenMP threads of the current process
+        to n_threads (by default, threads_per_process).
+        """
+        n_threads = n_threads or self.threads_per_process
+        if not isinstance(n_threads, int):
+            return contextlib.nullcontext()
+
+        return threadpool_limits(limits=n_threads)
+
+    def run_with_thread_limits(self, function_name, feature_subsets):
+        """Apply method to feature subsets in a worker process
+        with limited number of threads.
+        """
+        with self.limit_threads():
+            return getattr(self, function_name)(feature_subsets)
+
+    def choose_thread_budget(self, n_subsets=4):
+        """Split available cores into n_processes x threads_per_process.
+
+        For each number of threads t (a divisor of the number of cores)
+        models are fitted on the same random feature subsets (of the
+        largest k in the grid) in the current process with t threads,
+        and throughput of cores / t such processes is assumed to be
+        proportional to their number. The fastest split is chosen.
+
+        Returns
+        -------
+        dict
+            Dict whose keys are numbers of threads and values are
+            times in seconds of the benchmark.
+        """
+        n_cores = get_available_cores()
+        feature_subsets = self.get_benchmark_subsets(n_subsets)
+
+        param = self.get_model_thread_param()
+        model_kwargs = self.model_kwargs
+        benchmark = {}
+        try:
+            for n_threads in [1] + [t for t in range(1, n_cores + 1) if n_cores % t == 0]:
+                self.model_kwargs = dict(model_kwargs)
+                if param and param not in model_kwargs:
+                    self.model_kwargs[param] = n_threads
+
+                start_time = time.time()
+                with self.limit_threads(n_threads):
+                    list(self.fit_models(feature_subsets))
+                # First run (warm-up) is overwritten
+                benchmark[n_threads] = time.time() - start_time
+        finally:
+            self.model_kwargs = model_kwargs
+
+        throughput = {n_threads: n_cores // n_threads / max(benchmark[n_threads], 1e-9) for n_threads in benchmark}
+        n_threads = max(throughput, key=throughput.get)
+
+        self.n_processes = n_cores // n_threads
+        self.threads_per_process = n_threads
+        self.set_model_threads(n_threads)
+
+        if self.verbose:
+            times = ', '.join(f'{t} threads: {benchmark[t]:.3f} s' for t in benchmark)
+            print(
+                f'Thread budget: {n_cores} cores split into n_processes = {self.n_processes} x '
+                f'threads_per_process = {n_threads} ({n_subsets} model fits with {times})'
+            )
+
+        return benchmark
+
+    def get_benchmark_subsets(self, n_subsets):
+        """Random feature subsets of the largest k in the grid for microbenchmarks."""
+        n, k = self.n_k.loc[self.n_k['k'].idxmax(), ['n', 'k']]
+        features = self.select_features(n)
+        # Separate generator, so that sampled subsets of the pipeline do not change
+        rng = random.Random(self.random_state)
+
+        return [rng.sample(features, min(k, len(features))) for _ in range(n_subsets)]
+
+    def choose_n_processes(self, n_subsets=8, min_gain=0.1):
+        """Choose number of processes and chunks per process by
+        a microbenchmark of the pipeline.
+
+        The same random feature subsets (n_subsets per worker, of the
+        largest k in the grid) are evaluated with 1, 2, 4, ... workers
+        (up to available cores divided by threads_per_process), and
+        throughput (subsets per second, including start of workers) is
+        measured. Doubling of workers stops as soon as throughput grows
+        by less than min_gain (memory bandwidth saturation or thread
+        contention). Then, for the fastest number of workers, 1, 2 and 4
+        chunks per process are compared. The decision is saved to
+        process_benchmark.csv.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Benchmark results: n_processes, chunks_per_process,
+            number of subsets, time in seconds, throughput and whether
+            the configuration was chosen.
+        """
+        if self.coordinator is not None:
+            # Distributed run: processes are given by workers
+            self.n_processes, self.chunks_per_process = 1, 1
+            return None
+
+        n_threads = self.threads_per_process if isinstance(self.threads_per_process, int) else 1
+        max_processes = max(1, get_available_cores() // n_threads)
+        candidates = [2 ** i for i in range(max_processes.bit_length()) if 2 ** i < max_processes] + [max_processes]
+
+        rows = []
+
+        def run_benchmark(n_processes, chunks_per_process):
+            self.n_processes, self.chunks_per_process = n_processes, chunks_per_process
+            feature_subsets = self.get_benchmark_subsets(n_subsets * n_processes)
+            start_time = time.time()
+            self.map_over_chunks(self.exhaustive_run_over_chunk, feature_subsets)
+            spent_time = time.time() - start_time
+            rows.append({
+                'n_processes': n_processes,
+                'chunks_per_process': chunks_per_process,
+                'num_subsets': len(feature_subsets),
+                'time': spent_time,
+                'subsets_per_second': len(feature_subsets) / max(spent_time, 1e-9),
+            })
+            return rows[-1]['subsets_per_second']
+
+        throughput = {}
+        previous = None
+        for n_processes in candidates:
+            throughput[n_processes] = run_benchmark(n_processes, 1)
+            if previous and throughput[n_processes] < (1 + min_gain) * throughput[previous]:
+                # Saturated: more workers do not pay off
+                break
+            previous = n_processes
+
+        n_processes = max(throughput, key=throughput.get)
+
+        granularity = {1: throughput[n_processes]}
+        if n_processes > 1:
+            for chunks_per_process in [2, 4]:
+                granularity[chunks_per_process] = run_benchmark(n_processes, chunks_per_process)
+        chunks_per_process = max(granularity, key=granularity.get)
+
+        self.n_processes, self.chunks_per_process = n_processes, chunks_per_process
+
+        benchmark = pd.DataFrame(rows)
+        benchmark['chosen'] = (
+            (benchmark['n_processes'] == n_processes) & (benchmark['chunks_per_process'] == chunks_per_process)
+        )
+        benchmark.to_csv(self.get_output_path('process_benchmark'), index=False)
+
+        if self.verbose:
+            print(
+                f'Process count: n_processes = {n_processes}, chunks_per_process = {chunks_per_process} '
+                f'({granularity[chunks_per_process]:.2f} subsets per second, '
+                f'{len(candidates)} candidates up to {max_processes} processes)'
+            )
+
+        return benchmark
+
+    def run_on_copy(self, function_name, feature_subsets):
+        """Apply method to feature subsets on a shallow copy
+        of the pipeline with its own preprocessor, so that threads
+        do not share fitted preprocessor and counters.
+        """
+        pipeline = copy.copy(self)
+        pipeline.preprocessor = copy.deepcopy(self.preprocessor)
+
+        return getattr(pipeline, function_name)(feature_subsets)
@@ -1,25 +1,44 @@
+from src.core.cache import FeatureCache
+
+
 class FeaturePreSelector:
-    def __init__(self, df, ann, preselector_function, kwargs):
+    def __init__(self, df, ann, preselector_function, kwargs, cache_dir=None):
         self.df = df
         self.ann = ann
 
         self.feature_pre_selector = preselector_function
         self.feature_pre_selector_kwargs = kwargs
+        self.feature_cache = FeatureCache(cache_dir) if cache_dir else None
+
+        self._pre_selected_features = None
 
     @property
     def pre_selected_features(self):
         """Get pre-selected features.
 
+        Pre-selection is done once; if cache directory is
+        specified, results are shared across runs.
+
         Returns
         -------
         list
             List of pre-selected features.
         """
-        if self.feature_pre_selector:
-            return self.feature_pre_selector(
-                self.df,
-                self.ann,
-                **self.feature_pre_selector_kwargs,
-            )
-        else:
-            return self.df.columns.to_list()
+        if self._pre_selected_features is None:
+            if not self.feature_pre_selector:
+                self._pre_selected_features = self.df.columns.to_list()
+            elif self.feature_cache:
+                self._pre_selected_features = self.feature_cache.get_or_compute(
+                    self.df,
+                    self.ann,
+                    self.feature_pre_selector,
+                    self.feature_pre_selector_kwargs,
+                )
+            else:
+                self._pre_selected_features = self.feature_pre_selector(
+                    self.df,
+                    self.ann,
+                    **self.feature_pre_selector_kwargs,
+                )
+
+        return self._pre_selected_features
@@ -1,5 +1,8 @@
+from src.core.cache import FeatureCache
+
+
 class FeatureSelector:
-    def __init__(self, df, ann, output_dir, selector_function, kwargs):
+    def __init__(self, df, ann, output_dir, selector_function, kwargs, cache_dir=None):
         self.df = df
         self.ann = ann
 
@@ -7,20 +10,30 @@ class FeatureSelector:
 
         self.feature_selector = selector_function
         self.feature_selector_kwargs = kwargs
+        self.feature_cache = FeatureCache(cache_dir) if cache_dir else None
 
         self.set_sorted_features()
         self.save_sorted_features()
 
     def set_sorted_features(self):
-        if self.feature_selector:
+        if not self.feature_selector:
+            self.sorted_features = self.df.columns.to_list()
+        elif self.feature_cache:
+            # Ranking is shared across runs on the same data
+            self.sorted_features = self.feature_cache.get_or_compute(
+                self.df,
+                self.ann,
+                self.feature_selector,
+                self.feature_selector_kwargs,
+                n=len(self.df.columns),
+            )
+        else:
             self.sorted_features = self.feature_selector(
                 self.df,
                 self.ann,
                 n=len(self.df.columns),
                 **self.feature_selector_kwargs,
             )
-        else:
-            self.sorted_features = self.df.columns.to_list()
 
     def save_sorted_features(self):
         with open('{}/sorted_features.txt'.format(self.output_dir), 'w') as f:
@@ -2,16 +2,35 @@ import numpy as np
 
 from sklearn.model_selection import \
     StratifiedKFold, \
-    GridSearchCV
+    GridSearchCV, \
+    ParameterGrid
 from sklearn.metrics import make_scorer
 from sklearn.svm import SVC
 
-from src.core.regression.regressors import CoxRegression
+from src.core.regression.regressors import CoxRegression, FastCoxRegression
 from src.core.utils import check_if_func_accepts_arg
 
+# Ranges of bounded scoring functions (used for cross-validation early stopping)
+SCORE_RANGES = {
+    'TPR': (0.0, 1.0),
+    'TNR': (0.0, 1.0),
+    'min_TPR_TNR': (0.0, 1.0),
+    'ROC_AUC': (0.0, 1.0),
+    'concordance_index': (0.0, 1.0),
+    'dynamic_auc': (0.0, 1.0),
+}
+
+
+# Names of model parameters setting the number of threads (sklearn / XGBoost, CatBoost, LightGBM)
+THREAD_PARAMS = ['n_jobs', 'nthread', 'thread_count', 'num_threads']
+
+
+class CVEarlyStopped(Exception):
+    """Best mean cross-validation score cannot reach the threshold"""
+
 
 class Model:
-    def __init__(self, model, kwargs, random_state):
+    def __init__(self, model, kwargs, random_state, cv_early_stopping=False):
         """Class constructor
 
           Parameters
@@ -23,6 +42,9 @@ class Model:
               Dict of keyword arguments for model initialization.
           random_state : int
               Random seed (set to an arbitrary integer for reproducibility).
+          cv_early_stopping : bool
+              If true, cross-validation of bounded scoring functions
+              stops early (see search_cv_params).
         """
         self.model = model
         self.model_kwargs = kwargs
@@ -31,6 +53,41 @@ class Model:
 
         self.random_state = random_state
 
+        self.cv_early_stopping = cv_early_stopping
+        self.cv_stats = {'num_cv_fits': 0, 'num_cv_fits_saved': 0, 'num_cv_stopped_subsets': 0}
+
+    def get_model_thread_param(self):
+        """Name of model parameter setting its number of threads
+        (None if model is single-threaded).
+        """
+        params = [param for param in THREAD_PARAMS if check_if_func_accepts_arg(self.model.__init__, param)]
+        if not params and hasattr(self.model, 'get_params'):
+            # E.g. XGBoost models accept n_jobs as **kwargs
+            try:
+                params = [param for param in THREAD_PARAMS if param in self.model().get_params()]
+            except Exception:
+                pass
+
+        return params[0] if params else None
+
+    def get_model_kwargs(self, scoring_functions):
+        """Keyword arguments of model initialization including
+        parameters required by scoring functions (model_kwargs
+        itself is not changed).
+        """
+        model_kwargs = dict(self.model_kwargs)
+        # For ROC AUC and SVM we should pass probability=True argument
+        if 'ROC_AUC' in scoring_functions and self.model == SVC:
+            model_kwargs['probability'] = True
+
+        return model_kwargs
+
+    def set_model_threads(self, n_threads):
+        """Set number of threads of model unless it is given in model_kwargs."""
+        param = self.get_model_thread_param()
+        if param and param not in self.model_kwargs:
+            self.model_kwargs[param] = n_threads
+
     def get_best_cv_model(
         self,
         X_train,
@@ -39,20 +96,43 @@ class Model:
         main_scoring_function,
         cv_ranges,
         cv_folds,
+        main_scoring_threshold=None,
     ):
         """Search for best model considered passed cross-validation parameters
 
+        Raises CVEarlyStopped if early stopping is enabled and mean
+        cross-validation score cannot reach main_scoring_threshold.
+
         Returns
         -------
         tuple
             Best model and its parameters.
         """
-        # For ROC AUC and SVM we should pass probability=True argument
-        if 'ROC_AUC' in scoring_functions and self.model == SVC:
-            self.model_kwargs['probability'] = True
+        model_kwargs = self.get_model_kwargs(scoring_functions)
+
+        if cv_ranges and self.cv_early_stopping:
+            splits = list(StratifiedKFold(
+                n_splits=cv_folds,
+                shuffle=True,
+                random_state=self.random_state,
+            ).split(X_train, y_train))
+            scorer = make_scorer(
+                scoring_functions[main_scoring_function],
+                needs_proba=self.check_if_method_needs_proba(main_scoring_function),
+            )
+
+            def score_fold(params, fold):
+                train_indices, test_indices = splits[fold]
+                model = self.model(**model_kwargs, **params)
+                model.fit(take_rows(X_train, train_indices), take_rows(y_train, train_indices))
+                return scorer(model, take_rows(X_train, test_indices), take_rows(y_train, test_indices))
 
-        if cv_ranges:
-            model = self.model(**self.model_kwargs)
+            best_params = self.search_cv_params(
+                list(ParameterGrid(cv_ranges)), cv_folds, score_fold,
+                main_scoring_function, main_scoring_threshold,
+            )
+        elif cv_ranges:
+            model = self.model(**model_kwargs)
 
             splitter = StratifiedKFold(
                 n_splits=cv_folds,
@@ -80,7 +160,8 @@ class Model:
                 s: searcher.cv_results_['mean_test_' + s]
                 for s in scoring_functions
             }
-            best_ind = np.argmax(mean_test_scorings[main_scoring_function])
+            # Failed fits get nan scores
+            best_ind = np.argmax(np.nan_to_num(mean_test_scorings[main_scoring_function], nan=-np.inf))
             best_params = {
                 param: all_params[best_ind][param]
                 for param in all_params[best_ind]
@@ -89,10 +170,72 @@ class Model:
             best_params = {}
 
         # Refit model with best parameters
-        model = self.model(**self.model_kwargs, **best_params)
+        model = self.model(**model_kwargs, **best_params)
 
         return model, best_params
 
+    def search_cv_params(self, all_params, cv_folds, score_fold, main_scoring_function, main_scoring_threshold):
+        """Grid search with bound-based early stopping.
+
+        Folds are processed one by one for all parameters. For bounded
+        scoring functions, mean score of each parameters set is bounded
+        by assuming the worst / best score on the remaining folds:
+        parameters whose upper bound is below the lower bound of another
+        parameters are dropped (they cannot be the best ones, so the
+        result is the same as of the full search), and if no upper bound
+        reaches main_scoring_threshold, CVEarlyStopped is raised.
+        Parameters with a failed fit (nan score) on any fold are dropped.
+
+        Parameters
+        ----------
+        all_params : list
+            List of parameters dicts.
+        cv_folds : int
+            Number of folds.
+        score_fold : callable
+            Function of parameters dict and fold index
+            returning main score on the fold.
+
+        Returns
+        -------
+        dict
+            Best parameters.
+        """
+        score_range = SCORE_RANGES.get(main_scoring_function) if self.cv_early_stopping else None
+
+        fold_scores = np.zeros((len(all_params), cv_folds))
+        active = np.ones(len(all_params), dtype=bool)
+        for fold in range(cv_folds):
+            for i in np.flatnonzero(active):
+                fold_scores[i, fold] = score_fold(all_params[i], fold)
+                self.cv_stats['num_cv_fits'] += 1
+
+            # Parameters whose fit failed (nan score) can not be the best ones
+            active &= ~np.isnan(fold_scores[:, fold])
+            if not active.any():
+                break
+
+            if score_range is None or fold == cv_folds - 1:
+                continue
+
+            n_remaining = cv_folds - fold - 1
+            done = fold_scores[:, :fold + 1].sum(axis=1)
+            lower = (done + n_remaining * score_range[0]) / cv_folds
+            upper = (done + n_remaining * score_range[1]) / cv_folds
+
+            if main_scoring_threshold is not None and np.all(upper[active] < main_scoring_threshold):
+                self.cv_stats['num_cv_fits_saved'] += n_remaining * int(active.sum())
+                self.cv_stats['num_cv_stopped_subsets'] += 1
+                raise CVEarlyStopped()
+
+            hopeless = active & (upper < np.max(lower[active]))
+            self.cv_stats['num_cv_fits_saved'] += n_remaining * int(hopeless.sum())
+            active &= ~hopeless
+
+        mean_test_scores = np.where(active, fold_scores.mean(axis=1), -np.inf)
+
+        return all_params[np.argmax(mean_test_scores)]
+
     @staticmethod
     def check_if_method_needs_proba(method):
         """Check if method needs special treatment like probability prediction.
@@ -111,4 +254,8 @@ class Model:
         bool
         """
 
-        return self.model not in [CoxRegression]
+        return self.model not in [CoxRegression, FastCoxRegression]
+
+
+def take_rows(data, indices):
+    return data.iloc[indices] if hasattr(data, 'iloc') else data[indices]
@@ -1,9 +1,46 @@
 import pandas as pd
 
+from sklearn.base import clone
+
+# Preprocessors transforming every feature independently of the others
+COLUMN_WISE_PREPROCESSORS = [
+    'Binarizer',
+    'KBinsDiscretizer',
+    'MaxAbsScaler',
+    'MinMaxScaler',
+    'PowerTransformer',
+    'QuantileTransformer',
+    'RobustScaler',
+    'StandardScaler',
+]
+
 
 class Preprocessor:
-    def __init__(self, preprocessor_model, kwargs):
+    def __init__(self, preprocessor_model, kwargs, dtype=None):
         self.preprocessor = preprocessor_model(**kwargs) if preprocessor_model else None
+        self.dtype = dtype
+
+    def is_preprocessor_column_wise(self):
+        return not self.preprocessor or type(self.preprocessor).__name__ in COLUMN_WISE_PREPROCESSORS
+
+    def preprocess_columns(self, X_train, X):
+        """Transform columns of X independently fitting a copy
+        of preprocessor on X_train (only for column-wise preprocessors).
+
+        Returns
+        -------
+        numpy.ndarray
+            Transformed data.
+        """
+        if not self.preprocessor:
+            return X.to_numpy()
+
+        preprocessor = clone(self.preprocessor).fit(X_train.to_numpy())
+        data = preprocessor.transform(X.to_numpy())
+        if self.dtype:
+            data = data.astype(self.dtype, copy=False)
+
+        return data
 
     def preprocess(self, data, is_fit=False):
         """Transform input data.
@@ -25,4 +62,8 @@ class Preprocessor:
             else:
                 data = self.preprocessor.transform(data)
 
+            # Keep data in compute dtype (e.g. float32 KBinsDiscretizer codes)
+            if self.dtype:
+                data = data.astype(self.dtype, copy=False)
+
         return data
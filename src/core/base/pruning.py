@@ -0,0 +1,171 @@
+import itertools
+import math
+import numpy as np
+import pandas as pd
+
+from src.core.utils import count_cluster_combinations, unrank_cluster_combination
+
+
+class PruningOptions:
+    def __init__(self, collapse_duplicate_features=False, correlation_threshold=None):
+        """Class constructor
+
+          Parameters
+          ----------
+          collapse_duplicate_features : bool
+              If true, selected features which are identical (after
+              preprocessing) on all samples are collapsed: only subsets of
+              distinct features are evaluated, and results are copied to
+              all subsets obtained by swapping duplicates.
+          correlation_threshold : float
+              If given, selected features are clustered so that absolute
+              correlation (on the training set) of each feature with its
+              cluster representative is above the threshold, and only
+              subsets with at most one feature per cluster are evaluated.
+        """
+        self.collapse_duplicate_features = collapse_duplicate_features
+        self.correlation_threshold = correlation_threshold
+
+
+class Pruning:
+    def __init__(self, options):
+        self.collapse_duplicate_features = options.collapse_duplicate_features
+        self.duplicate_features = {}
+
+        self.correlation_threshold = options.correlation_threshold
+        self._training_correlations = None
+
+    def get_duplicate_features(self, features):
+        """Group features which are identical on all samples
+        (after preprocessing if it is done column-wise)
+
+        Parameters
+        ----------
+        features : list
+            List of features (e.g. sorted by importance).
+
+        Returns
+        -------
+        dict
+            Dict whose keys are representatives (first features
+            of each group) and values are lists of group members.
+        """
+        X = self.df[features]
+        if self.is_preprocessor_column_wise():
+            X = self.preprocess_columns(X.loc[self.ann['Dataset type'] == 'Training'], X)
+        else:
+            X = X.to_numpy()
+
+        groups = {}
+        for feature, column in zip(features, X.T):
+            groups.setdefault(np.ascontiguousarray(column).tobytes(), []).append(feature)
+
+        return {members[0]: members for members in groups.values()}
+
+    def expand_duplicate_features(self, df_results, features):
+        """Copy results of subsets of distinct features to all
+        subsets obtained by swapping duplicate features.
+
+        Returns
+        -------
+        pandas.DataFrame
+            DataFrame with expanded results.
+        """
+        rank = {feature: i for i, feature in enumerate(features)}
+
+        index, rows = [], []
+        for features_subset in df_results.index:
+            for members in itertools.product(*[
+                self.duplicate_features[feature] for feature in features_subset.split(';')
+            ]):
+                index.append(';'.join(sorted(members, key=rank.get)))
+                rows.append(features_subset)
+
+        df_results = df_results.loc[rows]
+        df_results.index = index
+
+        return df_results
+
+    def get_correlation_clusters(self, features):
+        """Greedily cluster features by absolute correlation on the
+        training set: each feature (in the given order) joins the most
+        correlated cluster representative if correlation is above
+        the threshold, or becomes a new representative otherwise.
+
+        Correlation matrix is computed once and reused for
+        all subsets of the same features.
+
+        Parameters
+        ----------
+        features : list
+            List of features (e.g. sorted by importance).
+
+        Returns
+        -------
+        list
+            List of clusters (lists of features), representatives
+            are the first features of clusters.
+        """
+        if self._training_correlations is None or not set(features) <= set(self._training_correlations.index):
+            X = self.df.loc[self.ann['Dataset type'] == 'Training', features].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlations = np.abs(np.corrcoef(X, rowvar=False).reshape(len(features), len(features)))
+            self._training_correlations = pd.DataFrame(np.nan_to_num(correlations), index=features, columns=features)
+
+        correlations = self._training_correlations.loc[features, features].to_numpy()
+
+        clusters, representatives = [], []
+        for i, feature in enumerate(features):
+            if representatives:
+                j = np.argmax(correlations[i, representatives])
+                if correlations[i, representatives[j]] > self.correlation_threshold:
+                    clusters[j].append(feature)
+                    continue
+
+            clusters.append([feature])
+            representatives.append(i)
+
+        return clusters
+
+    def get_pruned_feature_subsets(self, features, n, k):
+        """Feature subsets containing at most one feature
+        from each cluster of correlated features
+
+        If limit_feature_subsets is true, subsets are sampled by
+        their ranks in the order of enumeration (like in
+        sample_feature_subsets), so each pruned subset is
+        equally likely regardless of cluster sizes.
+        """
+        clusters = self.get_correlation_clusters(features)
+        rank = {feature: i for i, feature in enumerate(features)}
+
+        if self.limit_feature_subsets:
+            sizes = [len(cluster) for cluster in clusters]
+            counts = count_cluster_combinations(sizes, k)
+            feature_subsets = [
+                tuple(sorted(
+                    [clusters[j][i] for j, i in unrank_cluster_combination(subset_rank, sizes, counts)],
+                    key=rank.get,
+                ))
+                for subset_rank in self.sample_ranks(counts[0][k], n, k)
+            ]
+        else:
+            feature_subsets = [
+                tuple(sorted(features_subset, key=rank.get))
+                for clusters_subset in itertools.combinations(clusters, k)
+                for features_subset in itertools.product(*clusters_subset)
+            ]
+
+        stats = {'num_correlation_clusters': len(clusters)}
+        if not self.limit_feature_subsets:
+            # Counted over all subsets (the same for every shard)
+            stats['num_pruned_subsets'] = math.comb(len(features), k) - len(feature_subsets)
+        self.n_k_stats.setdefault((n, k), {}).update(stats)
+
+        if self.verbose:
+            info = f'Correlated features pruned for n={n}, k={k}: {len(clusters)} clusters of {len(features)} features'
+            if 'num_pruned_subsets' in stats:
+                info += f', {stats["num_pruned_subsets"]} subsets skipped'
+            print(info)
+
+        return feature_subsets
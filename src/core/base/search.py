@@ -0,0 +1,195 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+
+
+class SearchOptions:
+    def __init__(
+            self,
+            mode='exhaustive', beam_width=100,
+            halving_fraction=None, halving_margin=None,
+            cv_early_stopping=False,
+    ):
+        """Class constructor
+
+          Parameters
+          ----------
+          mode : str
+              Either "exhaustive" (all or randomly sampled subsets are
+              evaluated) or "beam": k-subsets are built by extending
+              beam_width best (k-1)-subsets by one feature.
+          beam_width : int
+              Number of best subsets extended on each step of beam search.
+              Subsets are ranked by mean main score on training and
+              filtration sets.
+          halving_fraction : float
+              If given (or halving_margin is given), successive halving
+              is done: all subsets are first scored on the training set by
+              models with default parameters (no cross-validation), and only
+              this fraction of best subsets is further cross-validated and
+              evaluated on all datasets.
+          halving_margin : float
+              Subsets whose first stage score is not less than
+              main_scoring_threshold - halving_margin are also promoted
+              to the second stage.
+          cv_early_stopping : bool
+              If true and main scoring function is bounded (e.g. TPR, TNR,
+              min_TPR_TNR, ROC_AUC, concordance_index), cross-validation is
+              done fold by fold: parameters which cannot become the best ones
+              are dropped, and subsets whose mean cross-validation score
+              cannot reach main_scoring_threshold are skipped.
+        """
+        self.mode = mode
+        self.beam_width = beam_width
+        self.halving_fraction = halving_fraction
+        self.halving_margin = halving_margin
+        self.cv_early_stopping = cv_early_stopping
+
+
+class Search:
+    def __init__(self, options):
+        self.search_mode = options.mode
+        self.beam_width = options.beam_width
+        # Ranking scores of all subsets evaluated in beam search mode
+        self.search_scores = {}
+
+        self.halving_fraction = options.halving_fraction
+        self.halving_margin = options.halving_margin
+
+    def get_beam_feature_subsets(self, features, n, k):
+        """Extend beam_width best (k-1)-subsets by one feature
+
+        Results for (n, k-1) are taken from previous iterations over
+        the grid; if they are missing, (n, k-1) pipeline is run first.
+
+        Returns
+        -------
+        list
+            List of feature subsets (features are in the same
+            order as in features list).
+        """
+        if k == 1:
+            return [(feature,) for feature in features]
+
+        if (n, k - 1) not in self.search_scores:
+            self.exhaustive_run_n_k(n, k - 1)
+
+        rank = {feature: i for i, feature in enumerate(features)}
+        parents = sorted(self.search_scores[(n, k - 1)].items(), key=lambda item: -item[1])[:self.beam_width]
+
+        clusters = {}
+        if self.correlation_threshold is not None:
+            for i, cluster in enumerate(self.get_correlation_clusters(features)):
+                clusters.update({feature: i for feature in cluster})
+
+        feature_subsets = {}
+        for parent, _ in parents:
+            parent = parent.split(';')
+            parent_clusters = {clusters[feature] for feature in parent} if clusters else set()
+            for feature in features:
+                if feature in parent or clusters.get(feature) in parent_clusters:
+                    continue
+                features_subset = tuple(sorted(parent + [feature], key=rank.get))
+                feature_subsets[features_subset] = True
+
+        return list(feature_subsets)
+
+    def get_search_score(self, scores):
+        """Mean main score on training and filtration sets,
+        used for ranking of subsets in beam search
+        """
+        return np.mean([
+            scores[f'{dataset};{dataset_type}'][self.main_scoring_function]
+            for dataset, dataset_type in self.datasets_ids
+            if dataset_type in ['Training', 'Filtration']
+        ])
+
+    def start_search(self):
+        """Remove evaluated_subsets.csv of a previous run into the same
+        output directory (beam search appends to it for each (n, k) pair)
+        """
+        path = '{}/evaluated_subsets.csv'.format(self.output_dir)
+        if self.search_mode == 'beam' and os.path.isfile(path):
+            os.remove(path)
+
+    def save_search_scores(self, n, k):
+        """Append subsets evaluated in beam search to evaluated_subsets.csv"""
+        path = '{}/evaluated_subsets.csv'.format(self.output_dir)
+        pd.DataFrame({
+            'features': list(self.search_scores[(n, k)]),
+            'n': n,
+            'k': k,
+            'search_score': list(self.search_scores[(n, k)].values()),
+        }).to_csv(path, mode='a', header=not os.path.isfile(path), index=False)
+
+    def get_proxy_scores(self, feature_subsets):
+        """Main scores on the training set of models with default
+        parameters (first stage of successive halving)
+
+        Parameters
+        ----------
+        feature_subsets : list
+            list of list of features
+
+        Returns
+        -------
+        dict
+            Dict whose keys are feature subsets (tuples) and values
+            are scores. Subsets for which fitting failed are skipped.
+        """
+        model_cv_ranges = self.model_cv_ranges
+        self.model_cv_ranges = {}
+
+        training = self.ann['Dataset type'] == 'Training'
+        scores = {}
+        try:
+            for features_subset, model, _ in self.fit_models(feature_subsets):
+                X_train, y_train = self.get_preprocessed_data(features_subset, training)
+                try:
+                    scores[tuple(features_subset)] = self.score_model(model, X_train, y_train)[self.main_scoring_function]
+                except Exception:
+                    print('Excepted ', features_subset)
+        finally:
+            self.model_cv_ranges = model_cv_ranges
+
+        return scores
+
+    def promote_feature_subsets(self, feature_subsets, n, k):
+        """Successive halving: score all subsets with a cheap proxy and
+        keep only halving_fraction of best ones together with those
+        within halving_margin of main_scoring_threshold.
+
+        Returns
+        -------
+        list
+            Promoted feature subsets.
+        """
+        scores = {}
+        for chunk_scores in self.map_over_chunks(self.get_proxy_scores, feature_subsets):
+            scores.update(chunk_scores)
+        subsets, values = list(scores), np.array(list(scores.values()), dtype=float)
+
+        promoted = set()
+        if self.halving_fraction is not None:
+            n_top = math.ceil(self.halving_fraction * len(subsets))
+            promoted.update(subsets[i] for i in np.argsort(-values, kind='mergesort')[:n_top])
+        if self.halving_margin is not None:
+            promoted.update(
+                features_subset for features_subset, score in scores.items()
+                if score >= self.main_scoring_threshold - self.halving_margin
+            )
+
+        promoted_subsets = [features_subset for features_subset in feature_subsets if tuple(features_subset) in promoted]
+
+        self.n_k_stats.setdefault((n, k), {}).update({
+            'num_stage_1_subsets': len(feature_subsets),
+            'num_stage_2_subsets': len(promoted_subsets),
+        })
+        if self.verbose:
+            print(
+                f'Successive halving for n={n}, k={k}: {len(promoted_subsets)} of '
+                f'{len(feature_subsets)} subsets promoted to cross-validation'
+            )
+
+        return promoted_subsets
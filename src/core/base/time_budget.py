@@ -0,0 +1,145 @@
+import time
+import random
+
+from scipy.special import binom
+
+from src.core.cost_model import CostModel
+
+
+class TimeBudgetOptions:
+    def __init__(self, hours=None):
+        """Class constructor
+
+          Parameters
+          ----------
+          hours : float
+              If given, the whole run is limited to this time (anytime mode):
+              the budget is split across (n, k) pairs proportionally to
+              their estimated running time (see CostModel), and subsets of
+              each pair are evaluated by priority (sum of feature ranks)
+              until its share of the budget is spent. Fraction of evaluated
+              subsets is added to summary_n_k table (coverage column).
+        """
+        if hours is not None and hours <= 0:
+            raise ValueError(f'Invalid time_budget_hours {hours}')
+
+        self.hours = hours
+
+
+class TimeBudget:
+    def __init__(self, options):
+        self.time_budget_hours = options.hours
+        # Deadline of the run, cost model and its timings (set in start_time_budget)
+        self._deadline = None
+        self._cost_model = None
+        self._budget_timings = []
+
+    def start_time_budget(self, n_subsets=2):
+        """Fit cost model of running time on n_subsets random subsets
+        of each k of the grid (time-budgeted mode).
+        """
+        # Separate generator, so that sampled subsets of the pipeline do not change
+        rng = random.Random(self.random_state)
+        feature_subsets = []
+        for k in sorted(set(self.n_k['k'])):
+            features = self.select_features(self.n_k.loc[self.n_k['k'] == k, 'n'].max())
+            feature_subsets.extend(rng.sample(features, min(k, len(features))) for _ in range(n_subsets))
+
+        with self.limit_threads():
+            self._budget_timings, _ = self.time_feature_subsets(feature_subsets, batch_size=n_subsets)
+
+        n_samples = (self.ann['Dataset type'] == 'Training').sum()
+        self._cost_model = CostModel(self.get_n_fits_per_subset(), n_samples, self.n_processes)
+        self._cost_model.fit(*zip(*self._budget_timings))
+
+    def estimate_n_subsets(self, n, k):
+        """Approximate number of feature subsets evaluated for (n, k) pair."""
+        n_subsets = binom(min(n, len(self.sorted_features)), k)
+        if self.limit_feature_subsets:
+            n_subsets = min(n_subsets, self.n_feature_subsets)
+        if self.halving_fraction is not None:
+            n_subsets *= self.halving_fraction
+        if self.shard is not None:
+            n_subsets /= self.shard[1]
+
+        return n_subsets
+
+    def get_row_deadline(self, n, k, n_subsets):
+        """Deadline of (n, k) pair: time remaining till the end of the
+        run is split between this and the following pairs of the grid
+        proportionally to their estimated running time.
+        """
+        now = time.time()
+        remaining = max(self._deadline - now, 0)
+
+        pairs = list(zip(self.n_k['n'], self.n_k['k']))
+        following = pairs[pairs.index((n, k)) + 1:] if (n, k) in pairs else []
+
+        subset_times = dict(zip(self.n_k['k'], self._cost_model.predict_subset_time(self.n_k['k'])[0]))
+        estimated = n_subsets * subset_times[k]
+        estimated_following = sum(
+            self.estimate_n_subsets(pair_n, pair_k) * subset_times[pair_k] for pair_n, pair_k in following
+        )
+
+        if estimated + estimated_following <= 0:
+            return now + remaining
+
+        return now + remaining * estimated / (estimated + estimated_following)
+
+    def prioritize_feature_subsets(self, feature_subsets):
+        """Sort feature subsets by sum of ranks of their features
+        (best candidates first, the sort is stable).
+        """
+        rank = {feature: i for i, feature in enumerate(self.sorted_features)}
+        return sorted(feature_subsets, key=lambda features_subset: sum(rank[f] for f in features_subset))
+
+    def run_with_time_budget(self, feature_subsets, n, k, n_rounds=10):
+        """Evaluate feature subsets of (n, k) pair by priority in rounds
+        until the deadline of the pair (see get_row_deadline). The cost
+        model is refitted after each round.
+
+        Returns
+        -------
+        list, float
+            List of results for each chunk and spent time in seconds.
+        """
+        start_time = time.time()
+        feature_subsets = self.prioritize_feature_subsets(feature_subsets)
+        deadline = self.get_row_deadline(n, k, len(feature_subsets))
+        round_time = (deadline - start_time) / n_rounds
+
+        process_results = []
+        n_done = 0
+        while n_done < len(feature_subsets):
+            # Wall time per subset with all workers
+            subset_time = self._cost_model.predict_subset_time(k)[0][0] / self.n_processes
+            size = min(
+                int((deadline - time.time()) / subset_time),
+                max(int(round_time / subset_time), self.n_processes),
+                len(feature_subsets) - n_done,
+            )
+            if size < 1:
+                break
+
+            results = self.map_over_chunks(self.exhaustive_run_over_chunk, feature_subsets[n_done:n_done + size])
+            process_results.extend(results)
+            n_done += size
+
+            self._budget_timings.append((k, size, sum(spent_time for _, spent_time, _ in results)))
+            self._cost_model.fit(*zip(*self._budget_timings))
+
+        if not process_results:
+            process_results = [self.exhaustive_run_over_chunk([])]
+
+        n_seeded = self.n_k_stats.get((n, k), {}).get('num_seeded_subsets', 0)
+        n_total = n_seeded + len(feature_subsets)
+        coverage = (n_seeded + n_done) / n_total if n_total else 1.0
+        self.n_k_stats.setdefault((n, k), {})['coverage'] = coverage
+
+        if self.verbose:
+            print(
+                f'Time budget for n={n}, k={k}: {n_done} of {len(feature_subsets)} subsets evaluated '
+                f'(coverage {coverage:.3f}), {max(self._deadline - time.time(), 0) / 3600:.3f} hours left'
+            )
+
+        return process_results, time.time() - start_time
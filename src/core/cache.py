@@ -0,0 +1,160 @@
+"""
+On-disk cache of feature pre-selection and feature selection results
+and of model evaluations (pilot runs of running time estimator)
+"""
+
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def hash_dataframe(df):
+    """Content hash of a DataFrame (values, index and columns)
+
+    If DataFrame has precomputed "fingerprint" in its attrs
+    (e.g. set when loading from a binary store), it is used
+    instead of hashing values.
+
+    Returns
+    -------
+    str
+        Hex digest.
+    """
+    h = hashlib.sha256()
+    h.update('\n'.join(map(str, df.columns)).encode())
+    h.update('\n'.join(map(str, df.index)).encode())
+
+    fingerprint = getattr(df, 'attrs', {}).get('fingerprint')
+    if fingerprint:
+        h.update(fingerprint.encode())
+        h.update(' '.join(map(str, df.dtypes.unique())).encode())
+        return h.hexdigest()
+
+    values = df.to_numpy()
+    if values.dtype == object:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    else:
+        h.update(str(values.dtype).encode())
+        h.update(np.ascontiguousarray(values).data)
+
+    return h.hexdigest()
+
+
+def get_cache_key(df, ann, function, kwargs):
+    """Cache key of a feature (pre-)selection call
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Data matrix.
+    ann : pandas.DataFrame
+        Annotation of samples.
+    function : callable
+        Feature (pre-)selection function.
+    kwargs : dict
+        Keyword arguments of the function. Arguments which are
+        paths to existing files are hashed by files contents.
+
+    Returns
+    -------
+    str
+        Hex digest.
+    """
+    h = hashlib.sha256()
+    h.update(hash_dataframe(df).encode())
+    h.update(hash_dataframe(ann).encode())
+    h.update('{}.{}'.format(function.__module__, function.__qualname__).encode())
+    h.update(json.dumps(kwargs, sort_keys=True, default=str).encode())
+
+    for value in kwargs.values():
+        if isinstance(value, str) and os.path.isfile(value):
+            with open(value, 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+
+    return h.hexdigest()
+
+
+class FeatureCache:
+    """Content-addressed cache of feature lists shared across runs.
+
+    Every entry is a json file named by cache key, containing the
+    features list together with the function name and its kwargs.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, '{}.json'.format(key))
+
+    def get(self, key):
+        """Get cached features list or None."""
+        try:
+            with open(self.path(key), 'r') as f:
+                return json.load(f)['features']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, features, function, kwargs):
+        """Save features list (atomically, so parallel runs can share the cache)."""
+        entry = {
+            'function': '{}.{}'.format(function.__module__, function.__qualname__),
+            'kwargs': kwargs,
+            'features': list(features),
+        }
+
+        tmp_path = '{}.{}.tmp'.format(self.path(key), os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self.path(key))
+
+    def get_or_compute(self, df, ann, function, kwargs, **call_kwargs):
+        """Get cached result of function(df, ann, **call_kwargs, **kwargs)
+        or compute and cache it.
+        """
+        key = get_cache_key(df, ann, function, {**call_kwargs, **kwargs})
+        features = self.get(key)
+        if features is None:
+            features = list(function(df, ann, **call_kwargs, **kwargs))
+            self.set(key, features, function, {**call_kwargs, **kwargs})
+
+        return features
+
+
+class EvaluationCache:
+    """Cache of evaluated feature subsets shared by running time
+    estimator and build.
+
+    Entries are stored in a single csv table named by cache key of
+    the pipeline. The table has the format of models.csv (features
+    index, score and parameter columns) with an additional
+    "Filtration passed" column: subsets which did not pass filtration
+    are kept too, so they are not refit either.
+    """
+    def __init__(self, cache_dir, key):
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'evaluations_{}.csv'.format(key))
+
+    def get(self):
+        """Get cached evaluations or None."""
+        try:
+            return pd.read_csv(self.path, index_col=0)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, df_evaluations):
+        """Add evaluations to the table (atomically, existing entries are kept)."""
+        df_evaluations = df_evaluations[~df_evaluations.index.duplicated()]
+        cached = self.get()
+        if cached is not None:
+            df_evaluations = pd.concat([cached, df_evaluations[~df_evaluations.index.isin(cached.index)]], axis=0)
+        df_evaluations.index.name = 'features'
+
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        df_evaluations.to_csv(tmp_path)
+        os.replace(tmp_path, self.path)
@@ -1,5 +1,125 @@
+import itertools
+import traceback
+
+import numpy as np
+
 from src.core.base import ExhaustiveBase
+from src.core.classification.models import BinaryPatternClassifier
+from src.core.classification.models.binary_pattern import MAX_DENSE_K, pack_bits, check_binary
 
 
 class ExhaustiveClassification(ExhaustiveBase):
     y_features = 'Class'
+
+    _binary_features = None
+
+    def __getstate__(self):
+        # Binary features are computed once in each worker process
+        state = super().__getstate__()
+        state.pop('_binary_features', None)
+
+        return state
+
+    def fit_models(self, feature_subsets):
+        """Fit models for each of given feature subsets.
+
+        BinaryPatternClassifier models without cross-validation are
+        fitted on binary features preprocessed and packed once for all
+        subsets (see get_binary_features); otherwise models are fitted
+        one by one.
+        """
+        if not self.check_if_model_supports_packing():
+            yield from super().fit_models(feature_subsets)
+            return
+
+        feature_subsets = [list(features_subset) for features_subset in feature_subsets]
+        if not feature_subsets:
+            return
+
+        binary_features = self.get_binary_features(itertools.chain.from_iterable(feature_subsets))
+        training = np.flatnonzero(self.ann['Dataset type'] == 'Training')
+        y_train = self.ann[self.y_features].to_numpy()[training]
+        for features_subset in feature_subsets:
+            indices = [binary_features['indices'][feature] for feature in features_subset]
+            try:
+                model = self.model(**self.model_kwargs)
+                if len(indices) <= MAX_DENSE_K:
+                    model.fit_packed(binary_features['bits'][indices], y_train)
+                else:
+                    model.fit(binary_features['data'][np.ix_(training, indices)], y_train)
+            except Exception:
+                traceback.print_exc()
+                print('Excepted ', features_subset)
+                continue
+
+            yield features_subset, model, {}
+
+    def get_preprocessed_data(self, features_subset, samples):
+        """Features subset of given samples taken from binary features
+        (see get_binary_features) if they are used, otherwise preprocessed
+        as usual.
+        """
+        if not self.check_if_model_supports_packing():
+            return super().get_preprocessed_data(features_subset, samples)
+
+        binary_features = self.get_binary_features(features_subset)
+        rows = np.flatnonzero(samples)
+        indices = [binary_features['indices'][feature] for feature in features_subset]
+
+        return binary_features['data'][np.ix_(rows, indices)], self.ann[self.y_features].to_numpy()[rows]
+
+    def get_binary_features(self, features):
+        """Preprocessed binary features of all samples, computed once
+        for all feature subsets: column-wise preprocessor is fitted on the
+        training set (the same as fitting it on each subset), training
+        samples are packed to bit vectors. Features which are not stored
+        yet are added.
+
+        Parameters
+        ----------
+        features : iterable
+            Features which are needed.
+
+        Returns
+        -------
+        dict
+            Column index of each feature ('indices'), preprocessed
+            samples x features matrix ('data') and packed training
+            samples of each feature ('bits').
+        """
+        if self._binary_features is None:
+            self._binary_features = {'indices': {}, 'data': None, 'bits': None}
+        binary_features = self._binary_features
+
+        new_features = [feature for feature in dict.fromkeys(features) if feature not in binary_features['indices']]
+        if not new_features:
+            return binary_features
+
+        # Rows follow the order of annotation
+        training = self.ann['Dataset type'] == 'Training'
+        X = self.df.loc[self.ann.index, new_features]
+        data = check_binary(self.preprocess_columns(X[training.to_numpy()], X)).astype(bool)
+        bits = pack_bits(data[np.flatnonzero(training)])
+
+        if binary_features['data'] is not None:
+            data = np.concatenate([binary_features['data'], data], axis=1)
+            bits = np.concatenate([binary_features['bits'], bits])
+        start = len(binary_features['indices'])
+        binary_features['indices'].update({feature: start + i for i, feature in enumerate(new_features)})
+        binary_features['data'], binary_features['bits'] = data, bits
+
+        return binary_features
+
+    def check_if_model_supports_packing(self):
+        """Check if binary features can be preprocessed and
+        packed once for all feature subsets.
+
+        Returns
+        -------
+        bool
+        """
+        return (
+            self.model == BinaryPatternClassifier
+            and not self.model_cv_ranges
+            and self.is_preprocessor_column_wise()
+        )
@@ -1,8 +1,8 @@
 import numpy as np
 from scipy.stats import \
-    spearmanr, \
     ttest_ind, \
-    f_oneway
+    f_oneway, \
+    t as t_distribution
 
 from src.core.utils import get_datasets
 
@@ -123,7 +123,84 @@ def spearman_correlation(df, ann, n, datasets=None):
     X = df_subset.to_numpy()
     y = ann_subset["Class"].to_numpy()
 
-    pvalues = [spearmanr(X[:, j], y).pvalue for j in range(X.shape[1])]
+    pvalues = spearman_pvalues(X, y)
     features = df_subset.columns
 
     return [feature for feature, pvalue in sorted(zip(features, pvalues), key=lambda x: x[1])][:n]
+
+
+def spearman_pvalues(X, y):
+    """Two-sided p-values of Spearman correlation of each column with a vector
+
+    Same as calling scipy.stats.spearmanr for every column: all columns
+    are ranked at once (average ties), and correlation is computed
+    as a single matrix-vector product of centered ranks.
+    Constant columns and columns with NaN values get NaN p-values.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        Matrix whose rows represent samples and columns represent features.
+    y : numpy.ndarray
+        Target vector.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of p-values, one per column.
+    """
+    X_ranked = rank_columns(X)
+    y_ranked = rank_columns(np.reshape(y, (-1, 1)))[:, 0]
+
+    X_centered = X_ranked - X_ranked.mean(axis=0)
+    y_centered = y_ranked - y_ranked.mean()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = X_centered.T.dot(y_centered) / (
+            np.sqrt((X_centered ** 2).sum(axis=0)) * np.sqrt((y_centered ** 2).sum())
+        )
+        r = np.clip(r, -1, 1)
+
+        dof = len(y) - 2
+        t = r * np.sqrt((dof / ((r + 1.0) * (1.0 - r))).clip(0))
+
+    return 2 * t_distribution.sf(np.abs(t), dof)
+
+
+def rank_columns(X):
+    """Rank every column of a matrix, assigning average rank to ties
+
+    Same as scipy.stats.rankdata(X, axis=0), but without a Python
+    loop over columns. Columns with NaN values get NaN ranks.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        Matrix whose rows represent samples and columns represent features.
+
+    Returns
+    -------
+    numpy.ndarray
+        Matrix of ranks (starting from 1).
+    """
+    X = np.asarray(X, dtype=float)
+    n = X.shape[0]
+
+    order = np.argsort(X, axis=0, kind='mergesort')
+    sorted_X = np.take_along_axis(X, order, axis=0)
+
+    # Start and end positions of the tie group of each sorted element
+    positions = np.arange(n)[:, None]
+    group_start = np.ones(X.shape, dtype=bool)
+    group_start[1:] = sorted_X[1:] != sorted_X[:-1]
+    group_end = np.ones(X.shape, dtype=bool)
+    group_end[:-1] = group_start[1:]
+
+    start = np.maximum.accumulate(np.where(group_start, positions, 0), axis=0)
+    end = np.minimum.accumulate(np.where(group_end, positions, n - 1)[::-1], axis=0)[::-1]
+
+    ranks = np.empty(X.shape)
+    np.put_along_axis(ranks, order, (start + end) / 2 + 1, axis=0)
+    ranks[:, np.isnan(X).any(axis=0)] = np.nan
+
+    return ranks
@@ -0,0 +1 @@
+from .binary_pattern import BinaryPatternClassifier
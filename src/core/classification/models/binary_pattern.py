@@ -0,0 +1,156 @@
+import numpy as np
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# Number of set bits in every byte value
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+# Maximal subset length for which all 2^k cells are enumerated
+# with bitwise operations; longer subsets only count observed cells
+MAX_DENSE_K = 16
+
+
+def pack_bits(X):
+    """Pack binary matrix (samples x features) to rows of
+    uint64 words (features x ceil(samples / 64)).
+    """
+    X = np.asarray(X, dtype=bool)
+    n_words = (X.shape[0] + 63) // 64
+    packed = np.zeros((X.shape[1], n_words * 8), dtype=np.uint8)
+    packed[:, :(X.shape[0] + 7) // 8] = np.packbits(X.T, axis=1, bitorder='little')
+
+    return packed.view(np.uint64)
+
+
+def popcount(words):
+    """Number of set bits of uint64 words summed over the last axis."""
+    return POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=-1)
+
+
+def get_cells(bits, n_samples):
+    """Bit masks of samples falling into each of 2^k cells
+    (combinations of binary features values)
+
+    Cell index encodes values of features: bit j of index
+    is the value of j-th feature.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of uint64 words (2^k x ceil(samples / 64)).
+    """
+    cells = pack_bits(np.ones((n_samples, 1)))
+    for feature_bits in bits:
+        cells = np.concatenate([cells & ~feature_bits, cells & feature_bits])
+
+    return cells
+
+
+def check_binary(X):
+    X = np.asarray(X)
+    if not np.isin(X, [0, 1]).all():
+        raise ValueError(
+            'BinaryPatternClassifier accepts only binary features, '
+            'e.g. KBinsDiscretizer(n_bins=2, encode="ordinal") output'
+        )
+
+    return X
+
+
+def get_patterns(X):
+    """Cell index of each sample (bit j is the value of j-th feature)."""
+    return np.asarray(X, dtype=np.int64) @ (1 << np.arange(X.shape[1], dtype=np.int64))
+
+
+class BinaryPatternClassifier(BaseEstimator, ClassifierMixin):
+    """Majority vote over the contingency table of binary features.
+
+    Each combination of features values (one of 2^k cells) is assigned
+    to the class with the largest (weighted) number of training samples
+    in it. Features and classes are stored as packed bit vectors, so class
+    counts of all cells are computed with bitwise AND and popcount.
+    Intended for features binarized with KBinsDiscretizer(n_bins=2,
+    encode='ordinal'): the rule is exact and fitted without iterations.
+    Ties between classes are broken in favour of the class with
+    the largest total weight, then of the first class.
+    """
+    def __init__(self, class_weight=None):
+        """Class constructor
+
+        Parameters
+        ----------
+        class_weight : dict or 'balanced'
+            Weights of classes, same as in sklearn classifiers.
+            Cells which were not observed in the training set are
+            assigned to the class with the largest total weight.
+        """
+        self.class_weight = class_weight
+
+    def fit(self, X, y):
+        X, y = check_binary(X), np.asarray(y).ravel()
+        if X.shape[1] <= MAX_DENSE_K:
+            return self.fit_packed(pack_bits(X), y)
+
+        self.classes_, y_indices = np.unique(y, return_inverse=True)
+        self.n_features_in_ = X.shape[1]
+
+        self.patterns_, pattern_indices = np.unique(get_patterns(X), return_inverse=True)
+        self.cell_counts_ = np.zeros((len(self.patterns_), len(self.classes_)), dtype=np.int64)
+        np.add.at(self.cell_counts_, (pattern_indices, y_indices), 1)
+        self._set_scores(y_indices)
+
+        return self
+
+    def fit_packed(self, bits, y):
+        """Fit on already packed binary features (see pack_bits),
+        e.g. rows of a matrix packed once for many feature subsets.
+
+        Parameters
+        ----------
+        bits : numpy.ndarray
+            Array of uint64 words (k x ceil(samples / 64)), k <= MAX_DENSE_K.
+        y : array-like
+            Class labels of samples.
+        """
+        y = np.asarray(y).ravel()
+        self.classes_, y_indices = np.unique(y, return_inverse=True)
+        self.n_features_in_ = len(bits)
+
+        cells = get_cells(bits, len(y))
+        class_bits = pack_bits(y_indices[:, None] == np.arange(len(self.classes_)))
+        counts = popcount(cells[:, None, :] & class_bits[None, :, :])
+        self.patterns_ = np.flatnonzero(counts.sum(axis=1))
+        self.cell_counts_ = counts[self.patterns_]
+        self._set_scores(y_indices)
+
+        return self
+
+    def _set_scores(self, y_indices):
+        class_counts = np.bincount(y_indices, minlength=len(self.classes_))
+        weights = self._get_class_weights(class_counts)
+        self.cell_scores_ = self.cell_counts_ * weights
+        self.default_scores_ = class_counts * weights
+
+    def _get_class_weights(self, class_counts):
+        if self.class_weight == 'balanced':
+            return class_counts.sum() / (len(self.classes_) * class_counts)
+        if isinstance(self.class_weight, dict):
+            return np.array([self.class_weight.get(c, 1.0) for c in self.classes_])
+
+        return np.ones(len(self.classes_))
+
+    def _get_scores(self, X):
+        patterns = get_patterns(check_binary(X))
+        indices = np.minimum(np.searchsorted(self.patterns_, patterns), len(self.patterns_) - 1)
+        observed = self.patterns_[indices] == patterns
+
+        return np.where(observed[:, None], self.cell_scores_[indices], self.default_scores_)
+
+    def predict(self, X):
+        scores = self._get_scores(X)
+        best = scores == scores.max(axis=1, keepdims=True)
+        return self.classes_[np.argmax(np.where(best, self.default_scores_, -np.inf), axis=1)]
+
+    def predict_proba(self, X):
+        scores = self._get_scores(X)
+        return scores / scores.sum(axis=1, keepdims=True)
@@ -0,0 +1,204 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy.stats import \
+    t as t_distribution, \
+    f as f_distribution
+
+from src.core.utils import get_datasets
+from .feature_selectors import spearman_pvalues
+
+
+class ClassStatistics:
+    """Per-class sufficient statistics (count, mean and sum of squared
+    deviations) of every feature, accumulated over chunks of samples
+    with Welford / Chan et al. update formulas.
+    """
+    def __init__(self):
+        self.count = {}
+        self.mean = {}
+        self.m2 = {}
+
+    def update(self, X, y):
+        for class_ind in np.unique(y):
+            X_class = X[y == class_ind]
+            count = len(X_class)
+            mean = X_class.mean(axis=0)
+            m2 = ((X_class - mean) ** 2).sum(axis=0)
+
+            if class_ind not in self.count:
+                self.count[class_ind], self.mean[class_ind], self.m2[class_ind] = count, mean, m2
+                continue
+
+            total = self.count[class_ind] + count
+            delta = mean - self.mean[class_ind]
+            self.mean[class_ind] = self.mean[class_ind] + delta * count / total
+            self.m2[class_ind] = self.m2[class_ind] + m2 + delta ** 2 * self.count[class_ind] * count / total
+            self.count[class_ind] = total
+
+    @property
+    def classes(self):
+        return sorted(self.count)
+
+
+def accumulate_class_statistics(data_path, ann, datasets=None, chunksize=100):
+    """Read data csv by chunks of rows (samples) in a single pass
+    and accumulate per-class statistics of all features.
+
+    Returns
+    -------
+    pandas.Index, ClassStatistics
+        Features names and accumulated statistics.
+    """
+    datasets = get_datasets(ann, datasets)
+    samples = ann.index[ann['Dataset'].isin(datasets)]
+
+    statistics = ClassStatistics()
+    features = None
+    for chunk in pd.read_csv(data_path, index_col=0, chunksize=chunksize):
+        features = chunk.columns
+        chunk = chunk.loc[chunk.index.isin(samples)]
+        if len(chunk):
+            statistics.update(chunk.to_numpy(dtype=float), ann.loc[chunk.index, 'Class'].to_numpy())
+
+    return features, statistics
+
+
+def sort_by_pvalues(features, pvalues, n):
+    return [feature for feature, pvalue in sorted(zip(features, pvalues), key=lambda x: x[1])][:n]
+
+
+def t_test(data_path, ann, n, datasets=None, chunksize=100):
+    """Select n features with the lowest p-values according to t-test
+    reading data by chunks of samples
+
+    Parameters
+    ----------
+    data_path : str
+        Path to csv table of the data (samples x features).
+    ann : pandas.DataFrame
+        DataFrame with annotation of samples. Three columns are mandatory:
+        Class (binary labels), Dataset (dataset identifiers) and
+        Dataset type (Training, Filtration, Validation).
+    n : int
+        Number of features to select.
+    datasets : array-like
+        List of dataset identifiers which should be used to calculate
+        test statistic. By default (None), union of all non-validation
+        datasets will be used.
+    chunksize : int
+        Number of samples read at once.
+    Returns
+    -------
+    list
+        List of n features associated with the lowest p-values.
+    """
+    features, statistics = accumulate_class_statistics(data_path, ann, datasets, chunksize)
+    n0, n1 = statistics.count[0], statistics.count[1]
+
+    dof = n0 + n1 - 2
+    pooled_variance = (statistics.m2[0] + statistics.m2[1]) / dof
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (statistics.mean[0] - statistics.mean[1]) / np.sqrt(pooled_variance * (1 / n0 + 1 / n1))
+    pvalues = 2 * t_distribution.sf(np.abs(t), dof)
+
+    return sort_by_pvalues(features, pvalues, n)
+
+
+def f_test(data_path, ann, n, datasets=None, chunksize=100):
+    """Select n features with the lowest p-values according to f-test
+    reading data by chunks of samples
+
+    Parameters
+    ----------
+    data_path : str
+        Path to csv table of the data (samples x features).
+    ann : pandas.DataFrame
+        DataFrame with annotation of samples. Three columns are mandatory:
+        Class (binary labels), Dataset (dataset identifiers) and
+        Dataset type (Training, Filtration, Validation).
+    n : int
+        Number of features to select.
+    datasets : array-like
+        List of dataset identifiers which should be used to calculate
+        test statistic. By default (None), union of all non-validation
+        datasets will be used.
+    chunksize : int
+        Number of samples read at once.
+    Returns
+    -------
+    list
+        List of n features associated with the lowest p-values.
+    """
+    features, statistics = accumulate_class_statistics(data_path, ann, datasets, chunksize)
+    classes = statistics.classes
+
+    total = sum(statistics.count[c] for c in classes)
+    grand_mean = sum(statistics.count[c] * statistics.mean[c] for c in classes) / total
+    ss_between = sum(statistics.count[c] * (statistics.mean[c] - grand_mean) ** 2 for c in classes)
+    ss_within = sum(statistics.m2[c] for c in classes)
+
+    dof_between, dof_within = len(classes) - 1, total - len(classes)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = (ss_between / dof_between) / (ss_within / dof_within)
+    pvalues = f_distribution.sf(f, dof_between, dof_within)
+
+    return sort_by_pvalues(features, pvalues, n)
+
+
+def spearman_correlation(data_path, ann, n, datasets=None, chunksize=1000):
+    """Select n features with the highest correlation with target label
+    reading data by chunks of samples
+
+    Data table is parsed once: selected samples are written to a temporary
+    features x samples memory map, which is then ranked by chunks of features.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to csv table of the data (samples x features).
+    ann : pandas.DataFrame
+        DataFrame with annotation of samples. Three columns are mandatory:
+        Class (binary labels), Dataset (dataset identifiers) and
+        Dataset type (Training, Filtration, Validation).
+    n : int
+        Number of features to select.
+    datasets : array-like
+        List of dataset identifiers which should be used to calculate
+        correlation. By default (None), union of all non-validation
+        datasets will be used.
+    chunksize : int
+        Number of samples read (and features ranked) at once.
+
+    Returns
+    -------
+    list
+        List of n features associated with the highest absolute
+        values of Spearman correlation.
+    """
+    datasets = get_datasets(ann, datasets)
+    samples = ann.index[ann['Dataset'].isin(datasets)]
+    features = pd.read_csv(data_path, index_col=0, nrows=0).columns
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'data.npy'),
+            mode='w+',
+            dtype='float64',
+            shape=(len(features), len(samples)),
+        )
+        index = []
+        for chunk in pd.read_csv(data_path, index_col=0, chunksize=chunksize):
+            chunk = chunk.loc[chunk.index.isin(samples)]
+            data[:, len(index):len(index) + len(chunk)] = chunk.to_numpy(dtype=float).T
+            index.extend(chunk.index)
+
+        y = ann.loc[index, 'Class'].to_numpy()
+        pvalues = []
+        for start in range(0, len(features), chunksize):
+            pvalues.extend(spearman_pvalues(data[start:start + chunksize, :len(index)].T, y))
+        del data
+
+    return sort_by_pvalues(features, pvalues, n)
@@ -0,0 +1,134 @@
+"""
+Cost model of the exhaustive pipeline running time
+
+Time of fitting and evaluation of models for a single feature subset
+of length k is modeled as
+
+    t(k) = n_fits * (alpha + beta * k * n_samples)
+
+where n_fits = n_cv_grid * n_cv_folds + 1 is the number of model fits
+per subset (cross-validation and final fit) and n_samples is the size
+of the training set. Both are fixed within a run, so the model is
+a linear fit of time per subset in k: n_fits and n_samples only scale
+alpha and beta (per fit and per sample-feature costs), which makes them
+comparable between runs with different grids and training sets.
+Coefficients are fitted by weighted least squares (timing errors are
+assumed to be relative) on timings of a few random subsets of several
+lengths, and running time of (n, k) pair is C(n, k) * t(k) / n_processes.
+"""
+
+import numpy as np
+from scipy.special import binom
+from scipy.stats import t as t_distribution
+
+
+class CostModel:
+    def __init__(self, n_fits, n_samples, n_processes=1, confidence=0.95):
+        """Class constructor
+
+        Parameters
+        ----------
+        n_fits : int
+            Number of model fits per feature subset.
+        n_samples : int
+            Number of training samples.
+        n_processes : int
+            Number of processes feature subsets are distributed between.
+        confidence : float
+            Confidence level of intervals.
+        """
+        self.n_fits = n_fits
+        self.n_samples = n_samples
+        self.n_processes = n_processes
+        self.confidence = confidence
+
+        self.coef_ = None
+        self.cov_ = None
+        self.dof_ = None
+
+    def get_design(self, k):
+        k = np.atleast_1d(np.asarray(k, dtype=float))
+        return self.n_fits * np.column_stack([np.ones_like(k), k * self.n_samples])
+
+    def fit(self, k, n_subsets, times):
+        """Fit coefficients on timings of batches of feature subsets
+
+        Parameters
+        ----------
+        k : array-like
+            Length of feature subsets in each batch.
+        n_subsets : array-like
+            Number of feature subsets in each batch.
+        times : array-like
+            Time in seconds spent on each batch.
+        """
+        n_subsets = np.asarray(n_subsets, dtype=float)
+        X = self.get_design(k)
+        y = np.asarray(times, dtype=float) / n_subsets
+
+        # Batch means are weighted by number of subsets; timing noise
+        # is relative, so after the first pass errors are also scaled
+        # by fitted times
+        def solve(weights):
+            sqrt_weights = np.sqrt(weights)[:, None]
+            X_w, y_w = X * sqrt_weights, y * sqrt_weights[:, 0]
+            coef, _, rank, _ = np.linalg.lstsq(X_w, y_w, rcond=None)
+            return coef, rank, X_w, y_w
+
+        coef, _, _, _ = solve(n_subsets)
+        self.coef_, rank, X_w, y_w = solve(n_subsets / np.maximum(X @ coef, y.mean() * 1e-3) ** 2)
+
+        self.dof_ = max(len(y) - rank, 1)
+        residuals = y_w - X_w @ self.coef_
+        sigma2 = residuals @ residuals / self.dof_
+        self.cov_ = sigma2 * np.linalg.pinv(X_w.T @ X_w)
+
+        return self
+
+    def predict_subset_time(self, k):
+        """Mean time per feature subset of length k with confidence interval
+
+        Returns
+        -------
+        tuple
+            Mean, lower and upper bounds (in seconds).
+        """
+        X = self.get_design(k)
+        mean = X @ self.coef_
+        se = np.sqrt(np.einsum('ij,jk,ik->i', X, self.cov_, X))
+        q = t_distribution.ppf(0.5 + self.confidence / 2, self.dof_)
+
+        # Time can not be negative (or zero)
+        floor = 1e-9
+        return (
+            np.maximum(mean, floor),
+            np.maximum(mean - q * se, floor),
+            np.maximum(mean + q * se, floor),
+        )
+
+    def predict_time(self, n, k):
+        """Running time of (n, k) pair in hours with confidence interval."""
+        return tuple(
+            float(binom(n, k) * t[0] / self.n_processes / 3600)
+            for t in self.predict_subset_time(k)
+        )
+
+    def get_max_n(self, k, max_time, max_n, subset_time=None):
+        """Maximal n (not less than k and not greater than max_n)
+        for which running time of (n, k) pair is not greater than
+        max_time hours (k if even n = k exceeds it).
+        """
+        if subset_time is None:
+            subset_time = self.predict_subset_time(k)[0][0]
+        max_subsets = max_time * 3600 * self.n_processes / subset_time
+
+        # Number of subsets C(n, k) grows with n
+        low, high = k, max_n
+        while low < high:
+            n = (low + high + 1) // 2
+            if binom(n, k) <= max_subsets:
+                low = n
+            else:
+                high = n - 1
+
+        return low
@@ -0,0 +1,162 @@
+"""
+Binary columnar store of input data
+
+Store is a directory with the following files:
+    data.npy        features x samples matrix (each feature is contiguous),
+                    opened as a read-only memory map
+    features.txt    feature names, one per line
+    samples.txt     sample names, one per line
+    annotation.pkl  annotation DataFrame (optional)
+    fingerprint.txt content hash of the data, used as a cache key
+"""
+
+import os
+import atexit
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = 'data.npy'
+FEATURES_FILE = 'features.txt'
+SAMPLES_FILE = 'samples.txt'
+ANNOTATION_FILE = 'annotation.pkl'
+FINGERPRINT_FILE = 'fingerprint.txt'
+
+# Node-local copies of data matrices used in the current process
+# (store directory -> path to data file, see affinity.py)
+REPLICAS = {}
+
+
+def normalize_index(index):
+    """Sample names as strings: data and annotation indices read from csv
+    may have different dtypes (e.g. integer sample IDs).
+    """
+    return pd.Index(index).astype(str)
+
+
+def is_data_store(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, DATA_FILE))
+
+
+def has_annotation(path):
+    return is_data_store(path) and os.path.isfile(os.path.join(path, ANNOTATION_FILE))
+
+
+def write_data_store(data_path, store_dir, annotation_path=None, dtype='float64', chunksize=1000):
+    """Convert csv data table (and annotation) to a binary store.
+
+    Data table is read by chunks of samples, so it is never
+    loaded into memory as a whole.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to csv table of the data (samples x features).
+    store_dir : str
+        Path to output store directory.
+    annotation_path : str
+        Path to csv table of the annotation (optional).
+    dtype : str
+        Data type of stored values (float32 or float64).
+    chunksize : int
+        Number of samples read at once.
+    """
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+
+    features = pd.read_csv(data_path, index_col=0, nrows=0).columns
+    samples = normalize_index(pd.read_csv(data_path, usecols=[0]).iloc[:, 0])
+
+    data = np.lib.format.open_memmap(
+        os.path.join(store_dir, DATA_FILE),
+        mode='w+',
+        dtype=dtype,
+        shape=(len(features), len(samples)),
+    )
+    h = hashlib.sha256()
+    start = 0
+    for chunk in pd.read_csv(data_path, index_col=0, chunksize=chunksize):
+        values = chunk.to_numpy(dtype=dtype)
+        data[:, start:start + len(chunk)] = values.T
+        h.update(values.tobytes())
+        start += len(chunk)
+    data.flush()
+    del data
+
+    with open(os.path.join(store_dir, FEATURES_FILE), 'w') as f:
+        f.write('\n'.join(map(str, features)))
+    with open(os.path.join(store_dir, SAMPLES_FILE), 'w') as f:
+        f.write('\n'.join(samples))
+    with open(os.path.join(store_dir, FINGERPRINT_FILE), 'w') as f:
+        f.write('{}-{}'.format(dtype, h.hexdigest()))
+
+    if annotation_path:
+        ann = pd.read_csv(annotation_path, index_col=0)
+        ann.index = normalize_index(ann.index)
+        ann.to_pickle(os.path.join(store_dir, ANNOTATION_FILE))
+
+
+def create_temporary_store(store_dir, features, samples, dtype, fingerprint):
+    """Create a temporary store (e.g. for data of a store cast to another
+    dtype) next to a given one, or in the default temporary directory
+    if it is not writable. The store is removed at exit.
+
+    Returns
+    -------
+    str, numpy.memmap
+        Path to the new store and its writable features x samples matrix.
+    """
+    try:
+        tmp_dir = tempfile.mkdtemp(prefix='tmp_store_', dir=store_dir)
+    except OSError:
+        tmp_dir = tempfile.mkdtemp(prefix='tmp_store_')
+    atexit.register(shutil.rmtree, tmp_dir, True)
+
+    with open(os.path.join(tmp_dir, FEATURES_FILE), 'w') as f:
+        f.write('\n'.join(map(str, features)))
+    with open(os.path.join(tmp_dir, SAMPLES_FILE), 'w') as f:
+        f.write('\n'.join(map(str, samples)))
+    with open(os.path.join(tmp_dir, FINGERPRINT_FILE), 'w') as f:
+        f.write(fingerprint)
+
+    data = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, DATA_FILE),
+        mode='w+',
+        dtype=dtype,
+        shape=(len(features), len(samples)),
+    )
+
+    return tmp_dir, data
+
+
+def read_data_store(store_dir):
+    """Open data from a binary store.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame whose rows represent samples and columns represent
+        features, backed by a read-only memory map: only accessed
+        columns are read from disk, pages are shared between processes.
+    """
+    with open(os.path.join(store_dir, FEATURES_FILE), 'r') as f:
+        features = f.read().split('\n')
+    with open(os.path.join(store_dir, SAMPLES_FILE), 'r') as f:
+        samples = f.read().split('\n')
+    with open(os.path.join(store_dir, FINGERPRINT_FILE), 'r') as f:
+        fingerprint = f.read().strip()
+
+    data_path = REPLICAS.get(os.path.abspath(store_dir), os.path.join(store_dir, DATA_FILE))
+    data = np.load(data_path, mmap_mode='r')
+    df = pd.DataFrame(data.T, index=samples, columns=features, copy=False)
+    df.attrs['fingerprint'] = fingerprint
+    df.attrs['data_store'] = os.path.abspath(store_dir)
+
+    return df
+
+
+def read_annotation(store_dir):
+    return pd.read_pickle(os.path.join(store_dir, ANNOTATION_FILE))
@@ -0,0 +1,524 @@
+"""
+Distributed execution of the pipeline over TCP
+
+Coordinator owns the queue of tasks (chunks of feature subsets) and
+sends them to workers connected with multiprocessing.connection.
+Each task is leased to a single worker: worker sends heartbeats
+while processing it, and if it is lost (connection is closed, no
+heartbeat is received during lease time or the task is not finished
+in task timeout) the task is returned to the queue and processed by
+another worker. A task lost more than max_retries times, or failed
+with an exception on a worker, fails the whole call of map, as does
+a call without connected workers for worker_timeout.
+
+Workers load data themselves from the same config (or data store), so
+the pipeline is sent without data matrix and annotation, and only its
+attributes changed since the previous call of map are resent. Tasks
+are compact descriptors: ranges of ranks of feature subsets (see
+encode_feature_subsets) instead of lists of feature names.
+
+Messages are pickled, so connections are authenticated with a secret
+key: there is no default one, a random key is generated for a
+coordinator listening on a loopback address only.
+"""
+
+import math
+import time
+import pickle
+import socket
+import secrets
+import ipaddress
+import traceback
+import threading
+import collections
+
+from multiprocessing.connection import Listener, Client
+
+from src.core.utils import unrank_combination, rank_combination, next_combination
+
+
+class TaskError(Exception):
+    """Task failed on a worker or was lost too many times"""
+
+
+class TaskQueue:
+    """Thread-safe queue of tasks with results collection."""
+    def __init__(self, max_retries=3):
+        self.condition = threading.Condition()
+        self.pending = collections.deque()
+        self.results = {}
+        # Error messages of failed tasks and ids of tasks of failed calls
+        self.errors = {}
+        self.cancelled = set()
+        self.max_retries = max_retries
+        self.retries = collections.Counter()
+        self.n_tasks = 0
+        self.n_retries = 0
+        self.n_workers = 0
+        self.closed = False
+
+    def put(self, tasks):
+        """Add tasks and return their ids."""
+        with self.condition:
+            task_ids = list(range(self.n_tasks, self.n_tasks + len(tasks)))
+            self.n_tasks += len(tasks)
+            self.pending.extend(zip(task_ids, tasks))
+            self.condition.notify_all()
+
+        return task_ids
+
+    def get(self):
+        """Wait for the next task (None if queue is closed)."""
+        with self.condition:
+            while not self.pending and not self.closed:
+                self.condition.wait()
+
+            return self.pending.popleft() if self.pending else None
+
+    def retry(self, task_id, task):
+        with self.condition:
+            if task_id in self.results or task_id in self.errors or task_id in self.cancelled:
+                return
+
+            self.n_retries += 1
+            self.retries[task_id] += 1
+            if self.retries[task_id] > self.max_retries:
+                self.errors[task_id] = f'Task {task_id} was lost by {self.retries[task_id]} workers'
+            else:
+                self.pending.appendleft((task_id, task))
+            self.condition.notify_all()
+
+    def complete(self, task_id, result):
+        with self.condition:
+            # Result of a retried task could be received twice
+            if task_id not in self.cancelled:
+                self.results.setdefault(task_id, result)
+            self.condition.notify_all()
+
+    def fail(self, task_id, error):
+        with self.condition:
+            if task_id not in self.cancelled:
+                self.errors.setdefault(task_id, error)
+            self.condition.notify_all()
+
+    def cancel(self, task_ids):
+        """Drop pending tasks, results and errors of given tasks."""
+        self.cancelled.update(task_ids)
+        self.pending = collections.deque(item for item in self.pending if item[0] not in self.cancelled)
+        for task_id in task_ids:
+            self.results.pop(task_id, None)
+            self.errors.pop(task_id, None)
+
+    def add_worker(self, n=1):
+        with self.condition:
+            self.n_workers += n
+            self.condition.notify_all()
+
+    def wait(self, task_ids, worker_timeout=None):
+        """Wait for results of given tasks.
+
+        Raises TaskError if any of the tasks failed, and TimeoutError
+        if no worker was connected for worker_timeout seconds.
+        """
+        with self.condition:
+            idle_since = None
+            while not all(task_id in self.results for task_id in task_ids):
+                failed = [task_id for task_id in task_ids if task_id in self.errors]
+                if failed:
+                    error = self.errors[failed[0]]
+                    self.cancel(task_ids)
+                    raise TaskError(error)
+
+                if self.n_workers or worker_timeout is None:
+                    idle_since = None
+                    self.condition.wait()
+                    continue
+
+                idle_since = idle_since or time.time()
+                remaining = idle_since + worker_timeout - time.time()
+                if remaining <= 0:
+                    self.cancel(task_ids)
+                    raise TimeoutError(f'No workers connected for {worker_timeout} seconds')
+                self.condition.wait(remaining)
+
+            return [self.results.pop(task_id) for task_id in task_ids]
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def encode_feature_subsets(feature_subsets, index):
+    """Compact descriptor of a chunk of feature subsets
+
+    Feature subsets are given by indices of their features (index is
+    a dict of positions of features in the list known to workers);
+    runs of consecutive combinations (in the order of
+    itertools.combinations) are given by ranges of their ranks.
+
+    Returns
+    -------
+    tuple
+        ("ranks", n, k, list of (start, stop) ranges of ranks of
+        k-combinations of range(n)), ("indices", list of tuples of
+        indices) if feature subsets are not sorted combinations or ranks
+        do not form long runs, or ("items", feature_subsets) if not all
+        items are known features.
+    """
+    try:
+        indices = [tuple(index[feature] for feature in features_subset) for features_subset in feature_subsets]
+    except (KeyError, TypeError):
+        return 'items', feature_subsets
+
+    k = len(indices[0]) if indices else 0
+    if not k or any(
+        len(combination) != k or any(a >= b for a, b in zip(combination, combination[1:]))
+        for combination in indices
+    ):
+        return 'indices', indices
+
+    n = max(combination[-1] for combination in indices) + 1
+    runs = []
+    previous = None
+    for combination in indices:
+        if previous is not None and next_combination(previous, n) == list(combination):
+            runs[-1][1] += 1
+        else:
+            rank = rank_combination(combination, n)
+            runs.append([rank, rank + 1])
+        previous = combination
+
+    if 2 * len(runs) > len(indices):
+        return 'indices', indices
+
+    return 'ranks', n, k, [tuple(run) for run in runs]
+
+
+def decode_feature_subsets(descriptor, features):
+    """Feature subsets of a descriptor (see encode_feature_subsets)."""
+    if descriptor[0] == 'items':
+        return descriptor[1]
+
+    if descriptor[0] == 'indices':
+        return [tuple(features[i] for i in combination) for combination in descriptor[1]]
+
+    _, n, k, runs = descriptor
+    feature_subsets = []
+    for start, stop in runs:
+        combination = unrank_combination(start, n, k)
+        for _ in range(start, stop):
+            feature_subsets.append(tuple(features[i] for i in combination))
+            combination = next_combination(combination, n)
+
+    return feature_subsets
+
+
+def get_state(model):
+    """Attributes of model as they are pickled."""
+    if hasattr(model, '__getstate__'):
+        return model.__getstate__() or {}
+
+    return vars(model)
+
+
+def set_state(model, state):
+    """Update attributes of model as they are unpickled."""
+    if hasattr(model, '__setstate__'):
+        model.__setstate__(state)
+    else:
+        model.__dict__.update(state)
+
+
+def is_loopback(host):
+    """Whether host name resolves to a loopback address."""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+class Coordinator:
+    """Owner of the task queue which distributes chunks of feature
+    subsets between connected workers.
+
+    Set as a coordinator of a pipeline (ExhaustiveBase), it replaces
+    local processes pool: each call of function over chunks of feature
+    subsets becomes a set of tasks processed by workers. Feature subsets
+    are encoded by positions of features in sorted_features of the
+    pipeline (other models get chunks as they are).
+    """
+    def __init__(
+            self, address=('localhost', 5555), authkey=None, task_size=100, lease_time=60, task_timeout=3600,
+            max_retries=3, worker_timeout=600,
+    ):
+        """Class constructor
+
+        Parameters
+        ----------
+        address : tuple
+            Host and port to listen on.
+        authkey : bytes
+            Authentication key shared with workers. If None, a random
+            key is generated (only for a loopback address).
+        task_size : int
+            Number of feature subsets in a single task.
+        lease_time : float
+            Time in seconds after which a task of a silent worker
+            is returned to the queue.
+        task_timeout : float
+            Time in seconds after which a task is returned to the queue
+            even if its worker sends heartbeats (None disables it).
+        max_retries : int
+            Number of times a task could be returned to the queue
+            before the call of map fails.
+        worker_timeout : float
+            Time in seconds after which map fails if no worker is
+            connected (None waits for workers forever).
+        """
+        if not authkey:
+            if not is_loopback(address[0]):
+                raise ValueError(
+                    f'Authentication key is required to listen on a non-loopback address {address[0]}'
+                )
+            authkey = secrets.token_hex(16).encode()
+
+        self.address = address
+        self.authkey = authkey
+        self.task_size = task_size
+        self.lease_time = lease_time
+        self.task_timeout = task_timeout
+        self.worker_timeout = worker_timeout
+
+        self.queue = TaskQueue(max_retries)
+        self.listener = None
+        self.model = None
+        # Pickled attributes of the pipeline, versions (numbers of map
+        # calls) in which they were changed and the current version
+        self.state_bytes = {}
+        self.state_versions = {}
+        self.model_version = 0
+        self.state_lock = threading.Lock()
+        self.threads = []
+
+    def start(self, model):
+        """Start accepting workers, which will get a copy of model
+        (updated by each map call, so workers get its current state).
+        """
+        self.model = model
+        self.listener = Listener(self.address, authkey=self.authkey)
+        # Actual address (e.g. if port 0 was requested)
+        self.address = self.listener.address
+
+        thread = threading.Thread(target=self.accept_workers, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def accept_workers(self):
+        while not self.queue.closed:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError):
+                # Listener is closed or worker failed authentication
+                if self.queue.closed:
+                    break
+                continue
+
+            thread = threading.Thread(target=self.serve_worker, args=(connection,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def serve_worker(self, connection):
+        """Send tasks to a single worker and collect results."""
+        self.queue.add_worker()
+        try:
+            self.serve_tasks(connection)
+        finally:
+            self.queue.add_worker(-1)
+
+    def serve_tasks(self, connection):
+        worker_version = 0
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            task_id, task = item
+            try:
+                version, function_name, descriptor = task
+                if worker_version < version:
+                    connection.send(('state', type(self.model), self.get_changed_state(worker_version)))
+                    worker_version = version
+                connection.send(('task', task_id, function_name, descriptor))
+
+                deadline = time.time() + self.task_timeout if self.task_timeout else math.inf
+                while True:
+                    timeout = min(self.lease_time, deadline - time.time())
+                    if timeout <= 0 or not connection.poll(timeout):
+                        raise TimeoutError()
+
+                    message = connection.recv()
+                    if message[0] == 'result':
+                        self.queue.complete(task_id, message[1])
+                        break
+                    if message[0] == 'error':
+                        self.queue.fail(task_id, f'Task {task_id} failed on a worker:\n{message[2]}')
+                        break
+            except (OSError, EOFError, TimeoutError):
+                # Worker is lost (or hangs), its lease is released
+                self.queue.retry(task_id, task)
+                connection.close()
+                return
+
+        try:
+            connection.send(None)
+        except OSError:
+            pass
+        connection.close()
+
+    def update_state(self):
+        """Pickle attributes of the pipeline and mark changed ones
+        with a new version.
+        """
+        with self.state_lock:
+            self.model_version += 1
+            for name, value in get_state(self.model).items():
+                value_bytes = pickle.dumps(value)
+                if self.state_bytes.get(name) != value_bytes:
+                    self.state_bytes[name] = value_bytes
+                    self.state_versions[name] = self.model_version
+
+    def get_changed_state(self, version):
+        """Pickled attributes changed after the given version."""
+        with self.state_lock:
+            return {name: self.state_bytes[name] for name in self.state_bytes if self.state_versions[name] > version}
+
+    def map(self, function_name, feature_subsets):
+        """Apply a method of the pipeline to chunks of feature subsets
+        on workers.
+
+        Returns
+        -------
+        list
+            List of results for each chunk.
+
+        Raises
+        ------
+        TaskError
+            If a task failed on a worker or was lost more than
+            max_retries times.
+        TimeoutError
+            If no worker was connected for worker_timeout seconds.
+        """
+        # State of the pipeline could change between calls (e.g. beam
+        # search scores), so its changed attributes are sent with the
+        # first task of each call to each worker
+        self.update_state()
+
+        features = getattr(self.model, 'sorted_features', None)
+        index = {feature: i for i, feature in enumerate(features)} if features is not None else {}
+        n_tasks = max(1, math.ceil(len(feature_subsets) / self.task_size))
+        tasks = [
+            (
+                self.model_version, function_name,
+                encode_feature_subsets(feature_subsets[i * self.task_size:(i + 1) * self.task_size], index),
+            )
+            for i in range(n_tasks)
+        ]
+
+        return self.queue.wait(self.queue.put(tasks), self.worker_timeout)
+
+    def close(self):
+        self.queue.close()
+        if self.listener is not None:
+            self.listener.close()
+
+
+def connect(address, authkey, timeout):
+    """Connect to coordinator, waiting for it to start listening."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(1)
+
+
+def run_worker(address, authkey, heartbeat_interval=None, connect_timeout=600, load_data=None):
+    """Connect to coordinator and process tasks until it stops.
+
+    Parameters
+    ----------
+    address : tuple
+        Host and port of coordinator.
+    authkey : bytes
+        Authentication key shared with coordinator (required).
+    heartbeat_interval : float
+        Time in seconds between heartbeats sent while processing
+        a task (by default, 10 seconds).
+    connect_timeout : float
+        Time in seconds to wait for coordinator to start.
+    load_data : callable
+        Function of a list of features returning data and annotation
+        of the same config as of coordinator. Pipeline is sent without
+        data which is not in a binary store (see
+        ExhaustiveBase.attach_worker_data).
+    """
+    if not authkey:
+        raise ValueError('Authentication key is required')
+
+    connection = connect(address, authkey, connect_timeout)
+    model = None
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            connection.send(message)
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        if message[0] == 'state':
+            _, model_class, state = message
+            if model is None:
+                model = model_class.__new__(model_class)
+            set_state(model, {name: pickle.loads(value_bytes) for name, value_bytes in state.items()})
+            continue
+
+        _, task_id, function_name, descriptor = message
+
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(heartbeat_interval or 10):
+                send(('heartbeat',))
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            # Worker survives failed tasks, coordinator fails the call
+            if hasattr(model, 'attach_worker_data'):
+                model.attach_worker_data(load_data)
+            feature_subsets = decode_feature_subsets(descriptor, getattr(model, 'sorted_features', None))
+            message = ('result', getattr(model, function_name)(feature_subsets))
+        except Exception:
+            message = ('error', task_id, traceback.format_exc())
+        finally:
+            done.set()
+            thread.join()
+
+        send(message)
+
+    connection.close()
+
+
+def parse_address(address):
+    """Parse host:port string."""
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
@@ -0,0 +1,91 @@
+"""
+Executors running a function over chunks of feature subsets
+
+Every executor has a map(function, chunks) method returning the list
+of results in the order of chunks. Process-based executors pickle
+the pipeline for each call, thread-based ones share it (see
+ExhaustiveBase.run_on_copy).
+"""
+
+import concurrent.futures
+
+from multiprocessing import Pool
+
+
+class SerialExecutor:
+    """Process chunks one by one in the current process."""
+    uses_threads = False
+    uses_processes = False
+
+    def __init__(self, n_workers=1, initializer=None, initargs=()):
+        self.n_workers = n_workers
+        # Called once in each worker before processing chunks
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def map(self, function, chunks):
+        return [function(chunk) for chunk in chunks]
+
+
+class MultiprocessingExecutor(SerialExecutor):
+    """multiprocessing.Pool (default)."""
+    uses_processes = True
+
+    def map(self, function, chunks):
+        with Pool(self.n_workers, self.initializer, self.initargs) as p:
+            return p.map(function, chunks, chunksize=1)
+
+
+class ProcessPoolExecutor(SerialExecutor):
+    """concurrent.futures.ProcessPoolExecutor."""
+    uses_processes = True
+
+    def map(self, function, chunks):
+        with concurrent.futures.ProcessPoolExecutor(
+                self.n_workers, initializer=self.initializer, initargs=self.initargs,
+        ) as executor:
+            return list(executor.map(function, chunks))
+
+
+class ThreadExecutor(SerialExecutor):
+    """concurrent.futures.ThreadPoolExecutor: no pickling of the
+    pipeline, efficient if model fitting releases the GIL (e.g. NumPy /
+    BLAS batched engines)."""
+    uses_threads = True
+
+    def map(self, function, chunks):
+        with concurrent.futures.ThreadPoolExecutor(
+                self.n_workers, initializer=self.initializer, initargs=self.initargs,
+        ) as executor:
+            return list(executor.map(function, chunks))
+
+
+class JoblibExecutor(SerialExecutor):
+    """joblib.Parallel with loky backend (reusable pool of workers)."""
+    uses_processes = True
+
+    def map(self, function, chunks):
+        from joblib import Parallel, delayed
+
+        initializer_kwargs = {'initializer': self.initializer, 'initargs': self.initargs} if self.initializer else {}
+
+        return Parallel(
+            n_jobs=self.n_workers, backend='loky', **initializer_kwargs,
+        )(delayed(function)(chunk) for chunk in chunks)
+
+
+EXECUTORS = {
+    'serial': SerialExecutor,
+    'multiprocessing': MultiprocessingExecutor,
+    'process_pool': ProcessPoolExecutor,
+    'thread': ThreadExecutor,
+    'joblib': JoblibExecutor,
+}
+
+
+def get_executor(name, n_workers, initializer=None, initargs=()):
+    """Initialize executor by its name (key of EXECUTORS)."""
+    if name not in EXECUTORS:
+        raise ValueError(f'Unknown executor {name}, available: {", ".join(EXECUTORS)}')
+
+    return EXECUTORS[name](n_workers, initializer, initargs)
@@ -21,30 +21,45 @@ def hazard_ratio(y_true, x, model_coefs):
     """
     risk_scores = x.to_numpy().dot(model_coefs.to_numpy())
     group_indicators = risk_scores >= np.median(risk_scores)
-    grouped_y = y_true.copy()
-    grouped_y['group'] = group_indicators
 
-    i_a = [len(group_indicators[group_indicators == True])]
-    i_b = [len(group_indicators) - i_a[0]]
-    o_a = []
-    o_b = []
-    e_a = []
-    e_b = []
-    sorted_times = sorted(y_true['Time to event'][y_true['Event'] == 1].unique())
+    return groups_hazard_ratio(
+        y_true['Event'].to_numpy(),
+        y_true['Time to event'].to_numpy(),
+        group_indicators,
+    )
 
-    for event_time in sorted_times:
-        groups = group_indicators[y_true['Time to event'] == event_time]
 
-        o_a.append(len(groups[groups == True]))
-        o_b.append(len(groups) - o_a[-1])
-
-        total_dead = (o_a[-1] + o_b[-1])
-        total_alive = (i_a[-1] + i_b[-1])
+def groups_hazard_ratio(event, time, group_indicators):
+    """Hazard ratio between high (group A) and low (group B) risk groups
+    Parameters
+    ----------
+    event : numpy.ndarray
+        Binary event indicators.
+    time : numpy.ndarray
+        Times to event.
+    group_indicators : numpy.ndarray
+        Boolean indicators of group A.
+    Returns
+    -------
+    float
+        hazard_ratio
+    """
+    # Number of samples leaving each group at each distinct event time
+    # (all samples with this time, censored ones included; censored
+    # samples at other times stay in the groups)
+    sorted_times = np.unique(time[event == 1])
+    at_event_time = np.isin(time, sorted_times)
+    time_indices = np.searchsorted(sorted_times, time[at_event_time])
+    o_a = np.bincount(time_indices, weights=group_indicators[at_event_time], minlength=len(sorted_times))
+    o_b = np.bincount(time_indices, minlength=len(sorted_times)) - o_a
 
-        e_a.append(i_a[-1] * total_dead / total_alive)
-        e_b.append(i_b[-1] * total_dead / total_alive)
+    # Number of alive samples in each group before each event time
+    i_a = np.sum(group_indicators) - np.concatenate([[0], np.cumsum(o_a)[:-1]])
+    i_b = len(group_indicators) - np.sum(group_indicators) - np.concatenate([[0], np.cumsum(o_b)[:-1]])
 
-        i_a.append(i_a[-1] - o_a[-1])
-        i_b.append(i_b[-1] - o_b[-1])
+    total_dead = o_a + o_b
+    total_alive = i_a + i_b
+    e_a = i_a * total_dead / total_alive
+    e_b = i_b * total_dead / total_alive
 
     return (sum(o_a) / sum(e_a)) / (sum(o_b) / sum(e_b))
@@ -28,4 +28,20 @@ def logrank(y_true, x, model_coefs):
     risk_scores = x.to_numpy().dot(model_coefs.to_numpy())
     group_indicators = risk_scores >= np.median(risk_scores)
 
-    return -np.log10(logrank_test(structure_y_to_sksurv(y_true), group_indicators)[1])
+    return groups_logrank(structure_y_to_sksurv(y_true), group_indicators)
+
+
+def groups_logrank(structured_y_true, group_indicators):
+    """Logrank test between high and low risk groups
+    Parameters
+    ----------
+    structured_y_true : numpy.ndarray
+        Structured array with event and time fields (see structure_y_to_sksurv).
+    group_indicators : numpy.ndarray
+        Boolean indicators of the high risk group.
+    Returns
+    -------
+    float
+        -log10(logrank test pvalue)
+    """
+    return -np.log10(logrank_test(structured_y_true, group_indicators)[1])
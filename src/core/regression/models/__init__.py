@@ -1 +1,2 @@
 from .cox import CoxRegression
+from .fast_cox import FastCoxRegression
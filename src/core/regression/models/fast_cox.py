@@ -0,0 +1,415 @@
+import numpy as np
+import pandas as pd
+
+
+# Risk-set structures depend only on the outcome, which is the
+# same training set for every features subset of an exhaustive run
+_RISK_SETS_CACHE = {}
+_RISK_SETS_CACHE_SIZE = 16
+
+
+class RiskSets:
+    """Time ordering and risk-set indices of a survival outcome.
+
+    Samples are sorted by ascending time to event, so that the risk set
+    of a time point is a suffix of the sorted arrays and all risk-set
+    sums are reverse cumulative sums. Ties are handled with the Efron
+    approximation: every death of a tied group gets its own row in the
+    "Efron rows" arrays.
+    """
+    def __init__(self, event, time):
+        event = np.asarray(event).astype(bool)
+        time = np.asarray(time).astype(float)
+
+        self.n_samples = len(time)
+        self.order = np.argsort(time, kind='mergesort')
+        self.event = event[self.order]
+        self.time = time[self.order]
+        self.event_index = np.flatnonzero(self.event)
+
+        # Distinct event times and the first (sorted) index of each of them
+        event_times, n_deaths = np.unique(self.time[self.event], return_counts=True)
+        self.risk_start = np.searchsorted(self.time, event_times, side='left')
+        self.n_deaths = n_deaths
+
+        # Events are sorted by time, so tied deaths are contiguous
+        self.tie_start = np.concatenate([[0], np.cumsum(n_deaths)[:-1]]).astype(int)
+
+        # Efron rows: l-th death of a group with d deaths gets fraction l / d
+        self.efron_group = np.repeat(np.arange(len(n_deaths)), n_deaths)
+        self.efron_fraction = np.concatenate([
+            np.arange(d) / d for d in n_deaths
+        ]) if len(n_deaths) else np.zeros(0)
+
+    @classmethod
+    def from_outcome(cls, event, time):
+        """Get (possibly cached) risk sets for a given outcome."""
+        event = np.ascontiguousarray(event, dtype=bool)
+        time = np.ascontiguousarray(time, dtype=float)
+        key = (event.tobytes(), time.tobytes())
+
+        risk_sets = _RISK_SETS_CACHE.get(key)
+        if risk_sets is None:
+            if len(_RISK_SETS_CACHE) >= _RISK_SETS_CACHE_SIZE:
+                _RISK_SETS_CACHE.pop(next(iter(_RISK_SETS_CACHE)))
+            risk_sets = cls(event, time)
+            _RISK_SETS_CACHE[key] = risk_sets
+
+        return risk_sets
+
+    def efron_values(self, X, beta):
+        """Efron partial log-likelihood, its gradient and hessian
+        for a batch of models.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            (B, n, k) tensor of covariates sorted according to self.order.
+        beta : numpy.ndarray
+            (B, k) matrix of coefficients.
+
+        Returns
+        -------
+        numpy.ndarray, numpy.ndarray, numpy.ndarray
+            Hessians (B, k, k), gradients (B, k) and log-likelihoods (B, ).
+        """
+        B, n, k = X.shape
+        if not len(self.event_index):
+            return np.zeros((B, k, k)), np.zeros((B, k)), np.zeros(B)
+
+        eta = np.einsum('bnk,bk->bn', X, beta)
+        phi = np.exp(eta)
+        phi_x = phi[:, :, None] * X
+        phi_x_x = phi_x[:, :, :, None] * X[:, :, None, :]
+
+        # Risk-set sums: reverse cumulative sums taken at group starts
+        def risk_sum(a):
+            return np.flip(np.cumsum(np.flip(a, axis=1), axis=1), axis=1)[:, self.risk_start]
+
+        # Sums over tied deaths
+        def tie_sum(a):
+            return np.add.reduceat(a[:, self.event_index], self.tie_start, axis=1)
+
+        g, f = self.efron_group, self.efron_fraction
+        denom = 1.0 / (risk_sum(phi)[:, g] - f * tie_sum(phi)[:, g])
+        summand = (risk_sum(phi_x)[:, g] - f[:, None] * tie_sum(phi_x)[:, g]) * denom[:, :, None]
+        a1 = (risk_sum(phi_x_x)[:, g] - f[:, None, None] * tie_sum(phi_x_x)[:, g]) * denom[:, :, None, None]
+
+        hessian = np.einsum('bek,bel->bkl', summand, summand) - a1.sum(1)
+        gradient = X[:, self.event_index].sum(1) - summand.sum(1)
+        log_lik = eta[:, self.event_index].sum(1) + np.log(denom).sum(1)
+
+        return hessian, gradient, log_lik
+
+
+def soft_abs(x, a):
+    """Smooth approximation of |x| used by lifelines for L1 penalty."""
+    return 1 / a * (np.logaddexp(0, -a * x) + np.logaddexp(0, a * x))
+
+
+def elastic_net_penalty(beta, a, n, penalizer, l1_ratio):
+    """Lifelines-compatible elastic net penalty with its derivatives.
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, numpy.ndarray
+        Penalty values, gradients and diagonals of hessians
+        (one row per model).
+    """
+    sigmoid = 1 / (1 + np.exp(-a * beta))
+    value = n * (penalizer * (l1_ratio * soft_abs(beta, a) + 0.5 * (1 - l1_ratio) * beta ** 2)).sum(-1)
+    grad = n * penalizer * (l1_ratio * (2 * sigmoid - 1) + (1 - l1_ratio) * beta)
+    hess = n * penalizer * (l1_ratio * 2 * a * sigmoid * (1 - sigmoid) + (1 - l1_ratio))
+
+    return value, grad, hess
+
+
+class StepSizer:
+    """Newton-Raphson step size schedule, same as in lifelines,
+    kept independently for each model of a batch.
+    """
+    def __init__(self, initial_step_size, n_models):
+        self.initial_step_size = initial_step_size
+        self.step_size = np.full(n_models, initial_step_size)
+        self.temper_back_up = np.zeros(n_models, dtype=bool)
+        self.norm_of_deltas = np.zeros((n_models, 3))
+        self.n_updates = np.zeros(n_models, dtype=int)
+
+    def update(self, models, norm_of_delta):
+        self.norm_of_deltas[models] = np.column_stack([self.norm_of_deltas[models, 1:], norm_of_delta])
+        self.n_updates[models] += 1
+
+        step_size = self.step_size[models]
+        temper_back_up = self.temper_back_up[models]
+        step_size[temper_back_up] = np.minimum(step_size[temper_back_up] * 1.3, self.initial_step_size)
+
+        large = norm_of_delta >= 15.0
+        medium = (15.0 > norm_of_delta) & (norm_of_delta > 5.0)
+        step_size[large] *= 0.1
+        step_size[medium] *= 0.25
+        temper_back_up |= large | medium
+
+        lookback = self.n_updates[models] >= 3
+        decreasing = np.all(np.diff(self.norm_of_deltas[models], axis=1) < 0, axis=1)
+        step_size[lookback & decreasing] = np.minimum(step_size[lookback & decreasing] * 1.3, 1.0)
+        step_size[lookback & ~decreasing] *= 0.98
+
+        self.step_size[models] = step_size
+        self.temper_back_up[models] = temper_back_up
+
+
+def newton_raphson(
+        X, risk_sets,
+        penalizer=0.0, l1_ratio=0.0,
+        step_size=0.95, precision=1e-07, r_precision=1e-09, max_steps=500,
+):
+    """Fit a batch of Cox models in lock-step.
+
+    All models share the same outcome (and therefore risk sets);
+    every model has its own step size and convergence status,
+    converged models are excluded from further iterations.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        (B, n, k) tensor of normalized covariates sorted according
+        to risk_sets.order.
+    risk_sets : RiskSets
+        Risk sets of the outcome.
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, numpy.ndarray
+        Coefficients (B, k), log-likelihoods (B, ) and boolean mask
+        of models for which fitting failed (singular hessian or nan values).
+    """
+    B, n, d = X.shape
+    penalized = isinstance(penalizer, np.ndarray) or penalizer > 0
+
+    beta = np.zeros((B, d))
+    delta = np.zeros((B, d))
+    log_lik = np.zeros(B)
+    previous_log_lik = np.zeros(B)
+    step_sizer = StepSizer(step_size, B)
+    active = np.ones(B, dtype=bool)
+    failed = np.zeros(B, dtype=bool)
+
+    for i in range(1, max_steps + 1):
+        models = np.flatnonzero(active)
+        if not len(models):
+            break
+
+        beta[models] += step_sizer.step_size[models, None] * delta[models]
+
+        h, g, ll = risk_sets.efron_values(X[models], beta[models])
+        if penalized:
+            value, grad, hess = elastic_net_penalty(beta[models], 1.3 ** i, n, penalizer, l1_ratio)
+            ll -= value
+            g -= grad
+            h[:, np.arange(d), np.arange(d)] -= hess
+
+        try:
+            delta_i = np.linalg.solve(-h, g[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            delta_i = np.full_like(g, np.nan)
+            for j in range(len(models)):
+                try:
+                    delta_i[j] = np.linalg.solve(-h[j], g[j])
+                except np.linalg.LinAlgError:
+                    pass
+
+        nan = np.any(np.isnan(delta_i), axis=1)
+        norm_delta = np.linalg.norm(delta_i, axis=1)
+        newton_decrement = np.einsum('bk,bk->b', g, delta_i) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative_change = np.abs(ll - previous_log_lik[models]) / (-previous_log_lik[models])
+
+        converged = (
+            nan
+            | (norm_delta < precision)
+            | ((previous_log_lik[models] != 0) & (relative_change < r_precision))
+            | (newton_decrement < precision)
+            | (step_sizer.step_size[models] <= 0.00001)
+            | ((np.abs(ll) < 0.0001) & (norm_delta > 1.0))
+        )
+
+        failed[models[nan]] = True
+        log_lik[models] = ll
+        delta[models] = delta_i
+        active[models[converged]] = False
+
+        models, norm_delta = models[~converged], norm_delta[~converged]
+        previous_log_lik[models] = ll[~converged]
+        step_sizer.update(models, norm_delta)
+
+    return beta, log_lik, failed
+
+
+class FastCoxRegression:
+    """Lightweight Cox proportional hazards model.
+
+    A NumPy reimplementation of lifelines CoxPHFitter fitting procedure
+    (Efron ties, normalized covariates, elastic net penalty and
+    Newton-Raphson schedule) without DataFrame machinery, summary
+    statistics and convergence diagnostics. Intended for exhaustive
+    search over short (k <= 10) features subsets: memory consumption
+    grows as n_samples * k^2.
+    """
+    def __init__(
+            self,
+            penalizer=0.0,
+            l1_ratio=0.0,
+            step_size=0.95,
+            precision=1e-07,
+            r_precision=1e-09,
+            max_steps=500,
+    ):
+        """Class constructor
+
+        Parameters
+        ----------
+        penalizer : float or numpy.ndarray
+            Coefficient of the elastic net penalty, same as in lifelines.
+        l1_ratio : float
+            Ratio of L1 vs L2 penalty, same as in lifelines.
+        step_size : float
+            Initial Newton-Raphson step size.
+        precision : float
+            Stop when norm of Newton-Raphson delta is less than precision.
+        r_precision : float
+            Stop when relative decrease of log-likelihood is less than r_precision.
+        max_steps : int
+            Maximal number of Newton-Raphson iterations.
+        """
+        self.penalizer = penalizer
+        self.l1_ratio = l1_ratio
+        self.step_size = step_size
+        self.precision = precision
+        self.r_precision = r_precision
+        self.max_steps = max_steps
+
+    def fit(self, x, y):
+        """Fit the model.
+
+        Parameters
+        ----------
+        x : pandas.DataFrame or numpy.ndarray
+            Matrix of covariates (samples x features).
+        y : pandas.DataFrame or numpy.ndarray
+            Event and Time to event columns (in this order for numpy input).
+
+        Returns
+        -------
+        FastCoxRegression
+            Fitted model.
+        """
+        if isinstance(x, pd.DataFrame):
+            self.feature_names = x.columns
+            x = x.to_numpy()
+        else:
+            self.feature_names = pd.RangeIndex(np.shape(x)[1])
+
+        event, time = self._get_event_and_time(y)
+
+        x = np.asarray(x, dtype=float)
+        self._norm_mean = x.mean(0)
+        self._norm_std = x.std(0, ddof=1)
+
+        risk_sets = RiskSets.from_outcome(event, time)
+        X = ((x - self._norm_mean) / self._norm_std)[risk_sets.order]
+
+        beta, log_lik, failed = newton_raphson(X[None], risk_sets, **self.fit_options)
+        if failed[0]:
+            raise ValueError('Hessian is singular or contains nan values. Convergence halted.')
+
+        self.log_likelihood_ = log_lik[0]
+        self.params_ = pd.Series(beta[0] / self._norm_std, index=self.feature_names)
+
+        return self
+
+    @classmethod
+    def fit_batch(cls, x, y, feature_names=None, **kwargs):
+        """Fit models for a batch of features subsets in lock-step.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            (B, n, k) tensor: covariates of B features subsets of the same length.
+        y : pandas.DataFrame or numpy.ndarray
+            Event and Time to event columns (in this order for numpy input).
+        feature_names : list
+            List of B lists of features names (optional).
+        kwargs : dict
+            Keyword arguments for models initialization.
+
+        Returns
+        -------
+        list, numpy.ndarray
+            List of B fitted models (None if fitting failed) and (B, n)
+            matrix of training risk scores (linear predictors).
+        """
+        event, time = cls._get_event_and_time(y)
+        x = np.asarray(x, dtype=float)
+
+        norm_mean = x.mean(1)
+        norm_std = x.std(1, ddof=1)
+
+        risk_sets = RiskSets.from_outcome(event, time)
+        X = ((x - norm_mean[:, None]) / norm_std[:, None])[:, risk_sets.order]
+
+        template = cls(**kwargs)
+        beta, log_lik, failed = newton_raphson(X, risk_sets, **template.fit_options)
+        coefs = beta / norm_std
+
+        models = []
+        for i in range(len(x)):
+            if failed[i]:
+                models.append(None)
+                continue
+
+            model = cls(**kwargs)
+            model.feature_names = pd.Index(feature_names[i]) if feature_names else pd.RangeIndex(x.shape[2])
+            model._norm_mean = norm_mean[i]
+            model._norm_std = norm_std[i]
+            model.log_likelihood_ = log_lik[i]
+            model.params_ = pd.Series(coefs[i], index=model.feature_names)
+            models.append(model)
+
+        risk_scores = np.einsum('bnk,bk->bn', x, coefs)
+
+        return models, risk_scores
+
+    @property
+    def fit_options(self):
+        return {
+            'penalizer': self.penalizer,
+            'l1_ratio': self.l1_ratio,
+            'step_size': self.step_size,
+            'precision': self.precision,
+            'r_precision': self.r_precision,
+            'max_steps': self.max_steps,
+        }
+
+    @staticmethod
+    def _get_event_and_time(y):
+        if isinstance(y, pd.DataFrame):
+            return y['Event'].to_numpy(), y['Time to event'].to_numpy()
+
+        y = np.asarray(y)
+        return y[:, 0], y[:, 1]
+
+    def predict_log_partial_hazard(self, x):
+        index = x.index if isinstance(x, pd.DataFrame) else None
+        x = x[self.feature_names].to_numpy() if isinstance(x, pd.DataFrame) else np.asarray(x)
+        log_partial_hazard = (x - self._norm_mean).dot(self.params_.to_numpy())
+
+        if index is not None:
+            return pd.Series(log_partial_hazard, index=index)
+        return log_partial_hazard
+
+    def predict(self, x):
+        return np.exp(self.predict_log_partial_hazard(x))
+
+    @property
+    def coefs(self):
+        return self.params_
@@ -1,5 +1,229 @@
+import itertools
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import \
+    StratifiedKFold, \
+    ParameterGrid
+
 from src.core.base import ExhaustiveBase
+from src.core.regression.models import FastCoxRegression
+from src.core.regression.scoring import \
+    SURVIVAL_SCORES, \
+    SurvivalPredictions, \
+    get_risk_scores
+
+# Maximal number of elements in the largest (B x samples x k x k)
+# tensor of a batched Cox fit
+BATCH_MAX_ELEMENTS = 2 ** 22
 
 
 class ExhaustiveRegression(ExhaustiveBase):
     y_features = ['Event', 'Time to event']
+
+    _y_train = None
+    _cv_splits = None
+
+    @property
+    def y_train(self):
+        """Event and Time to event of the training set."""
+        if self._y_train is None:
+            self._y_train = self.ann.loc[self.ann['Dataset type'] == 'Training', self.y_features]
+        return self._y_train
+
+    def score_model(self, model, X_test, y_test):
+        """Calculate all scoring functions for a single dataset.
+
+        Risk scores are calculated once, registered survival scoring
+        functions (see scoring.py) are derived from them; other
+        functions are called with predicted partial hazards.
+        """
+        predictions = SurvivalPredictions(y_test, self.get_risk_scores(model, X_test), y_train=self.y_train)
+
+        y_pred = None
+        scores = {}
+        for s in self.scoring_functions:
+            if self.scoring_functions[s] in SURVIVAL_SCORES:
+                scores[s] = predictions.score(self.scoring_functions[s])
+            else:
+                if y_pred is None:
+                    y_pred = model.predict(X_test)
+                scores[s] = self.scoring_functions[s](y_test, y_pred)
+
+        return scores
+
+    def get_risk_scores(self, model, X_test):
+        """Risk scores (linear predictor) of a model on a given dataset;
+        training risk scores of batch-fitted models are reused.
+        """
+        risk_scores = getattr(model, 'risk_scores_', None)
+        if (
+                risk_scores is not None
+                and isinstance(X_test, pd.DataFrame)
+                and X_test.index.equals(self.y_train.index)
+        ):
+            return risk_scores
+
+        return get_risk_scores(model, X_test)
+
+    def get_best_cv_model(
+        self,
+        X_train,
+        y_train,
+        scoring_functions,
+        main_scoring_function,
+        cv_ranges,
+        cv_folds,
+        main_scoring_threshold=None,
+    ):
+        """Search for best model considered passed cross-validation parameters.
+
+        Folds are stratified by event status and computed once for all
+        feature subsets; models are fitted on each fold and scored
+        with the main scoring function through the fused survival path.
+
+        Returns
+        -------
+        tuple
+            Best model and its parameters.
+        """
+        if not cv_ranges:
+            return super().get_best_cv_model(
+                X_train, y_train,
+                scoring_functions, main_scoring_function,
+                cv_ranges, cv_folds,
+                main_scoring_threshold,
+            )
+
+        splits = self.get_cv_splits(y_train, cv_folds)
+
+        def score_fold(params, fold):
+            train_indices, test_indices = splits[fold]
+            return self.score_cv_fold(
+                X_train, y_train,
+                train_indices, test_indices,
+                params, scoring_functions[main_scoring_function],
+            )
+
+        best_params = self.search_cv_params(
+            list(ParameterGrid(cv_ranges)), cv_folds, score_fold,
+            main_scoring_function, main_scoring_threshold,
+        )
+
+        # Refit model with best parameters
+        model = self.model(**self.model_kwargs, **best_params)
+
+        return model, best_params
+
+    def get_cv_splits(self, y_train, cv_folds):
+        """Cross-validation folds stratified by event status.
+
+        Folds are computed once and reused while the training
+        set and the number of folds do not change.
+
+        Returns
+        -------
+        list
+            List of (train indices, test indices) pairs.
+        """
+        event = np.asarray(y_train)[:, 0].astype(int)
+        key = (cv_folds, event.tobytes(), np.asarray(y_train)[:, 1].astype(float).tobytes())
+        if self._cv_splits is None or self._cv_splits[0] != key:
+            splitter = StratifiedKFold(
+                n_splits=cv_folds,
+                shuffle=True,
+                random_state=self.random_state,
+            )
+            self._cv_splits = key, list(splitter.split(np.zeros(len(event)), event))
+
+        return self._cv_splits[1]
+
+    def score_cv_fold(self, X_train, y_train, train_indices, test_indices, params, score_function):
+        """Fit a model on a single cross-validation fold and score it.
+
+        Returns
+        -------
+        float
+            Score on the test part of the fold, nan if fitting failed.
+        """
+        def take(data, indices):
+            return data.iloc[indices] if isinstance(data, (pd.DataFrame, pd.Series)) else data[indices]
+
+        X_fold_train, X_fold_test = take(X_train, train_indices), take(X_train, test_indices)
+        y_fold_train, y_fold_test = take(y_train, train_indices), take(y_train, test_indices)
+
+        try:
+            model = self.model(**self.model_kwargs, **params)
+            model.fit(X_fold_train, y_fold_train)
+        except Exception:
+            return np.nan
+
+        if score_function in SURVIVAL_SCORES:
+            predictions = SurvivalPredictions(
+                y_fold_test,
+                get_risk_scores(model, X_fold_test),
+                y_train=y_fold_train,
+            )
+            return predictions.score(score_function)
+
+        return score_function(y_fold_test, model.predict(X_fold_test))
+
+    def fit_models(self, feature_subsets):
+        """Fit models for each of given feature subsets.
+
+        FastCoxRegression models without cross-validation and
+        preprocessing are fitted in batches with a lock-step
+        Newton-Raphson solver (if a batch fails as a whole, its subsets
+        are fitted one by one); otherwise models are fitted one by one.
+        """
+        if not self.check_if_model_supports_batches():
+            yield from super().fit_models(feature_subsets)
+            return
+
+        feature_subsets = [list(features_subset) for features_subset in feature_subsets]
+        if not feature_subsets:
+            return
+
+        training = self.ann['Dataset type'] == 'Training'
+        X_train = self.df.loc[training, list(dict.fromkeys(itertools.chain.from_iterable(feature_subsets)))]
+        y_train = self.ann.loc[training, self.y_features]
+        column_indices = {feature: i for i, feature in enumerate(X_train.columns)}
+        X_train = X_train.to_numpy()
+
+        k = len(feature_subsets[0])
+        batch_size = max(1, BATCH_MAX_ELEMENTS // (len(X_train) * k * k))
+        for start in range(0, len(feature_subsets), batch_size):
+            batch = feature_subsets[start:start + batch_size]
+            indices = np.array([[column_indices[feature] for feature in features_subset] for features_subset in batch])
+
+            try:
+                models, risk_scores = FastCoxRegression.fit_batch(
+                    np.moveaxis(X_train[:, indices], 0, 1),
+                    y_train,
+                    feature_names=batch,
+                    **self.model_kwargs,
+                )
+            except Exception:
+                # Fit the batch one by one, so only failing subsets are skipped
+                traceback.print_exc()
+                yield from super().fit_models(batch)
+                continue
+
+            for features_subset, model, model_risk_scores in zip(batch, models, risk_scores):
+                if model is None:
+                    print('Excepted ', features_subset)
+                    continue
+
+                model.risk_scores_ = model_risk_scores
+                yield features_subset, model, {}
+
+    def check_if_model_supports_batches(self):
+        """Check if models can be fitted in batches.
+
+        Returns
+        -------
+        bool
+        """
+        return self.model == FastCoxRegression and not self.model_cv_ranges and not self.preprocessor
@@ -0,0 +1,132 @@
+"""Fused survival scoring
+
+Risk scores (linear predictor of a Cox model) are calculated once per
+dataset, and all registered survival scoring functions are derived from
+them and from the high / low risk grouping by median risk score.
+
+To add custom scoring function to the fused path, register its
+implementation accepting SurvivalPredictions object:
+
+@register_survival_score(my_score)
+def fused_my_score(predictions):
+    # Code
+    return score
+"""
+
+import numpy as np
+from lifelines.utils import concordance_index as lifelines_concordance_index
+from sksurv.metrics import cumulative_dynamic_auc
+
+from src.core.regression.accuracy_scores import \
+    concordance_index, \
+    dynamic_auc, \
+    hazard_ratio, \
+    logrank
+from src.core.regression.accuracy_scores.hazard_ratio import groups_hazard_ratio
+from src.core.regression.accuracy_scores.logrank_test import groups_logrank
+from src.core.regression.utils import structure_y_to_sksurv
+
+# Mapping from scoring function to its fused implementation
+SURVIVAL_SCORES = {}
+
+
+def register_survival_score(score_function):
+    """Register fused implementation of a survival scoring function.
+
+    Parameters
+    ----------
+    score_function : callable
+        Scoring function (as it is passed to scoring_functions).
+
+    Returns
+    -------
+    callable
+        Decorator for a function which accepts SurvivalPredictions
+        object and returns a score.
+    """
+    def decorator(fused_function):
+        SURVIVAL_SCORES[score_function] = fused_function
+        return fused_function
+
+    return decorator
+
+
+def get_risk_scores(model, x):
+    """Linear predictor of a model with coefs attribute."""
+    if hasattr(x, 'to_numpy'):
+        x = x.to_numpy()
+
+    return np.asarray(x).dot(model.coefs.to_numpy())
+
+
+class SurvivalPredictions:
+    """Risk scores of a single dataset together with everything
+    derived from them and shared by scoring functions.
+    """
+    def __init__(self, y_true, risk_scores, y_train=None):
+        """Class constructor
+
+        Parameters
+        ----------
+        y_true : pandas.DataFrame
+            DataFrame with Event and Time to event columns.
+        risk_scores : numpy.ndarray
+            Predicted risk scores (linear predictor).
+        y_train : pandas.DataFrame
+            Training Event and Time to event, required by dynamic AUC.
+        """
+        self.y_true = y_true
+        self.y_train = y_train
+        self.risk_scores = risk_scores
+
+        self.event = y_true['Event'].to_numpy()
+        self.time = y_true['Time to event'].to_numpy()
+        self.group_indicators = risk_scores >= np.median(risk_scores)
+
+        self._structured_y_true = None
+        self._structured_y_train = None
+
+    @property
+    def structured_y_true(self):
+        if self._structured_y_true is None:
+            self._structured_y_true = structure_y_to_sksurv(self.y_true)
+        return self._structured_y_true
+
+    @property
+    def structured_y_train(self):
+        if self._structured_y_train is None:
+            self._structured_y_train = structure_y_to_sksurv(self.y_train)
+        return self._structured_y_train
+
+    def score(self, score_function):
+        """Calculate a registered scoring function."""
+        return SURVIVAL_SCORES[score_function](self)
+
+
+@register_survival_score(concordance_index)
+def fused_concordance_index(predictions):
+    return lifelines_concordance_index(
+        event_times=predictions.time,
+        predicted_scores=-predictions.risk_scores,
+        event_observed=predictions.event,
+    )
+
+
+@register_survival_score(dynamic_auc)
+def fused_dynamic_auc(predictions, year=3):
+    return cumulative_dynamic_auc(
+        predictions.structured_y_train,
+        predictions.structured_y_true,
+        predictions.risk_scores,
+        [year * 365],
+    )[0][0]
+
+
+@register_survival_score(hazard_ratio)
+def fused_hazard_ratio(predictions):
+    return groups_hazard_ratio(predictions.event, predictions.time, predictions.group_indicators)
+
+
+@register_survival_score(logrank)
+def fused_logrank(predictions):
+    return groups_logrank(predictions.structured_y_true, predictions.group_indicators)
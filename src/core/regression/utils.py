@@ -3,10 +3,11 @@ from lifelines import KaplanMeierFitter
 
 
 def structure_y_to_sksurv(y):
-    return np.array(
-        [(bool(a[0]), a[1]) for a in y[['Event', 'Time to event']].to_numpy()],
-        dtype=[('event', '?'), ('time', '<f8')],
-    )
+    structured_y = np.empty(len(y), dtype=[('event', '?'), ('time', '<f8')])
+    structured_y['event'] = y['Event'].to_numpy().astype(bool)
+    structured_y['time'] = y['Time to event'].to_numpy()
+
+    return structured_y
 
 
 def plot_kaplan_mayer(y, label):
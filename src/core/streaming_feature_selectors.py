@@ -0,0 +1,18 @@
+"""Functions for out-of-core feature selection
+
+Every streaming feature selection function takes path to csv data
+table, annotation DataFrame, number n and some optional arguments,
+reads the data by chunks (so the whole table is never loaded into
+memory) and returns a list of n features which is a subset of
+data table column names.
+
+Each streaming feature selection function have the following signature:
+def streaming_feature_selector(data_path, ann, n, **kwargs):
+    # Code
+    return n_element_list_of_features
+"""
+
+from .classification.streaming_feature_selectors import \
+    t_test, \
+    f_test, \
+    spearman_correlation
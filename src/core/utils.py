@@ -2,8 +2,13 @@
 Commonly used utils
 """
 
+import os
+import math
 import inspect
 import numpy as np
+import pandas as pd
+
+from src.core import data_store
 
 
 def get_datasets(ann, datasets=None):
@@ -30,6 +35,71 @@ def get_datasets(ann, datasets=None):
     return datasets
 
 
+def cast_data(df, dtype, rtol=1e-5, chunksize=1000):
+    """Cast data matrix to a given dtype (e.g. float32) checking
+    that values are preserved within a tolerance
+
+    Data is cast by chunks of features. Data memory-mapped from a binary
+    store (see data_store.py) is cast to a temporary store, so the matrix
+    is never loaded into memory as a whole.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A pandas DataFrame whose rows represent samples
+        and columns represent features.
+    dtype : str
+        Target data type.
+    rtol : float
+        Maximal allowed absolute error of each value relative
+        to the maximal absolute value of its feature.
+    chunksize : int
+        Number of features cast at once.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame of the given dtype (df itself if no cast is needed).
+    """
+    dtype = np.dtype(dtype)
+    if (df.dtypes == dtype).all():
+        return df
+
+    store_dir = df.attrs.get('data_store')
+    if store_dir:
+        fingerprint = '{}-{}'.format(df.attrs.get('fingerprint'), dtype)
+        store_dir, data = data_store.create_temporary_store(store_dir, df.columns, df.index, dtype, fingerprint)
+        # Samples x features view of the memory map
+        cast = data.T
+    else:
+        cast = np.empty(df.shape, dtype=dtype, order='F')
+
+    for start in range(0, len(df.columns), chunksize):
+        values = df.iloc[:, start:start + chunksize].to_numpy(dtype=float)
+        cast_values = values.astype(dtype)
+
+        # Check the cast values: no overflow, round trip within tolerance
+        with np.errstate(invalid='ignore'):
+            error = np.abs(cast_values.astype(float) - values)
+        scale = np.nanmax(np.abs(values), axis=0, initial=0)
+        bad = (np.isfinite(values) & ~np.isfinite(cast_values)) | (error > rtol * scale)
+        if bad.any():
+            feature = df.columns[start + np.nonzero(bad.any(axis=0))[0][0]]
+            raise ValueError(f'Casting data to {dtype} changes values of feature {feature} beyond tolerance {rtol}')
+
+        cast[:, start:start + chunksize] = cast_values
+
+    if store_dir:
+        data.flush()
+        del data, cast
+        return data_store.read_data_store(store_dir)
+
+    cast = pd.DataFrame(cast, index=df.index, columns=df.columns, copy=False)
+    cast.attrs.update(df.attrs)
+
+    return cast
+
+
 def check_if_func_accepts_arg(func, arg):
     for param in inspect.signature(func).parameters:
         if param == arg:
@@ -38,6 +108,166 @@ def check_if_func_accepts_arg(func, arg):
     return False
 
 
+def get_available_cores():
+    """Number of CPU cores available to the current process."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+
+def unrank_combination(rank, n, k):
+    """k-combination of range(n) with the given rank in lexicographic
+    order (the order of itertools.combinations)
+
+    Parameters
+    ----------
+    rank : int
+        Rank of combination, 0 <= rank < C(n, k).
+    n : int
+        Number of elements.
+    k : int
+        Length of combination.
+
+    Returns
+    -------
+    list
+        Sorted list of k indices.
+    """
+    combination = []
+    start = 0
+    for i in range(k, 0, -1):
+        # Number of combinations of the remaining elements beginning
+        # before x is C(n - start, i) - C(n - x, i); the first element
+        # is the smallest x for which it exceeds rank (binary search)
+        total = math.comb(n - start, i)
+        low, high = start, n - i
+        while low < high:
+            x = (low + high) // 2
+            if total - math.comb(n - x - 1, i) > rank:
+                high = x
+            else:
+                low = x + 1
+
+        rank -= total - math.comb(n - low, i)
+        combination.append(low)
+        start = low + 1
+
+    return combination
+
+
+def rank_combination(combination, n):
+    """Rank of k-combination of range(n) in lexicographic order
+    (inverse of unrank_combination)
+
+    Parameters
+    ----------
+    combination : list
+        Sorted list of k indices.
+    n : int
+        Number of elements.
+
+    Returns
+    -------
+    int
+        Rank of combination.
+    """
+    rank = 0
+    start = 0
+    for i, x in zip(range(len(combination), 0, -1), combination):
+        # Combinations of the remaining elements beginning before x
+        rank += math.comb(n - start, i) - math.comb(n - x, i)
+        start = x + 1
+
+    return rank
+
+
+def count_cluster_combinations(sizes, k):
+    """Numbers of combinations with at most one element from each
+    cluster (elementary symmetric polynomials of cluster sizes)
+
+    Parameters
+    ----------
+    sizes : list
+        Sizes of clusters.
+    k : int
+        Length of combination.
+
+    Returns
+    -------
+    list
+        counts[j][i] is the number of i-combinations of elements
+        of clusters j, j + 1, ...; counts[0][k] is the total number.
+    """
+    counts = [[1] + [0] * k for _ in range(len(sizes) + 1)]
+    for j in range(len(sizes) - 1, -1, -1):
+        for i in range(1, k + 1):
+            counts[j][i] = counts[j + 1][i] + sizes[j] * counts[j + 1][i - 1]
+
+    return counts
+
+
+def unrank_cluster_combination(rank, sizes, counts):
+    """k-combination with at most one element from each cluster with
+    the given rank in the order of enumeration: combinations of clusters
+    in lexicographic order (itertools.combinations), elements of each of
+    them in the order of itertools.product
+
+    Parameters
+    ----------
+    rank : int
+        Rank of combination, 0 <= rank < counts[0][k].
+    sizes : list
+        Sizes of clusters.
+    counts : list
+        Output of count_cluster_combinations(sizes, k).
+
+    Returns
+    -------
+    list
+        List of k (cluster index, element index) pairs.
+    """
+    clusters = []
+    i = len(counts[0]) - 1
+    # Combinations beginning with the chosen clusters are
+    # weight times more than combinations of the remaining ones
+    weight = 1
+    for j, size in enumerate(sizes):
+        if i == 0:
+            break
+        n_included = weight * size * counts[j + 1][i - 1]
+        if rank < n_included:
+            clusters.append(j)
+            weight *= size
+            i -= 1
+        else:
+            rank -= n_included
+
+    # Elements of the chosen clusters (the first one changes slowest)
+    elements = []
+    for j in reversed(clusters):
+        rank, element = divmod(rank, sizes[j])
+        elements.append(element)
+
+    return list(zip(clusters, reversed(elements)))
+
+
+def next_combination(combination, n):
+    """Next k-combination of range(n) in lexicographic order
+    (None for the last one)
+    """
+    combination = list(combination)
+    k = len(combination)
+    for i in range(k - 1, -1, -1):
+        if combination[i] < n - k + i:
+            combination[i] += 1
+            for j in range(i + 1, k):
+                combination[j] = combination[j - 1] + 1
+            return combination
+
+    return None
+
+
 def seconds_to_hours(seconds):
     return seconds / 3600
 
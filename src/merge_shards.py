@@ -0,0 +1,161 @@
+import re
+import csv
+import glob
+import heapq
+import math
+
+from .utils import *
+from .core.base.base import SUMMARY_N_K_AGGREGATIONS
+
+
+def find_shard_files(shard_dirs, name):
+    """Paths to shard tables of all N shards of a run, sorted
+    by shard number (so ties are merged in the order of a single run).
+
+    Raises ValueError if a shard is missing or found twice,
+    or if shards of different runs (numbers N) are mixed.
+    """
+    shards = {}
+    for shard_dir in shard_dirs:
+        for path in glob.glob(os.path.join(shard_dir, f"{name}_shard_*_of_*.csv")):
+            match = re.fullmatch(rf"{re.escape(name)}_shard_(\d+)_of_(\d+)\.csv", os.path.basename(path))
+            if match:
+                shards.setdefault(tuple(map(int, match.groups())), []).append(path)
+
+    n_shards = sorted({n_shards for _, n_shards in shards})
+    if not n_shards:
+        raise ValueError("No shard {} tables found in {}".format(name, ", ".join(shard_dirs)))
+    if len(n_shards) > 1:
+        raise ValueError("Shard {} tables of runs with different numbers of shards: {}".format(
+            name, ", ".join(map(str, n_shards)),
+        ))
+    n_shards = n_shards[0]
+
+    duplicates = [paths for paths in shards.values() if len(paths) > 1]
+    if duplicates:
+        raise ValueError("Shard {} table is found more than once: {}".format(name, ", ".join(duplicates[0])))
+
+    invalid = sorted(i for i, _ in shards if not 1 <= i <= n_shards)
+    if invalid:
+        raise ValueError("Invalid shard numbers of {} tables: {}".format(name, ", ".join(map(str, invalid))))
+
+    missing = [i for i in range(1, n_shards + 1) if (i, n_shards) not in shards]
+    if missing:
+        raise ValueError("{} tables of shards {} of {} are missing".format(
+            name, ", ".join(map(str, missing)), n_shards,
+        ))
+
+    return [shards[(i, n_shards)][0] for i in range(1, n_shards + 1)]
+
+
+class ShardReader:
+    """Row-by-row reader of a shard models table
+    which allows to peek at the next row.
+    """
+    def __init__(self, path):
+        self.file = open(path, "r", newline="")
+        self.reader = csv.reader(self.file)
+        self.header = next(self.reader)
+        self.row = next(self.reader, None)
+
+    def read_n_k(self, n, k, n_index, k_index):
+        """Iterate over rows of n, k pair (rows are grouped by n, k)."""
+        while self.row is not None and int(self.row[n_index]) == n and int(self.row[k_index]) == k:
+            row, self.row = self.row, next(self.reader, None)
+            yield row
+
+    def close(self):
+        self.file.close()
+
+
+def get_sort_key(training_indices):
+    """Rows are sorted by training scores in descending order, NaNs last."""
+    def sort_key(row):
+        values = [float(row[i]) if row[i] else math.nan for i in training_indices]
+        return tuple(math.inf if math.isnan(value) else -value for value in values)
+
+    return sort_key
+
+
+def merge_summary_n_k(shard_dirs, output_dir):
+    summaries = [pd.read_csv(path) for path in find_shard_files(shard_dirs, "summary_n_k")]
+    summary_n_k = pd.concat(summaries, axis=0)
+
+    columns = [column for column in summary_n_k.columns if column not in ["n", "k"]]
+    unknown_columns = [column for column in columns if column not in SUMMARY_N_K_AGGREGATIONS]
+    if unknown_columns:
+        raise ValueError("Don't know how to merge summary_n_k columns: {}".format(", ".join(unknown_columns)))
+
+    aggregations = {column: SUMMARY_N_K_AGGREGATIONS[column] for column in columns}
+    summary_n_k = summary_n_k.groupby(["n", "k"], sort=False).agg(aggregations).reset_index()
+    summary_n_k["percentage_reliable"] = [
+        all_num / tf_num * 100 if tf_num != 0 else 0
+        for tf_num, all_num in zip(summary_n_k["num_training_reliable"], summary_n_k["num_validation_reliable"])
+    ]
+    summary_n_k.to_csv("{}/summary_n_k.csv".format(output_dir), index=None)
+
+    return summary_n_k
+
+
+def main(mode, shard_dirs, output_dir):
+    """Merge shard outputs of exhaufs build into models.csv,
+    summary_n_k.csv and summary_features.csv
+
+    Models tables are merged row by row, so they are never
+    loaded into memory as a whole.
+
+    Parameters
+    ----------
+    mode : str
+        classifiers or regressors.
+    shard_dirs : list
+        List of output directories of shard runs.
+    output_dir : str
+        Path to output directory.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    summary_n_k = merge_summary_n_k(shard_dirs, output_dir)
+
+    readers = [ShardReader(path) for path in find_shard_files(shard_dirs, "models")]
+    header = readers[0].header
+    n_index, k_index = header.index("n"), header.index("k")
+    sort_key = get_sort_key([i for i, column in enumerate(header) if "Training" in column])
+
+    feature_counts = {}
+    num_models = 0
+    with open("{}/models.csv".format(output_dir), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for n, k in zip(summary_n_k["n"], summary_n_k["k"]):
+            rows = heapq.merge(*[reader.read_n_k(n, k, n_index, k_index) for reader in readers], key=sort_key)
+            for row in rows:
+                writer.writerow(row)
+                num_models += 1
+                for feature in row[0].split(";"):
+                    feature_counts[feature] = feature_counts.get(feature, 0) + 1
+
+    for reader in readers:
+        reader.close()
+
+    # Summary table #2: for each feature calculate
+    # percentage of reliable models which use it
+    column = "percentage_{}".format(mode)
+    summary_features = pd.DataFrame(
+        {column: feature_counts.values()},
+        index=feature_counts.keys()
+    )
+    summary_features[column] *= 100 / num_models if num_models else 1
+    summary_features = summary_features.sort_values(column, ascending=False)
+    summary_features.index.name = "gene"
+
+    summary_features.to_csv("{}/summary_features.csv".format(output_dir))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Please specify mode, output directory and shard directories", file=sys.stderr)
+        sys.exit(1)
+
+    main(sys.argv[1], sys.argv[3:], sys.argv[2])
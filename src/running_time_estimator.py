@@ -1,58 +1,83 @@
 # External imports
+import random
+import numpy as np
 
 # Internal imports
 from src.utils import *
+from src.core.cost_model import CostModel
 
+# Maximal number of subset lengths timed by the estimator
+N_PROBES = 8
 
-def main(config_path, max_k, max_estimated_time, n_feature_subsets, is_regressor):
+
+def get_probe_ks(max_k, n_probes=N_PROBES):
+    """Subset lengths evenly spread over 1...max_k."""
+    return sorted(set(np.linspace(1, max_k, min(max_k, n_probes)).round().astype(int)))
+
+
+def main(config_path, max_k, max_estimated_time, n_feature_subsets, is_regressor, confidence=0.95):
     config, df, ann, n_k = load_config_and_input_data(config_path, load_n_k=False)
-    config["limit_feature_subsets"] = True
-    config["shuffle_feature_subsets"] = True
-    config["n_feature_subsets"] = n_feature_subsets
 
     if is_regressor:
         model = initialize_regression_model(config, df, ann, n_k)
     else:
         model = initialize_classification_model(config, df, ann, n_k)
 
-    def get_running_time(n, k):
-        _, time = model.exhaustive_run_n_k(n, k)
-        return model.estimate_run_n_k_time(n, k, time)
+    features = model.select_features(df.shape[1])
+    max_k = min(max_k, len(features))
+
+    if model.n_processes == "auto":
+        # Benchmark on subsets of the largest probed length
+        model.n_k = pd.DataFrame([{"n": len(features), "k": max_k}])
+        model.choose_n_processes()
+
+    # Time n_feature_subsets random subsets of each probed length once;
+    # features of each subset are ordered by rank as in the pipeline,
+    # so the cached evaluations can be reused by it
+    rng = random.Random(config["random_state"])
+    rank = {feature: i for i, feature in enumerate(features)}
+    feature_subsets = [
+        sorted(rng.sample(features, k), key=rank.get)
+        for k in get_probe_ks(max_k)
+        for _ in range(n_feature_subsets)
+    ]
+    chunk_results = model.map_over_chunks(model.time_feature_subsets, feature_subsets)
+    timings = [timing for chunk_timings, _ in chunk_results for timing in chunk_timings]
 
-    res = pd.DataFrame(columns=["n", "k", "Estimated time"])
+    # Evaluated subsets are not discarded: build seeds from them (if cache_dir is set)
+    evaluations = pd.concat([chunk_evaluations for _, chunk_evaluations in chunk_results], axis=0)
+    model.save_evaluations(evaluations)
+
+    n_samples = (ann['Dataset type'] == 'Training').sum()
+    cost_model = CostModel(model.get_n_fits_per_subset(), n_samples, model.n_processes, confidence)
+    cost_model.fit(*zip(*timings))
+
+    res = pd.DataFrame(columns=[
+        "n", "k", "Estimated time", "Estimated time low", "Estimated time high", "n low", "n high",
+    ])
     for k in range(1, max_k + 1):
-        # Search max n for which estimated run time of the pipeline for classifiers
-        # construction is less than max estimated time.
-        start = k
-        end = df.shape[1]
-
-        time = get_running_time(start, k)
-        if time >= max_estimated_time:
-            n = start
-        else:
-            time = get_running_time(end, k)
-            if time <= max_estimated_time:
-                n = end
-            else:
-                while start < end:  # binary search
-                    n = (start + end) // 2
-                    time = get_running_time(n, k)
-                    if n == start or n == end:
-                        break
-                    if time <= max_estimated_time:
-                        start = n
-                    else:
-                        end = n
-
-        res.loc[len(res)] = [n, k, time]
-
-    res["n"] = res["n"].astype(int)
-    res["k"] = res["k"].astype(int)
+        # Max n for which estimated run time of the pipeline is less than
+        # max estimated time (n low and n high are given by the bounds of
+        # confidence interval of time per subset)
+        mean, low, high = (t[0] for t in cost_model.predict_subset_time(k))
+        n = cost_model.get_max_n(k, max_estimated_time, len(features), mean)
+
+        res.loc[len(res)] = [
+            n, k, *cost_model.predict_time(n, k),
+            cost_model.get_max_n(k, max_estimated_time, len(features), high),
+            cost_model.get_max_n(k, max_estimated_time, len(features), low),
+        ]
+
+    for column in ["n", "k", "n low", "n high"]:
+        res[column] = res[column].astype(int)
 
     # Save results
     output_dir = config["output_dir"]
 
     res.to_csv("{}/estimated_times.csv".format(output_dir), index=False)
+    evaluations.to_csv("{}/pilot_models.csv".format(output_dir), index_label="features")
+
+    return res
 
 
 if __name__ == "__main__":
@@ -63,7 +88,7 @@ if __name__ == "__main__":
     config_path = sys.argv[1]
     max_k = int(sys.argv[2])
     max_estimated_time = float(sys.argv[3])  # In hours
-    n_feature_subsets = int(sys.argv[4])  # 100 is pretty good
+    n_feature_subsets = int(sys.argv[4])  # Per probed subset length
     is_regressor = int(sys.argv[5]) == 1 if len(sys.argv) > 5 else False  # 0 or 1
 
     main(config_path, max_k, max_estimated_time, n_feature_subsets, is_regressor)
@@ -9,9 +9,82 @@ from src.core.regression import regressors, regression
 from src.core import feature_pre_selectors
 from src.core import preprocessors
 from src.core import accuracy_scores, feature_selectors
+from src.core import streaming_feature_selectors
+from src.core import data_store
+from src.core.base import SearchOptions, PruningOptions, TimeBudgetOptions, ExecutionOptions
 from datetime import datetime
 
 
+def read_input_data(config, config_dirname, features=None):
+    """Read data and annotation given in configuration.
+
+    Parameters
+    ----------
+    config : dict
+        Configuration dictionary.
+    config_dirname : str
+        Directory of config file (paths are relative to it).
+    features : list
+        If given, only these features are read from a csv file.
+
+    Returns
+    -------
+    pd.DataFrame, pd.DataFrame
+        Data (df) and annotation (ann).
+    """
+    data_path = os.path.join(config_dirname, config["data_path"]).replace("\\","/")
+    annotation_path = os.path.join(config_dirname, config["annotation_path"]).replace("\\","/")
+    if data_store.has_annotation(annotation_path):
+        ann = data_store.read_annotation(annotation_path)
+    else:
+        ann = pd.read_csv(annotation_path, index_col=0)
+    if data_store.is_data_store(data_path):
+        # Binary store is memory-mapped, nothing is read until accessed
+        df = data_store.read_data_store(data_path)
+        ann.index = data_store.normalize_index(ann.index)
+    elif features is not None:
+        # Only given features (e.g. on a worker of distributed run)
+        index_name = pd.read_csv(data_path, nrows=0).columns[0]
+        df = pd.read_csv(data_path, index_col=0, usecols=[index_name, *features])[features]
+    elif config.get("streaming_feature_selector"):
+        # Rank features reading data by chunks, then load only top ones
+        streaming_feature_selector = getattr(streaming_feature_selectors, config["streaming_feature_selector"])
+        features = streaming_feature_selector(
+            data_path,
+            ann,
+            config["streaming_n_features"],
+            **config.get("streaming_feature_selector_kwargs", {}),
+        )
+        index_name = pd.read_csv(data_path, nrows=0).columns[0]
+        df = pd.read_csv(data_path, index_col=0, usecols=[index_name, *features])[features]
+    else:
+        df = pd.read_csv(data_path, index_col=0)
+
+    return df, ann
+
+
+def load_input_data(config_path, features=None):
+    """Load data and annotation of configuration file without
+    creating output directory (used by workers of distributed run).
+
+    Parameters
+    ----------
+    config_path : string
+        Path to config file (json).
+    features : list
+        If given, only these features are read from a csv file.
+
+    Returns
+    -------
+    pd.DataFrame, pd.DataFrame
+        Data (df) and annotation (ann).
+    """
+    with open(config_path, "r") as config_file:
+        config = json.load(config_file)
+
+    return read_input_data(config, os.path.dirname(config_path), features)
+
+
 def load_config_and_input_data(config_path, load_n_k=True):
     """Load configuration file and input data
     
@@ -43,8 +116,7 @@ def load_config_and_input_data(config_path, load_n_k=True):
 
     # Paths are absolute or relative to config file
     config_dirname = os.path.dirname(config_path)
-    df = pd.read_csv(os.path.join(config_dirname, config["data_path"]).replace("\\","/"), index_col=0)
-    ann = pd.read_csv(os.path.join(config_dirname, config["annotation_path"]).replace("\\","/"), index_col=0)
+    df, ann = read_input_data(config, config_dirname)
     if load_n_k:
         n_k = pd.read_csv(os.path.join(config_dirname, config["n_k_path"]).replace("\\","/"))
     else:
@@ -59,6 +131,9 @@ def load_config_and_input_data(config_path, load_n_k=True):
     copyfile(config_path, os.path.join(output_dir, 'config.json'))
 
     # Ensure paths in config are relative to config directory
+    if config.get("cache_dir"):
+        config["cache_dir"] = os.path.join(config_dirname, config["cache_dir"]).replace("\\","/")
+
     if "path_to_file" in config.get("feature_pre_selector_kwargs", {}):
         correct_path = os.path.join(config_dirname, config["feature_pre_selector_kwargs"]["path_to_file"]).replace("\\","/")
         config["feature_pre_selector_kwargs"]["path_to_file"] = correct_path
@@ -70,6 +145,44 @@ def load_config_and_input_data(config_path, load_n_k=True):
     return config, df, ann, n_k
 
 
+def initialize_strategy_options(config):
+    """Group configuration of search, pruning, time budget
+    and execution strategies into option objects.
+
+    Parameters
+    ----------
+    config : dict
+        Configuration dictionary.
+
+    Returns
+    -------
+    dict
+        Dict of keyword arguments (search, pruning, time_budget,
+        execution) for model initialization.
+    """
+    return {
+        "search": SearchOptions(
+            mode=config.get("search_mode", "exhaustive"),
+            beam_width=config.get("beam_width", 100),
+            halving_fraction=config.get("halving_fraction"),
+            halving_margin=config.get("halving_margin"),
+            cv_early_stopping=config.get("cv_early_stopping", False),
+        ),
+        "pruning": PruningOptions(
+            collapse_duplicate_features=config.get("collapse_duplicate_features", False),
+            correlation_threshold=config.get("correlation_threshold"),
+        ),
+        "time_budget": TimeBudgetOptions(hours=config.get("time_budget_hours")),
+        "execution": ExecutionOptions(
+            executor=config.get("executor", "multiprocessing"),
+            threads_per_process=config.get("threads_per_process"),
+            cpu_affinity=config.get("cpu_affinity"),
+            numa_replicas=config.get("numa_replicas", False),
+            shard=config.get("shard"),
+        ),
+    }
+
+
 def initialize_classification_model(config, df, ann, n_k):
     """Run the pipeline for classifier construction
     using exhaustive feature selection.
@@ -121,6 +234,10 @@ def initialize_classification_model(config, df, ann, n_k):
         n_processes=config.get("n_processes", 1),
         random_state=config["random_state"],
         verbose=config.get("verbose", True),
+        cache_dir=config.get("cache_dir"),
+        dtype=config.get("dtype"),
+        dtype_rtol=config.get("dtype_rtol", 1e-5),
+        **initialize_strategy_options(config),
     )
 
 
@@ -174,4 +291,8 @@ def initialize_regression_model(config, df, ann, n_k):
         n_processes=config.get("n_processes", 1),
         random_state=config["random_state"],
         verbose=config.get("verbose", True),
+        cache_dir=config.get("cache_dir"),
+        dtype=config.get("dtype"),
+        dtype_rtol=config.get("dtype_rtol", 1e-5),
+        **initialize_strategy_options(config),
     )
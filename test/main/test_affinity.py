@@ -0,0 +1,140 @@
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from unittest import mock
+
+from src.core import accuracy_scores, affinity
+from src.core.executors import EXECUTORS
+from src.core.data_store import write_data_store, read_data_store
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+from src.core.base import ExecutionOptions
+
+
+class TestWorkerSlots(unittest.TestCase):
+    def test_parse_cpulist(self):
+        self.assertEqual(affinity.parse_cpulist('0-3,8,10-11\n'), [0, 1, 2, 3, 8, 10, 11])
+
+    def test_policies(self):
+        nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+        with mock.patch.object(affinity, 'get_numa_nodes', return_value=nodes):
+            self.assertEqual(
+                affinity.get_worker_slots(4, 2, 'spread'),
+                [(0, [0, 1]), (1, [4, 5]), (0, [2, 3]), (1, [6, 7])],
+            )
+            self.assertEqual(
+                affinity.get_worker_slots(3, 2, 'compact'),
+                [(0, [0, 1]), (0, [2, 3]), (1, [4, 5])],
+            )
+            with self.assertRaises(ValueError):
+                affinity.get_worker_slots(2, 1, 'random')
+
+
+class TestPinnedWorkers(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        random.seed(0)
+        self.n_samples = 60
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(6)
+        })
+        self.data.index = [f'sample_{i}' for i in range(self.n_samples)]
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+        self.ann.index = self.data.index
+
+        self.data.to_csv(f'{self.tmp_dir}/data.csv')
+        self.store_dir = f'{self.tmp_dir}/store'
+        write_data_store(f'{self.tmp_dir}/data.csv', self.store_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_model(self, n_processes, **kwargs):
+        return ExhaustiveClassification(
+            df=read_data_store(self.store_dir),
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 2}, {'n': 6, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=SVC,
+            model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.0,
+            n_processes=n_processes,
+            random_state=0,
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_same_results(self):
+        rhs = self.get_model(1).exhaustive_run()
+        # Worker stats are saved only with cpu_affinity
+        self.assertFalse(os.path.exists(f'{self.tmp_dir}/workers.csv'))
+        available = os.sched_getaffinity(0)
+
+        for executor in EXECUTORS:
+            execution = ExecutionOptions(executor=executor, cpu_affinity='spread', numa_replicas=True)
+            model = self.get_model(2, execution=execution)
+            lhs = model.exhaustive_run()
+            self.assertTrue(lhs.equals(rhs), executor)
+
+            workers = pd.read_csv(f'{self.tmp_dir}/workers.csv')
+            self.assertEqual(workers.groupby('k')['num_subsets'].sum().to_dict(), {2: 15, 3: 20})
+            if executor != 'serial':
+                # Pinned to available cores
+                self.assertTrue(all(
+                    {int(core) for core in cores.split()} <= available
+                    for cores in workers['cores'].astype(str)
+                ))
+
+            if executor in ['multiprocessing', 'process_pool', 'joblib']:
+                # Node-local replica of data store is created once per node
+                self.assertIn('node_0.npy', os.listdir(model._replica_dir))
+            else:
+                self.assertIsNone(model._replica_dir)
+
+        # Process is not pinned itself
+        self.assertEqual(os.sched_getaffinity(0), available)
+
+    def test_replicas(self):
+        shared_path = f'{self.store_dir}/data.npy'
+        replica_dir = f'{self.tmp_dir}/replicas'
+        os.makedirs(replica_dir)
+
+        path = affinity.make_replica(self.store_dir, replica_dir, 0)
+        self.assertTrue(np.array_equal(np.load(path), np.load(shared_path)))
+        self.assertEqual(affinity.make_replica(self.store_dir, replica_dir, 0), path)
+
+        # Lock of a dead worker
+        process = subprocess.Popen(['true'])
+        process.wait()
+        with open(f'{replica_dir}/node_1.npy.lock', 'w') as f:
+            f.write(str(process.pid))
+        self.assertEqual(affinity.make_replica(self.store_dir, replica_dir, 1), shared_path)
+
+        # Lock of a worker which does not finish the copy in time
+        with open(f'{replica_dir}/node_2.npy.lock', 'w') as f:
+            f.write(str(os.getpid()))
+        self.assertEqual(affinity.make_replica(self.store_dir, replica_dir, 2, timeout=0.2), shared_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
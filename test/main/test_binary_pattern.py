@@ -0,0 +1,125 @@
+import random
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.preprocessors import *
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+
+
+class TestBinaryPatternClassifier(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 200
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(10)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def majority_vote(self, X, y, X_test, class_weight):
+        patterns = [tuple(row) for row in X]
+        weights = {c: 1.0 for c in [0, 1]}
+        if class_weight == 'balanced':
+            weights = {c: len(y) / (2 * np.sum(y == c)) for c in [0, 1]}
+
+        counts = {}
+        for pattern, label in zip(patterns, y):
+            counts.setdefault(pattern, np.zeros(2))[label] += 1
+        scores = {pattern: count * [weights[0], weights[1]] for pattern, count in counts.items()}
+        default = np.array([np.sum(y == 0) * weights[0], np.sum(y == 1) * weights[1]])
+
+        # Ties are broken by total class weights, then by the first class
+        return np.array([
+            max([0, 1], key=lambda c: (scores.get(tuple(row), default)[c], default[c], -c))
+            for row in X_test
+        ])
+
+    def test_same_as_majority_vote(self):
+        y = self.ann['Class'].to_numpy()
+        for k in [1, 4, 17]:
+            X = (self.data.iloc[:, :1].to_numpy() < np.linspace(0.1, 0.9, k)).astype(int)
+            X_test = np.array([[random.randint(0, 1) for _ in range(k)] for _ in range(50)])
+            for class_weight in [None, 'balanced']:
+                model = BinaryPatternClassifier(class_weight=class_weight).fit(X, y)
+
+                self.assertTrue(np.array_equal(
+                    model.predict(X_test),
+                    self.majority_vote(X, y, X_test, class_weight),
+                ))
+                self.assertTrue(np.allclose(model.predict_proba(X_test).sum(axis=1), 1))
+
+    def test_non_binary(self):
+        with self.assertRaises(ValueError):
+            BinaryPatternClassifier().fit(self.data.to_numpy(), self.ann['Class'].to_numpy())
+
+    def test_ties(self):
+        X = np.array([[0], [0], [1], [1], [1]])
+        y = np.array([0, 1, 0, 1, 1])
+        # Cell 0 is a tie, class 1 has a larger prior
+        self.assertTrue(np.array_equal(BinaryPatternClassifier().fit(X, y).predict([[0], [1]]), [1, 1]))
+        # Equal priors: first class
+        balanced = BinaryPatternClassifier(class_weight='balanced').fit(X[:4], y[:4])
+        self.assertTrue(np.array_equal(balanced.predict([[0], [1]]), [0, 0]))
+
+    def get_model(self, **kwargs):
+        return ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=feature_selectors.t_test,
+            feature_selector_kwargs={},
+            preprocessor=KBinsDiscretizer,
+            preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+            model=BinaryPatternClassifier,
+            model_kwargs={'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.0,
+            random_state=0,
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_run(self):
+        res = self.get_model().exhaustive_run()
+
+        self.assertEqual(len(res), 20)
+
+    def test_packed_features(self):
+        # Features are preprocessed and packed once, not for every subset
+        with mock.patch.object(BinaryPatternClassifier, 'fit', autospec=True) as fit, \
+                mock.patch.object(ExhaustiveClassification, 'preprocess', autospec=True) as preprocess, \
+                mock.patch.object(
+                    ExhaustiveClassification, 'preprocess_columns', autospec=True,
+                    side_effect=ExhaustiveClassification.preprocess_columns,
+                ) as preprocess_columns:
+            lhs = self.get_model(n_processes=1).exhaustive_run()
+        fit.assert_not_called()
+        preprocess.assert_not_called()
+        self.assertEqual(preprocess_columns.call_count, 1)
+
+        with mock.patch.object(ExhaustiveClassification, 'check_if_model_supports_packing', return_value=False):
+            rhs = self.get_model(n_processes=1).exhaustive_run()
+        pd.testing.assert_frame_equal(lhs, rhs)
+
+
+if __name__ == '__main__':
+    unittest.main()
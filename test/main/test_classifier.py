@@ -1,5 +1,6 @@
 import os
 import random
+import tempfile
 import unittest
 import pandas as pd
 
@@ -8,14 +9,16 @@ from src.core.preprocessors import *
 from src.core.classification.classifiers import *
 from src.core.classification.classification import ExhaustiveClassification
 
-random.seed(0)
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TMP_DIR = f'{BASE_DIR}/tmp'
 
 
 class TestClassifier(unittest.TestCase):
     def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
         self.n_samples = 100
         self.data = pd.DataFrame.from_dict({
             f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
@@ -36,7 +39,7 @@ class TestClassifier(unittest.TestCase):
             df=self.data,
             ann=self.ann,
             n_k=self.n_k_grid,
-            output_dir=TMP_DIR,
+            output_dir=self.tmp_dir,
             feature_pre_selector=None,
             feature_pre_selector_kwargs={},
             feature_selector=feature_selectors.t_test,
@@ -70,6 +73,4 @@ class TestClassifier(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    if not os.path.isdir(TMP_DIR):
-        os.makedirs(TMP_DIR)
     unittest.main()
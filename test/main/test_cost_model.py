@@ -0,0 +1,155 @@
+import random
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from unittest import mock
+from scipy.special import binom
+
+from src.core import accuracy_scores
+from src.core.cost_model import CostModel
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+
+
+class TestCostModel(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+        self.alpha, self.beta = 1e-3, 2e-5
+        self.cost_model = CostModel(n_fits=46, n_samples=50, n_processes=4)
+
+    def get_timings(self, noise):
+        k = np.repeat([1, 3, 5, 8], 20)
+        n_subsets = self.rng.randint(1, 6, len(k))
+        time_per_subset = 46 * (self.alpha + self.beta * k * 50)
+        times = n_subsets * time_per_subset * (1 + noise * self.rng.randn(len(k)) / np.sqrt(n_subsets))
+        return k, n_subsets, times
+
+    def test_fit(self):
+        self.cost_model.fit(*self.get_timings(noise=0))
+
+        self.assertTrue(np.allclose(self.cost_model.coef_, [self.alpha, self.beta]))
+        mean, low, high = self.cost_model.predict_subset_time(10)
+        self.assertTrue(np.allclose(mean, 46 * (self.alpha + self.beta * 10 * 50)))
+        self.assertTrue(np.allclose(low, mean) and np.allclose(high, mean))
+
+    def test_confidence_interval(self):
+        # 95% intervals cover the true time in about 95% of experiments
+        true_time = 46 * (self.alpha + self.beta * 6 * 50)
+        n_covered = 0
+        for _ in range(200):
+            self.cost_model.fit(*self.get_timings(noise=0.1))
+            mean, low, high = (t[0] for t in self.cost_model.predict_subset_time(6))
+            self.assertTrue(low < mean < high)
+            n_covered += low < true_time < high
+        self.assertTrue(0.9 <= n_covered / 200 <= 0.99)
+
+        # Running time of (n, k) pair in hours
+        mean_hours, low_hours, high_hours = self.cost_model.predict_time(20, 6)
+        self.assertAlmostEqual(mean_hours, binom(20, 6) * mean / 4 / 3600)
+        self.assertTrue(low_hours < mean_hours < high_hours)
+
+    def test_max_n(self):
+        self.cost_model.fit(*self.get_timings(noise=0))
+
+        for k in [1, 2, 5]:
+            for max_time in [1e-4, 0.01, 1]:
+                n = self.cost_model.get_max_n(k, max_time, 200)
+                # Same as linear search
+                expected = max([k] + [
+                    n for n in range(k, 201)
+                    if self.cost_model.predict_time(n, k)[0] <= max_time
+                ])
+                self.assertEqual(n, expected)
+
+
+class TestPilotTimings(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 60
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(6)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def get_model(self, scores=('TPR', 'TNR', 'min_TPR_TNR'), **kwargs):
+        return ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 2}, {'n': 5, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=SVC,
+            model_kwargs={'kernel': 'linear'},
+            model_cv_ranges={'C': [0.1, 1.0, 10.0]},
+            model_cv_folds=3,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in scores},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.5,
+            random_state=0,
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_time_feature_subsets(self):
+        model = self.get_model()
+        features = model.select_features(6)
+        feature_subsets = [features[:1]] * 7 + [features[:3]] * 2
+
+        timings, evaluations = model.time_feature_subsets(feature_subsets, batch_size=5)
+
+        self.assertEqual([(k, n) for k, n, _ in timings], [(1, 5), (1, 2), (3, 2)])
+        self.assertEqual(evaluations.index.to_list(), [features[0], features[0], ';'.join(features[:3])])
+        self.assertTrue(all(spent_time > 0 for _, _, spent_time in timings))
+        self.assertEqual(model.get_n_fits_per_subset(), 10)
+
+    def test_seeding(self):
+        # SVC with ROC AUC needs probability=True, which must not change the cache key
+        for scores in [('TPR', 'TNR', 'min_TPR_TNR'), ('TPR', 'TNR', 'min_TPR_TNR', 'ROC_AUC')]:
+            with self.subTest(scores=scores):
+                self.assert_seeding(scores)
+
+    def assert_seeding(self, scores):
+        rhs = self.get_model(scores).exhaustive_run()
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            pilot_model = self.get_model(scores, cache_dir=cache_dir)
+            features = pilot_model.select_features(6)
+            feature_subsets = [features[:2], features[1:3], features[2:5], features[3:6], [features[0], features[5]]]
+            _, evaluations = pilot_model.time_feature_subsets(feature_subsets)
+            pilot_model.save_evaluations(evaluations)
+            self.assertNotIn('probability', pilot_model.model_kwargs)
+
+            model = self.get_model(scores, cache_dir=cache_dir)
+            model.fit_model = mock.Mock(side_effect=model.fit_model)
+            lhs = model.exhaustive_run()
+
+            # Seeded subsets are not refit
+            self.assertEqual(model.n_k_stats[(6, 2)]['num_seeded_subsets'], 3)
+            self.assertEqual(model.n_k_stats[(5, 3)]['num_seeded_subsets'], 1)
+            self.assertEqual(model.fit_model.call_count, 15 + 10 - 4)
+
+            # Different settings do not share the cache
+            model = self.get_model(scores, cache_dir=cache_dir, dtype='float32')
+            model.exhaustive_run()
+            self.assertEqual(model.n_k_stats, {})
+
+        self.assertTrue(lhs.astype(float).equals(rhs.astype(float)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.utils import cast_data
+from src.core.data_store import write_data_store, read_data_store, read_annotation, is_data_store
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+
+
+class TestDataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        random.seed(0)
+        self.n_samples = 60
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(8)
+        })
+        self.data.index = [f'sample_{i}' for i in range(self.n_samples)]
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+        self.ann.index = self.data.index
+
+        self.data.to_csv(f'{self.tmp_dir}/data.csv')
+        self.ann.to_csv(f'{self.tmp_dir}/annotation.csv')
+        self.store_dir = f'{self.tmp_dir}/store'
+        write_data_store(
+            f'{self.tmp_dir}/data.csv', self.store_dir,
+            annotation_path=f'{self.tmp_dir}/annotation.csv', chunksize=7,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_model(self, df, ann, n_processes, **kwargs):
+        return ExhaustiveClassification(
+            df=df,
+            ann=ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 2}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=feature_selectors.t_test,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=SVC,
+            model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.0,
+            n_processes=n_processes,
+            random_state=0,
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_round_trip(self):
+        df = read_data_store(self.store_dir)
+
+        self.assertTrue(df.equals(pd.read_csv(f'{self.tmp_dir}/data.csv', index_col=0)))
+        self.assertTrue(read_annotation(self.store_dir).equals(self.ann))
+        # Read-only memory map, not a copy
+        self.assertFalse(df.to_numpy().flags.writeable)
+
+    def test_integer_samples(self):
+        self.data.index = self.ann.index = range(self.n_samples)
+        self.data.to_csv(f'{self.tmp_dir}/data.csv')
+        self.ann.to_csv(f'{self.tmp_dir}/annotation.csv')
+        write_data_store(f'{self.tmp_dir}/data.csv', self.store_dir, annotation_path=f'{self.tmp_dir}/annotation.csv')
+
+        df, ann = read_data_store(self.store_dir), read_annotation(self.store_dir)
+        self.assertTrue(df.index.equals(ann.index))
+        lhs = self.get_model(df, ann, 1).exhaustive_run()
+        rhs = self.get_model(self.data, self.ann, 1).exhaustive_run()
+        self.assertTrue(lhs.equals(rhs))
+
+    def test_pickle(self):
+        model = self.get_model(read_data_store(self.store_dir), self.ann, 1)
+        state = pickle.dumps(model)
+
+        # Data is not pickled, only the path to the store
+        in_memory_state = pickle.dumps(self.get_model(pd.read_csv(f'{self.tmp_dir}/data.csv', index_col=0), self.ann, 1))
+        self.assertLess(len(state), len(in_memory_state) - self.data.size * 8)
+        self.assertTrue(pickle.loads(state).df.equals(model.df))
+
+    def test_run(self):
+        lhs = self.get_model(read_data_store(self.store_dir), self.ann, 2).exhaustive_run()
+        rhs = self.get_model(pd.read_csv(f'{self.tmp_dir}/data.csv', index_col=0), self.ann, 1).exhaustive_run()
+
+        self.assertTrue(lhs.equals(rhs))
+
+    def test_float32(self):
+        df = pd.read_csv(f'{self.tmp_dir}/data.csv', index_col=0)
+        model = self.get_model(df, self.ann, 1, dtype='float32')
+        lhs = model.exhaustive_run()
+        rhs = self.get_model(df, self.ann, 1).exhaustive_run()
+
+        self.assertTrue((model.df.dtypes == 'float32').all())
+        self.assertTrue(lhs.index.equals(rhs.index))
+        self.assertTrue(np.allclose(lhs.to_numpy(dtype=float), rhs.to_numpy(dtype=float), atol=1e-6))
+
+    def test_cast_tolerance(self):
+        df = pd.read_csv(f'{self.tmp_dir}/data.csv', index_col=0)
+        df.iloc[0, 0] = 1e40
+
+        with self.assertRaises(ValueError):
+            cast_data(df, 'float32')
+        self.assertIs(cast_data(df, 'float64'), df)
+
+        # Round trip error of cast values
+        with self.assertRaises(ValueError):
+            cast_data(df.iloc[:, 1:], 'float32', rtol=1e-12)
+
+    def test_cast_store(self):
+        df = read_data_store(self.store_dir)
+        cast = cast_data(df, 'float32', chunksize=3)
+
+        # Cast to a temporary memory-mapped store, not to memory
+        self.assertTrue(is_data_store(cast.attrs['data_store']))
+        self.assertNotEqual(cast.attrs['data_store'], df.attrs['data_store'])
+        self.assertFalse(cast.to_numpy().flags.writeable)
+        self.assertTrue((cast.dtypes == 'float32').all())
+        self.assertTrue(cast.index.equals(df.index) and cast.columns.equals(df.columns))
+        self.assertTrue(np.allclose(cast.to_numpy(), df.to_numpy(), rtol=1e-6))
+
+        # Workers read the cast store
+        model = self.get_model(df, self.ann, 1, dtype='float32')
+        self.assertTrue(pickle.loads(pickle.dumps(model)).df.equals(model.df))
+
+
+if __name__ == '__main__':
+    unittest.main()
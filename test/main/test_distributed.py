@@ -0,0 +1,242 @@
+import os
+import random
+import tempfile
+import time
+import pickle
+import unittest
+import functools
+import itertools
+import multiprocessing
+import pandas as pd
+
+from multiprocessing.connection import Client
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.distributed import Coordinator, TaskError, run_worker, encode_feature_subsets, decode_feature_subsets
+from src.core.preprocessors import *
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+
+AUTHKEY = b'test'
+
+
+def run_lost_worker(address, lost):
+    # Take a task and disappear without result
+    connection = Client(address, authkey=AUTHKEY)
+    connection.recv()
+    connection.recv()
+    lost.set()
+    os._exit(0)
+
+
+def run_hanging_worker(address, lost):
+    # Take a task and send heartbeats without result
+    connection = Client(address, authkey=AUTHKEY)
+    connection.recv()
+    connection.recv()
+    lost.set()
+    try:
+        while True:
+            connection.send(('heartbeat',))
+            time.sleep(0.1)
+    except OSError:
+        os._exit(0)
+
+
+def run_delayed_worker(address, lost, load_data=None):
+    lost.wait()
+    run_worker(address, AUTHKEY, 0.1, load_data=load_data)
+
+
+def load_data(data, ann, features):
+    # Data of the same config loaded by a worker
+    return data[features], ann
+
+
+class Offset:
+    def __init__(self, offset):
+        self.offset = offset
+        self.table = list(range(100))
+
+    def add(self, chunk):
+        return [value + self.offset for value in chunk]
+
+    def fail(self, chunk):
+        raise ValueError('Bad chunk')
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(8)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def get_model(self):
+        return ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 8, 'k': 2}, {'n': 8, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=feature_selectors.t_test,
+            feature_selector_kwargs={},
+            preprocessor=KBinsDiscretizer,
+            preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+            model=SVC,
+            model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.45,
+            random_state=0,
+            verbose=False,
+        )
+
+    def test_workers(self):
+        rhs = self.get_model().exhaustive_run()
+
+        model = self.get_model()
+        model.coordinator = Coordinator(('localhost', 0), AUTHKEY, task_size=7, lease_time=10)
+        model.coordinator.start(model)
+        address = model.coordinator.address
+
+        # One worker is lost with a leased task, two others process all tasks
+        lost = multiprocessing.Event()
+        worker_data = functools.partial(load_data, self.data, self.ann)
+        workers = [multiprocessing.Process(target=run_lost_worker, args=(address, lost))] + [
+            multiprocessing.Process(target=run_delayed_worker, args=(address, lost, worker_data))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            lhs = model.exhaustive_run()
+        finally:
+            model.coordinator.close()
+        for worker in workers:
+            worker.join(10)
+
+        self.assertTrue(lhs.sort_index().equals(rhs.sort_index()))
+        self.assertEqual(model.coordinator.queue.n_retries, 1)
+        # Data is not sent to workers
+        self.assertEqual(pickle.loads(model.coordinator.state_bytes['df']), (None, self.data.columns.to_list()))
+        self.assertTrue(pickle.loads(model.coordinator.state_bytes['ann']).equals(self.ann.index))
+        self.assertTrue(all(worker.exitcode == 0 for worker in workers))
+
+    def test_coordinator(self):
+        model = Offset(1)
+        coordinator = Coordinator(('localhost', 0), AUTHKEY, task_size=2, lease_time=10, task_timeout=1)
+        coordinator.start(model)
+
+        # Hanging worker holds its task until task timeout
+        lost = multiprocessing.Event()
+        workers = [multiprocessing.Process(target=run_hanging_worker, args=(coordinator.address, lost))] + [
+            multiprocessing.Process(target=run_delayed_worker, args=(coordinator.address, lost))
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self.assertEqual(coordinator.map('add', [0, 1, 2]), [[1, 2], [3]])
+            # Workers get the current state of the model, only changed attributes are resent
+            model.offset = 10
+            self.assertEqual(coordinator.map('add', [0, 1, 2]), [[10, 11], [12]])
+            self.assertEqual(list(coordinator.get_changed_state(1)), ['offset'])
+        finally:
+            coordinator.close()
+        for worker in workers:
+            worker.join(10)
+
+        self.assertEqual(coordinator.queue.n_retries, 1)
+
+    def test_task_descriptors(self):
+        features = [f'feature_{i}' for i in range(8)]
+        index = {feature: i for i, feature in enumerate(features)}
+
+        # Consecutive combinations are sent as ranges of ranks
+        feature_subsets = list(itertools.combinations(features, 3))
+        descriptor = encode_feature_subsets(feature_subsets[10:40], index)
+        self.assertEqual(descriptor, ('ranks', 8, 3, [(10, 40)]))
+        self.assertEqual(decode_feature_subsets(descriptor, features), feature_subsets[10:40])
+        descriptor = encode_feature_subsets(feature_subsets[:10] + feature_subsets[20:30], index)
+        self.assertEqual(descriptor[3], [(0, 10), (20, 30)])
+
+        # Other subsets are sent as indices of features
+        feature_subsets = random.sample(feature_subsets, 10) + [('feature_3', 'feature_1', 'feature_2')]
+        descriptor = encode_feature_subsets(feature_subsets, index)
+        self.assertEqual(descriptor[0], 'indices')
+        self.assertEqual(decode_feature_subsets(descriptor, features), feature_subsets)
+
+        self.assertEqual(encode_feature_subsets([0, 1], index), ('items', [0, 1]))
+
+    def test_failures(self):
+        coordinator = Coordinator(('localhost', 0), AUTHKEY, task_size=2, lease_time=10, max_retries=1)
+        coordinator.start(Offset(1))
+
+        # Error of a task is raised by map, worker keeps processing tasks
+        ready = multiprocessing.Event()
+        ready.set()
+        worker = multiprocessing.Process(target=run_delayed_worker, args=(coordinator.address, ready))
+        worker.start()
+        try:
+            with self.assertRaisesRegex(TaskError, 'Bad chunk'):
+                coordinator.map('fail', [0, 1, 2])
+            self.assertEqual(coordinator.map('add', [0, 1, 2]), [[1, 2], [3]])
+        finally:
+            coordinator.close()
+        worker.join(10)
+        self.assertEqual(worker.exitcode, 0)
+
+        # Task lost by more than max_retries workers
+        coordinator = Coordinator(('localhost', 0), AUTHKEY, lease_time=10, max_retries=1)
+        coordinator.start(Offset(1))
+        workers = [
+            multiprocessing.Process(target=run_lost_worker, args=(coordinator.address, multiprocessing.Event()))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            with self.assertRaisesRegex(TaskError, 'lost by 2 workers'):
+                coordinator.map('add', [0])
+        finally:
+            coordinator.close()
+        for worker in workers:
+            worker.join(10)
+
+        # No workers are connected
+        coordinator = Coordinator(('localhost', 0), AUTHKEY, worker_timeout=0.2)
+        coordinator.start(Offset(1))
+        try:
+            with self.assertRaises(TimeoutError):
+                coordinator.map('add', [0])
+        finally:
+            coordinator.close()
+
+    def test_authkey(self):
+        # Random key is generated for a loopback address only
+        self.assertEqual(len(Coordinator(('localhost', 0)).authkey), 32)
+        self.assertNotEqual(Coordinator(('localhost', 0)).authkey, Coordinator(('localhost', 0)).authkey)
+        with self.assertRaises(ValueError):
+            Coordinator(('0.0.0.0', 0))
+        with self.assertRaises(ValueError):
+            run_worker(('localhost', 0), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
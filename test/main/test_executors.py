@@ -0,0 +1,141 @@
+import random
+import tempfile
+import unittest
+import pandas as pd
+from unittest import mock
+from threadpoolctl import threadpool_info
+
+from src.core import accuracy_scores
+from src.core.executors import EXECUTORS
+from src.core.utils import get_available_cores
+from src.core.preprocessors import *
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+from src.core.base import SearchOptions, ExecutionOptions
+
+
+class TestExecutors(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(6)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def get_model(self, **kwargs):
+        return ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 2}, {'n': 6, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=KBinsDiscretizer,
+            preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+            model_cv_ranges={'C': [0.0625, 1.0, 16.0]},
+            model_cv_folds=3,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.45,
+            search=SearchOptions(cv_early_stopping=True),
+            random_state=0,
+            verbose=False,
+            **{
+                'model': SVC,
+                'model_kwargs': {'kernel': 'linear', 'class_weight': 'balanced'},
+                **kwargs,
+            },
+        )
+
+    def test_same_results(self):
+        rhs_model = self.get_model()
+        rhs = rhs_model.exhaustive_run()
+
+        for executor in EXECUTORS:
+            model = self.get_model(n_processes=3, execution=ExecutionOptions(executor=executor))
+            lhs = model.exhaustive_run()
+
+            self.assertTrue(lhs.equals(rhs), executor)
+            self.assertEqual(model.n_k_stats, rhs_model.n_k_stats, executor)
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            self.get_model(n_processes=3, execution=ExecutionOptions(executor='mpi'))
+
+    def test_threads_per_process(self):
+        rhs = self.get_model().exhaustive_run()
+
+        model = self.get_model(n_processes=2, execution=ExecutionOptions(threads_per_process=1))
+        lhs = model.exhaustive_run()
+        self.assertTrue(lhs.equals(rhs))
+
+        with model.limit_threads():
+            self.assertTrue(all(pool['num_threads'] == 1 for pool in threadpool_info()))
+
+    def test_model_threads(self):
+        model = self.get_model(execution=ExecutionOptions(threads_per_process=2))
+        self.assertNotIn('n_jobs', model.model_kwargs)
+
+        model = self.get_model(
+            execution=ExecutionOptions(threads_per_process=2), model=RandomForestClassifier, model_kwargs={},
+        )
+        self.assertEqual(model.model_kwargs['n_jobs'], 2)
+
+        # Explicit number of model threads is kept
+        model = self.get_model(
+            execution=ExecutionOptions(threads_per_process=2), model=RandomForestClassifier, model_kwargs={'n_jobs': 1},
+        )
+        self.assertEqual(model.model_kwargs['n_jobs'], 1)
+
+    def test_auto_thread_budget(self):
+        rhs = self.get_model().exhaustive_run()
+
+        model = self.get_model(execution=ExecutionOptions(threads_per_process='auto'))
+        lhs = model.exhaustive_run()
+
+        self.assertTrue(lhs.equals(rhs))
+        self.assertEqual(model.n_processes * model.threads_per_process, get_available_cores())
+
+    def test_auto_n_processes(self):
+        rhs = self.get_model().exhaustive_run()
+
+        model = self.get_model(n_processes='auto')
+        with mock.patch('src.core.base.execution.get_available_cores', return_value=4):
+            lhs = model.exhaustive_run()
+        self.assertTrue(lhs.equals(rhs))
+
+        benchmark = pd.read_csv(f'{self.tmp_dir}/process_benchmark.csv')
+        self.assertEqual(benchmark['n_processes'].iloc[0], 1)
+        self.assertTrue(set(benchmark['n_processes']) <= {1, 2, 4})
+        chosen = benchmark[benchmark['chosen']]
+        self.assertEqual(len(chosen), 1)
+        self.assertEqual(
+            (chosen['n_processes'].iloc[0], chosen['chunks_per_process'].iloc[0]),
+            (model.n_processes, model.chunks_per_process),
+        )
+
+        with self.assertRaises(ValueError):
+            self.get_model(n_processes=0)
+
+    def test_chunks_per_process(self):
+        model = self.get_model(n_processes=2)
+        model.chunks_per_process = 2
+        process_args = model.get_process_args(list(range(10)))
+        self.assertEqual(len(process_args), 4)
+        self.assertEqual(sum(process_args, []), list(range(10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
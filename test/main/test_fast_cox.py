@@ -0,0 +1,116 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+import itertools
+import numpy as np
+import pandas as pd
+
+from src.core.regression.regressors import CoxRegression, FastCoxRegression
+from src.core.regression.regression import ExhaustiveRegression
+
+
+class TestFastCox(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(10)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Event': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Time to event': [(i + 1) * 10000 / self.n_samples for i in range(self.n_samples)],
+        })
+
+    def assert_same_fit(self, x, y, **kwargs):
+        lhs = FastCoxRegression(**kwargs).fit(x, y)
+        rhs = CoxRegression(**kwargs).fit(x, y)
+
+        self.assertTrue(np.allclose(lhs.coefs.to_numpy(), rhs.coefs.to_numpy(), atol=1e-6))
+        self.assertTrue(np.allclose(lhs.predict(x).to_numpy(), rhs.predict(x).to_numpy(), rtol=1e-6))
+        self.assertTrue(np.isclose(lhs.log_likelihood_, rhs.log_likelihood_))
+
+    def test_same_as_lifelines(self):
+        for features_subset in itertools.combinations(self.data.columns[:5], 2):
+            self.assert_same_fit(self.data[list(features_subset)], self.ann)
+
+    def test_same_as_lifelines_with_ties(self):
+        ann = self.ann.copy()
+        ann['Time to event'] = (ann['Time to event'] // 1000) * 1000
+        self.assert_same_fit(self.data.iloc[:, :4], ann)
+
+    def test_same_as_lifelines_with_penalizer(self):
+        for l1_ratio in [0.0, 0.5]:
+            self.assert_same_fit(self.data.iloc[:, :4], self.ann, penalizer=0.1, l1_ratio=l1_ratio)
+
+    def test_numpy_input(self):
+        x = self.data.iloc[:, :3]
+        lhs = FastCoxRegression().fit(x.to_numpy(), self.ann[['Event', 'Time to event']].to_numpy())
+        rhs = FastCoxRegression().fit(x, self.ann)
+
+        self.assertTrue(np.allclose(lhs.coefs.to_numpy(), rhs.coefs.to_numpy()))
+        self.assertTrue(np.allclose(lhs.predict(x.to_numpy()), rhs.predict(x).to_numpy()))
+
+    def test_batch(self):
+        feature_subsets = [list(features_subset) for features_subset in itertools.combinations(self.data.columns, 3)]
+        x = np.stack([self.data[features_subset].to_numpy() for features_subset in feature_subsets])
+        models, risk_scores = FastCoxRegression.fit_batch(x, self.ann, feature_names=feature_subsets, penalizer=0.01)
+
+        for features_subset, model, model_risk_scores in zip(feature_subsets, models, risk_scores):
+            rhs = FastCoxRegression(penalizer=0.01).fit(self.data[features_subset], self.ann)
+
+            self.assertTrue(np.allclose(model.coefs.to_numpy(), rhs.coefs.to_numpy()))
+            self.assertTrue(np.allclose(model_risk_scores, self.data[features_subset].to_numpy().dot(rhs.coefs.to_numpy())))
+
+    def test_degenerate_subsets(self):
+        # Constant and collinear features
+        data = self.data.iloc[:, :4].copy()
+        data['constant'] = 1.0
+        data['collinear'] = 2 * data['feature_0']
+        ann = self.ann.assign(**{'Dataset': 'Testing', 'Dataset type': 'Training'})
+        model = ExhaustiveRegression(
+            df=data,
+            ann=ann,
+            n_k=pd.DataFrame([{'n': 6, 'k': 2}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=FastCoxRegression,
+            model_kwargs={},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={},
+            main_scoring_function=None,
+            main_scoring_threshold=0.0,
+            random_state=0,
+            verbose=False,
+        )
+        feature_subsets = [list(features_subset) for features_subset in itertools.combinations(data.columns, 2)]
+        degenerate = [
+            features_subset for features_subset in feature_subsets
+            if 'constant' in features_subset or features_subset == ['feature_0', 'collinear']
+        ]
+
+        lhs = {tuple(features_subset): m for features_subset, m, _ in model.fit_models(feature_subsets)}
+        self.assertEqual(len(lhs), len(feature_subsets) - len(degenerate))
+
+        # Batch failing as a whole is fitted subset by subset
+        with mock.patch.object(FastCoxRegression, 'fit_batch', side_effect=np.linalg.LinAlgError):
+            rhs = {tuple(features_subset): m for features_subset, m, _ in model.fit_models(feature_subsets)}
+        self.assertEqual(list(lhs), list(rhs))
+        for features_subset in lhs:
+            self.assertTrue(np.allclose(lhs[features_subset].coefs.to_numpy(), rhs[features_subset].coefs.to_numpy()))
+
+
+if __name__ == '__main__':
+    unittest.main()
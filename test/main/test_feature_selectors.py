@@ -0,0 +1,133 @@
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+
+from src.core import feature_selectors, streaming_feature_selectors
+from src.core.base import FeatureSelector
+from src.core.classification.feature_selectors import spearman_pvalues
+
+
+class TestSpearmanCorrelation(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(50)
+        })
+        # Ties, constant column and NaN values
+        self.data['feature_1'] = self.data['feature_1'].round(1)
+        self.data['feature_2'] = 1.0
+        self.data.loc[3, 'feature_3'] = np.nan
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def test_same_as_scipy(self):
+        X = self.data.to_numpy()
+        y = self.ann['Class'].to_numpy()
+
+        lhs = spearman_pvalues(X, y)
+        rhs = np.array([spearmanr(X[:, j], y).pvalue for j in range(X.shape[1])])
+
+        self.assertTrue(np.allclose(lhs, rhs, rtol=1e-9, equal_nan=True))
+
+    def test_selected_features(self):
+        X = self.data.drop(columns=['feature_2', 'feature_3']).to_numpy()
+        y = self.ann['Class'].to_numpy()
+        pvalues = [spearmanr(X[:, j], y).pvalue for j in range(X.shape[1])]
+        features = self.data.columns.drop(['feature_2', 'feature_3'])
+        rhs = [feature for feature, pvalue in sorted(zip(features, pvalues), key=lambda x: x[1])][:10]
+
+        lhs = feature_selectors.spearman_correlation(
+            self.data.drop(columns=['feature_2', 'feature_3']),
+            self.ann,
+            10,
+        )
+
+        self.assertEqual(lhs, rhs)
+
+
+class TestStreamingFeatureSelectors(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        random.seed(0)
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(60)]
+            for feature_index in range(30)
+        })
+        self.data.index = [f'sample_{i}' for i in range(60)]
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(60)],
+            'Dataset': [random.choice(['A', 'B', 'C']) for _ in range(60)],
+            'Dataset type': 'Training',
+        })
+        self.ann.index = self.data.index
+        self.data_path = f'{self.tmp_dir}/data.csv'
+        self.data.to_csv(self.data_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_same_as_in_memory(self):
+        for selector in ['t_test', 'f_test', 'spearman_correlation']:
+            for datasets in [None, ['A', 'B']]:
+                lhs = getattr(streaming_feature_selectors, selector)(
+                    self.data_path, self.ann, 10, datasets=datasets, chunksize=7,
+                )
+                rhs = getattr(feature_selectors, selector)(self.data, self.ann, 10, datasets=datasets)
+
+                self.assertEqual(lhs, rhs)
+
+    def test_spearman_single_pass(self):
+        # Data table is parsed once regardless of the number of feature chunks
+        with mock.patch('pandas.read_csv', wraps=pd.read_csv) as read_csv:
+            streaming_feature_selectors.spearman_correlation(self.data_path, self.ann, 10, chunksize=7)
+        full_reads = [call for call in read_csv.call_args_list if 'nrows' not in call.kwargs]
+        self.assertEqual(len(full_reads), 1)
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.cache_dir = tempfile.mkdtemp()
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(20)]
+            for feature_index in range(10)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(20)],
+            'Dataset': 'Testing',
+            'Dataset type': 'Training',
+        })
+        self.n_calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def selector(self, df, ann, n):
+        self.n_calls += 1
+        return feature_selectors.t_test(df, ann, n)
+
+    def test_cache(self):
+        lhs = FeatureSelector(self.data, self.ann, self.cache_dir, self.selector, {}, cache_dir=self.cache_dir)
+        rhs = FeatureSelector(self.data, self.ann, self.cache_dir, self.selector, {}, cache_dir=self.cache_dir)
+
+        self.assertEqual(self.n_calls, 1)
+        self.assertEqual(lhs.sorted_features, rhs.sorted_features)
+        self.assertEqual(rhs.sorted_features, feature_selectors.t_test(self.data, self.ann, 10))
+
+        self.data.iloc[0, 0] += 1
+        FeatureSelector(self.data, self.ann, self.cache_dir, self.selector, {}, cache_dir=self.cache_dir)
+        self.assertEqual(self.n_calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
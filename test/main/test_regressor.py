@@ -1,5 +1,6 @@
 import os
 import random
+import tempfile
 import unittest
 import pandas as pd
 
@@ -8,14 +9,16 @@ from src.core.preprocessors import *
 from src.core.regression.regressors import *
 from src.core.regression.regression import ExhaustiveRegression
 
-random.seed(0)
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TMP_DIR = f'{BASE_DIR}/tmp'
 
 
 class TestRegressor(unittest.TestCase):
     def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
         self.n_samples = 100
         self.data = pd.DataFrame.from_dict({
             f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
@@ -40,7 +43,7 @@ class TestRegressor(unittest.TestCase):
             df=self.data,
             ann=self.ann,
             n_k=self.n_k_grid,
-            output_dir=TMP_DIR,
+            output_dir=self.tmp_dir,
             feature_pre_selector=None,
             feature_pre_selector_kwargs={},
             feature_selector=feature_selectors.cox_concordance,
@@ -69,6 +72,4 @@ class TestRegressor(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    if not os.path.isdir(TMP_DIR):
-        os.makedirs(TMP_DIR)
     unittest.main()
@@ -0,0 +1,227 @@
+import random
+import tempfile
+import unittest
+import itertools
+import numpy as np
+import pandas as pd
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.preprocessors import *
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+from src.core.base import SearchOptions, PruningOptions, TimeBudgetOptions
+
+
+class TestSearchSpace(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(8)
+        })
+        # Exact duplicate and duplicate after discretization
+        self.data['feature_1'] = self.data['feature_0']
+        self.data['feature_3'] = 2 * self.data['feature_2'] + 1
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def get_model(self, **kwargs):
+        return ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 8, 'k': 2}, {'n': 8, 'k': 3}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=KBinsDiscretizer,
+            preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+            model=SVC,
+            model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            random_state=0,
+            verbose=False,
+            **{'main_scoring_threshold': 0.0, **kwargs},
+        )
+
+    def test_collapse_duplicate_features(self):
+        model = self.get_model(pruning=PruningOptions(collapse_duplicate_features=True))
+        lhs = model.exhaustive_run()
+        rhs = self.get_model().exhaustive_run()
+
+        self.assertEqual(
+            model.get_duplicate_features(model.select_features(8))['feature_2'],
+            ['feature_2', 'feature_3'],
+        )
+
+        # Subsets with two duplicates are not evaluated
+        duplicates = [{'feature_0', 'feature_1'}, {'feature_2', 'feature_3'}]
+        expected = [
+            features_subset for features_subset in rhs.index
+            if not any(pair <= set(features_subset.split(';')) for pair in duplicates)
+        ]
+        self.assertEqual(sorted(lhs.index), sorted(expected))
+        self.assertTrue(np.allclose(
+            lhs.loc[expected].to_numpy(dtype=float),
+            rhs.loc[expected].to_numpy(dtype=float),
+        ))
+        self.assertEqual(model.n_k_stats[(8, 2)]['num_evaluated_subsets'], 15)
+        self.assertEqual(model.n_k_stats[(8, 2)]['num_subsets'], 26)
+
+    def test_correlation_pruning(self):
+        self.data['feature_5'] = self.data['feature_4'] + 0.01 * self.data['feature_6']
+        model = self.get_model(pruning=PruningOptions(correlation_threshold=0.9))
+        lhs = model.exhaustive_run()
+        rhs = self.get_model().exhaustive_run()
+
+        clusters = model.get_correlation_clusters(model.select_features(8))
+        self.assertIn(['feature_0', 'feature_1'], clusters)
+        self.assertIn(['feature_4', 'feature_5'], clusters)
+        self.assertEqual(len(clusters), 5)
+
+        # Pruned subsets are a subset of all subsets with the same scores
+        self.assertEqual(model.n_k_stats[(8, 2)]['num_pruned_subsets'], 3)
+        self.assertTrue(set(lhs.index) <= set(rhs.index))
+        self.assertTrue(np.allclose(
+            lhs.to_numpy(dtype=float),
+            rhs.loc[lhs.index].to_numpy(dtype=float),
+        ))
+
+    def test_successive_halving(self):
+        model = self.get_model(search=SearchOptions(halving_fraction=0.25))
+        lhs = model.exhaustive_run()
+        rhs = self.get_model().exhaustive_run()
+
+        self.assertEqual(model.n_k_stats[(8, 2)], {'num_stage_1_subsets': 28, 'num_stage_2_subsets': 7})
+        self.assertEqual(len(lhs), 7 + 14)
+        self.assertTrue(np.allclose(
+            lhs.to_numpy(dtype=float),
+            rhs.loc[lhs.index].to_numpy(dtype=float),
+        ))
+
+        model = self.get_model(search=SearchOptions(halving_margin=0.0), main_scoring_threshold=2.0)
+        self.assertTrue(model.exhaustive_run().empty)
+
+    def test_beam_search(self):
+        model = self.get_model(search=SearchOptions(mode='beam', beam_width=2))
+        lhs = model.exhaustive_run()
+        rhs = self.get_model().exhaustive_run()
+
+        # Results for k = 1 are computed, but not reported
+        self.assertEqual(sorted(model.search_scores), [(8, 1), (8, 2), (8, 3)])
+        self.assertEqual(set(lhs['k']), {2, 3})
+        evaluated = pd.read_csv(f'{self.tmp_dir}/evaluated_subsets.csv')
+        self.assertEqual(evaluated.groupby('k').size().to_dict(), {1: 8, 2: 13, 3: 11})
+
+        # Subsets of a previous run into the same directory are not kept
+        self.get_model(search=SearchOptions(mode='beam', beam_width=2)).exhaustive_run()
+        pd.testing.assert_frame_equal(pd.read_csv(f'{self.tmp_dir}/evaluated_subsets.csv'), evaluated)
+
+        best_pairs = sorted(model.search_scores[(8, 2)], key=lambda pair: -model.search_scores[(8, 2)][pair])[:2]
+        for features_subset in lhs.query('k == 3').index:
+            self.assertTrue(any(set(pair.split(';')) <= set(features_subset.split(';')) for pair in best_pairs))
+
+        self.assertTrue(np.allclose(
+            lhs.to_numpy(dtype=float),
+            rhs.loc[lhs.index].to_numpy(dtype=float),
+        ))
+
+    def test_cv_early_stopping(self):
+        lhs, rhs = self.get_model(search=SearchOptions(cv_early_stopping=True)), self.get_model()
+        for model in [lhs, rhs]:
+            model.model_cv_ranges = {'C': [0.0625, 1.0, 16.0]}
+            model.model_cv_folds = 5
+
+        lhs_results = lhs.exhaustive_run()
+        self.assertTrue(lhs_results.equals(rhs.exhaustive_run()))
+        self.assertEqual(lhs.n_k_stats[(8, 2)]['num_cv_fits'] + lhs.n_k_stats[(8, 2)]['num_cv_fits_saved'], 28 * 3 * 5)
+
+    def test_limit_feature_subsets(self):
+        model = self.get_model(limit_feature_subsets=True, n_feature_subsets=20)
+        features = model.select_features(8)
+        feature_subsets = model.get_feature_subsets(8, 3)
+
+        # Distinct canonical subsets in the order of enumeration
+        all_subsets = list(itertools.combinations(features, 3))
+        self.assertEqual(len(set(feature_subsets)), 20)
+        self.assertEqual(feature_subsets, [s for s in all_subsets if s in set(feature_subsets)])
+
+        # Reproducible and independent of the order of (n, k) pairs
+        model.get_feature_subsets(8, 2)
+        self.assertEqual(model.get_feature_subsets(8, 3), feature_subsets)
+        model.random_state = 1
+        self.assertNotEqual(model.get_feature_subsets(8, 3), feature_subsets)
+
+        # Independent of n_processes
+        lhs = self.get_model(limit_feature_subsets=True, n_feature_subsets=20).exhaustive_run()
+        rhs = self.get_model(limit_feature_subsets=True, n_feature_subsets=20, n_processes=2).exhaustive_run()
+        self.assertTrue(lhs.equals(rhs))
+        self.assertEqual(len(lhs.query('k == 3')), 20)
+
+        # All subsets if there are not more than n_feature_subsets
+        model = self.get_model(limit_feature_subsets=True, n_feature_subsets=100)
+        self.assertEqual(model.get_feature_subsets(8, 3), all_subsets)
+
+        # The first subsets without shuffling
+        model = self.get_model(limit_feature_subsets=True, n_feature_subsets=5, shuffle_feature_subsets=False)
+        self.assertEqual(model.get_feature_subsets(8, 3), all_subsets[:5])
+
+        # Distinct subsets with pruning of correlated features
+        model = self.get_model(
+            limit_feature_subsets=True, n_feature_subsets=1000,
+            pruning=PruningOptions(correlation_threshold=0.99),
+        )
+        pruned_subsets = self.get_model(pruning=PruningOptions(correlation_threshold=0.99)).get_feature_subsets(8, 3)
+        self.assertEqual(model.get_feature_subsets(8, 3), pruned_subsets)
+
+        # Pruned subsets are sampled by ranks in the order of enumeration
+        model = self.get_model(
+            limit_feature_subsets=True, n_feature_subsets=10,
+            pruning=PruningOptions(correlation_threshold=0.99),
+        )
+        feature_subsets = model.get_feature_subsets(8, 3)
+        self.assertEqual(len(set(feature_subsets)), 10)
+        self.assertEqual(feature_subsets, [s for s in pruned_subsets if s in feature_subsets])
+        model.shuffle_feature_subsets = False
+        self.assertEqual(model.get_feature_subsets(8, 3), pruned_subsets[:10])
+
+    def test_time_budget(self):
+        rhs = self.get_model().exhaustive_run()
+
+        # Budget sufficient for the whole grid
+        model = self.get_model(time_budget=TimeBudgetOptions(hours=1.0))
+        lhs = model.exhaustive_run()
+        self.assertTrue(lhs.equals(rhs))
+        summary = pd.read_csv(f'{self.tmp_dir}/summary_n_k.csv')
+        self.assertEqual(summary['coverage'].to_list(), [1.0, 1.0])
+
+        # Deadline is reached before the grid: partial (here empty) results are saved
+        model = self.get_model(time_budget=TimeBudgetOptions(hours=1e-9))
+        lhs = model.exhaustive_run()
+        self.assertTrue(lhs.empty)
+        summary = pd.read_csv(f'{self.tmp_dir}/summary_n_k.csv')
+        self.assertEqual(summary['coverage'].to_list(), [0.0, 0.0])
+
+        # Best ranked features come first
+        feature_subsets = model.prioritize_feature_subsets(model.get_feature_subsets(8, 2))
+        self.assertEqual(feature_subsets[:2], [('feature_0', 'feature_1'), ('feature_0', 'feature_2')])
+        self.assertEqual(feature_subsets[-1], ('feature_6', 'feature_7'))
+
+        with self.assertRaises(ValueError):
+            self.get_model(time_budget=TimeBudgetOptions(hours=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+
+from src import merge_shards, build_classifiers
+from src.core import accuracy_scores, feature_selectors
+from src.core.preprocessors import *
+from src.core.classification.classifiers import *
+from src.core.classification.classification import ExhaustiveClassification
+from src.core.base import PruningOptions, TimeBudgetOptions, ExecutionOptions
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(8)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Class': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [random.choice(['Training', 'Filtration', 'Validation']) for _ in range(self.n_samples)],
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_pipeline(self, output_dir, shard=None, **kwargs):
+        os.makedirs(output_dir)
+        model = ExhaustiveClassification(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 8, 'k': 2}, {'n': 6, 'k': 1}, {'n': 8, 'k': 3}]),
+            output_dir=output_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=feature_selectors.t_test,
+            feature_selector_kwargs={},
+            preprocessor=KBinsDiscretizer,
+            preprocessor_kwargs={'n_bins': 2, 'encode': 'ordinal'},
+            model=SVC,
+            model_kwargs={'kernel': 'linear', 'class_weight': 'balanced'},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions={s: getattr(accuracy_scores, s) for s in ['TPR', 'TNR', 'min_TPR_TNR']},
+            main_scoring_function='min_TPR_TNR',
+            main_scoring_threshold=0.45,
+            random_state=0,
+            verbose=False,
+            execution=ExecutionOptions(shard=shard),
+            **kwargs,
+        )
+
+        return model.exhaustive_run()
+
+    def test_merge(self):
+        res = self.run_pipeline(f'{self.tmp_dir}/full')
+        shard_dirs = [f'{self.tmp_dir}/shard_{i}' for i in range(1, 4)]
+        for i, shard_dir in enumerate(shard_dirs):
+            self.run_pipeline(shard_dir, shard=(i + 1, 3))
+        merge_shards.main('classifiers', shard_dirs[::-1], f'{self.tmp_dir}/merged')
+
+        for name in ['models', 'summary_n_k']:
+            with open(f'{self.tmp_dir}/full/{name}.csv') as lhs, open(f'{self.tmp_dir}/merged/{name}.csv') as rhs:
+                self.assertEqual(lhs.read(), rhs.read())
+
+        summary_features = pd.read_csv(f'{self.tmp_dir}/merged/summary_features.csv', index_col=0)
+        for feature, percentage in summary_features['percentage_classifiers'].items():
+            self.assertAlmostEqual(percentage, sum(feature in index.split(';') for index in res.index) * 100 / len(res))
+
+    def test_merge_stats(self):
+        self.data['feature_1'] = self.data['feature_0']
+        kwargs = {'pruning': PruningOptions(correlation_threshold=0.99), 'time_budget': TimeBudgetOptions(hours=1)}
+
+        self.run_pipeline(f'{self.tmp_dir}/full', **kwargs)
+        shard_dirs = [f'{self.tmp_dir}/shard_{i}' for i in range(1, 4)]
+        for i, shard_dir in enumerate(shard_dirs):
+            self.run_pipeline(shard_dir, shard=(i + 1, 3), **kwargs)
+        merge_shards.main('classifiers', shard_dirs, f'{self.tmp_dir}/merged')
+
+        lhs = pd.read_csv(f'{self.tmp_dir}/full/summary_n_k.csv')
+        rhs = pd.read_csv(f'{self.tmp_dir}/merged/summary_n_k.csv')
+        self.assertEqual(lhs['num_pruned_subsets'].to_list(), [1, 0, 6])
+        self.assertEqual(rhs['coverage'].to_list(), [1.0, 1.0, 1.0])
+        pd.testing.assert_frame_equal(lhs, rhs, check_dtype=False)
+
+        # Columns without merge rule are not merged silently
+        path = f'{shard_dirs[0]}/summary_n_k_shard_1_of_3.csv'
+        pd.read_csv(path).assign(num_unknown=1).to_csv(path, index=None)
+        with self.assertRaises(ValueError):
+            merge_shards.main('classifiers', shard_dirs, f'{self.tmp_dir}/merged')
+
+    def test_entry_point(self):
+        self.data.to_csv(f'{self.tmp_dir}/data.csv')
+        self.ann.to_csv(f'{self.tmp_dir}/annotation.csv')
+        pd.DataFrame([{'n': 8, 'k': 2}]).to_csv(f'{self.tmp_dir}/n_k.csv', index=None)
+        with open(f'{self.tmp_dir}/config.json', 'w') as f:
+            json.dump({
+                'data_path': 'data.csv',
+                'annotation_path': 'annotation.csv',
+                'n_k_path': 'n_k.csv',
+                'output_dir': 'output',
+                'feature_selector': 't_test',
+                'preprocessor': 'KBinsDiscretizer',
+                'preprocessor_kwargs': {'n_bins': 2, 'encode': 'ordinal'},
+                'model': 'SVC',
+                'model_kwargs': {'kernel': 'linear', 'class_weight': 'balanced'},
+                'scoring_functions': ['TPR', 'TNR', 'min_TPR_TNR'],
+                'main_scoring_function': 'min_TPR_TNR',
+                'main_scoring_threshold': 0.0,
+                'random_state': 0,
+                'verbose': False,
+            }, f)
+
+        # Shard run returns its models like a regular run
+        res = build_classifiers.main(f'{self.tmp_dir}/config.json', shard=(1, 3))
+        self.assertIsInstance(res, pd.DataFrame)
+        self.assertGreater(len(res), 0)
+
+    def test_shard_set(self):
+        def make_shards(shard_dir, shards):
+            os.makedirs(shard_dir, exist_ok=True)
+            for i, n_shards in shards:
+                open(f'{shard_dir}/models_shard_{i}_of_{n_shards}.csv', 'w').close()
+            return shard_dir
+
+        lhs = make_shards(f'{self.tmp_dir}/lhs', [(2, 3), (10, 3)])
+        rhs = make_shards(f'{self.tmp_dir}/rhs', [(1, 3), (3, 3)])
+        cases = {
+            'missing': ([make_shards(f'{self.tmp_dir}/missing', [(1, 3), (3, 3)])], 'shards 2 of 3 are missing'),
+            'duplicate': ([rhs, make_shards(f'{self.tmp_dir}/duplicate', [(1, 3), (2, 3)])], 'more than once'),
+            'mixed': ([rhs, make_shards(f'{self.tmp_dir}/mixed', [(2, 4)])], 'different numbers of shards'),
+            'invalid': ([lhs, rhs], 'Invalid shard numbers'),
+            'none': ([f'{self.tmp_dir}/none'], 'No shard'),
+        }
+        for case, (shard_dirs, message) in cases.items():
+            with self.subTest(case), self.assertRaisesRegex(ValueError, message):
+                merge_shards.find_shard_files(shard_dirs, 'models')
+
+        # Shards are sorted by number across directories
+        second = make_shards(f'{self.tmp_dir}/second', [(2, 3)])
+        self.assertEqual(
+            merge_shards.find_shard_files([rhs, second], 'models'),
+            [f'{rhs}/models_shard_1_of_3.csv', f'{second}/models_shard_2_of_3.csv', f'{rhs}/models_shard_3_of_3.csv'],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import random
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from src.core import accuracy_scores, feature_selectors
+from src.core.regression.regressors import *
+from src.core.regression.regression import ExhaustiveRegression
+
+
+class TestSurvivalCV(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 100
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(10)
+        })
+        self.ann = pd.DataFrame.from_dict({
+            'Event': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Time to event': [(i + 1) * 10000 / self.n_samples for i in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': [
+                'Validation' if i % 3 == 0 else 'Training' if i % 2 == 0 else 'Filtration'
+                for i in range(self.n_samples)
+            ],
+        })
+
+        self.model = ExhaustiveRegression(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 5, 'k': 2}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=FastCoxRegression,
+            model_kwargs={},
+            model_cv_ranges={'penalizer': [0.001, 0.1, 10.0]},
+            model_cv_folds=3,
+            scoring_functions={
+                s: getattr(accuracy_scores, s)
+                for s in ['concordance_index', 'hazard_ratio']
+            },
+            main_scoring_function='concordance_index',
+            main_scoring_threshold=0.3,
+            random_state=0,
+        )
+
+    def test_folds(self):
+        y_train = self.model.y_train
+        splits = self.model.get_cv_splits(y_train, 3)
+
+        self.assertIs(splits, self.model.get_cv_splits(y_train, 3))
+        for train_indices, test_indices in splits:
+            self.assertLessEqual(
+                abs(y_train['Event'].iloc[test_indices].sum() - y_train['Event'].sum() / 3),
+                1,
+            )
+
+    def test_best_params(self):
+        features_subset = ['feature_0', 'feature_1']
+        model, best_params = self.model.fit_model(features_subset)
+
+        X_train = self.data.loc[self.ann['Dataset type'] == 'Training', features_subset]
+        y_train = self.model.y_train
+        mean_scores = [
+            np.mean([
+                self.model.score_cv_fold(
+                    X_train, y_train, train_indices, test_indices,
+                    {'penalizer': penalizer}, accuracy_scores.concordance_index,
+                )
+                for train_indices, test_indices in self.model.get_cv_splits(y_train, 3)
+            ])
+            for penalizer in [0.001, 0.1, 10.0]
+        ]
+
+        self.assertEqual(best_params, {'penalizer': [0.001, 0.1, 10.0][np.argmax(mean_scores)]})
+        self.assertEqual(model.penalizer, best_params['penalizer'])
+
+    def test_failed_fits(self):
+        score_cv_fold = self.model.score_cv_fold
+
+        def fail_fold(X_train, y_train, train_indices, test_indices, params, score_function):
+            # Fit with the best penalizer fails on the last fold
+            if params['penalizer'] == best_params['penalizer'] and np.array_equal(test_indices, last_fold):
+                return np.nan
+            return score_cv_fold(X_train, y_train, train_indices, test_indices, params, score_function)
+
+        features_subset = ['feature_0', 'feature_1']
+        _, best_params = self.model.fit_model(features_subset)
+        last_fold = self.model.get_cv_splits(self.model.y_train, 3)[-1][1]
+        for cv_early_stopping in [False, True]:
+            self.model.cv_early_stopping = cv_early_stopping
+            with mock.patch.object(self.model, 'score_cv_fold', side_effect=fail_fold):
+                _, params = self.model.fit_model(features_subset)
+
+            self.assertNotEqual(params, best_params)
+
+    def test_run(self):
+        res = self.model.exhaustive_run()
+
+        self.assertTrue(set(res['penalizer']) <= {0.001, 0.1, 10.0})
+
+    def test_early_stopping(self):
+        rhs = self.model.exhaustive_run()
+        self.model.cv_early_stopping = True
+        lhs = self.model.exhaustive_run()
+
+        self.assertTrue(lhs.equals(rhs))
+        self.assertGreater(self.model.n_k_stats[(5, 2)]['num_cv_fits'], 0)
+
+        self.model.main_scoring_threshold = 0.9
+        lhs = self.model.exhaustive_run()
+
+        self.assertTrue(lhs.empty)
+        self.assertEqual(self.model.n_k_stats[(5, 2)]['num_cv_stopped_subsets'], 10)
+        self.assertGreater(self.model.n_k_stats[(5, 2)]['num_cv_fits_saved'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import random
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from src.core.regression.accuracy_scores import concordance_index, dynamic_auc, hazard_ratio, logrank
+from src.core.regression.accuracy_scores.hazard_ratio import groups_hazard_ratio
+from src.core.regression.regressors import FastCoxRegression
+from src.core.regression.regression import ExhaustiveRegression
+
+
+def reference_hazard_ratio(event, time, group_indicators):
+    # Loop over event times (implementation before vectorization)
+    i_a = [np.sum(group_indicators)]
+    i_b = [len(group_indicators) - i_a[0]]
+    o_a, o_b, e_a, e_b = [], [], [], []
+    for event_time in sorted(np.unique(time[event == 1])):
+        groups = group_indicators[time == event_time]
+
+        o_a.append(np.sum(groups))
+        o_b.append(len(groups) - o_a[-1])
+
+        total_dead = o_a[-1] + o_b[-1]
+        total_alive = i_a[-1] + i_b[-1]
+
+        e_a.append(i_a[-1] * total_dead / total_alive)
+        e_b.append(i_b[-1] * total_dead / total_alive)
+
+        i_a.append(i_a[-1] - o_a[-1])
+        i_b.append(i_b[-1] - o_b[-1])
+
+    return (sum(o_a) / sum(e_a)) / (sum(o_b) / sum(e_b))
+
+
+class TestSurvivalScores(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+        random.seed(0)
+        self.n_samples = 120
+        self.data = pd.DataFrame.from_dict({
+            f'feature_{feature_index}': [random.random() for _ in range(self.n_samples)]
+            for feature_index in range(3)
+        })
+        # Many tied times, censored samples share times with events
+        self.ann = pd.DataFrame.from_dict({
+            'Event': [random.randint(0, 1) for _ in range(self.n_samples)],
+            'Time to event': [random.randint(1, 12) * 365 for _ in range(self.n_samples)],
+            'Dataset': 'Testing',
+            'Dataset type': ['Training' if i % 2 == 0 else 'Validation' for i in range(self.n_samples)],
+        })
+        # Censoring distribution should not vanish (required by dynamic AUC)
+        self.ann.loc[self.ann['Time to event'] == self.ann['Time to event'].max(), 'Event'] = 1
+
+    def test_hazard_ratio_with_ties(self):
+        # Censored samples with an event time leave the risk set at this time
+        event = np.array([1, 0, 1, 1, 0, 1, 0, 1])
+        time = np.array([1, 1, 2, 2, 2, 3, 4, 5])
+        group_indicators = np.array([True, True, False, True, False, False, True, False])
+        self.assertAlmostEqual(groups_hazard_ratio(event, time, group_indicators), 75 / 68)
+        self.assertAlmostEqual(reference_hazard_ratio(event, time, group_indicators), 75 / 68)
+
+        for _ in range(20):
+            event = np.array([random.randint(0, 1) for _ in range(50)])
+            time = np.array([random.randint(1, 5) for _ in range(50)], dtype=float)
+            group_indicators = np.array([random.random() < 0.5 for _ in range(50)])
+            self.assertAlmostEqual(
+                groups_hazard_ratio(event, time, group_indicators),
+                reference_hazard_ratio(event, time, group_indicators),
+            )
+
+    def test_fused_scores(self):
+        scoring_functions = {
+            'concordance_index': concordance_index,
+            'dynamic_auc': dynamic_auc,
+            'hazard_ratio': hazard_ratio,
+            'logrank': logrank,
+        }
+        model = ExhaustiveRegression(
+            df=self.data,
+            ann=self.ann,
+            n_k=pd.DataFrame([{'n': 3, 'k': 2}]),
+            output_dir=self.tmp_dir,
+            feature_pre_selector=None,
+            feature_pre_selector_kwargs={},
+            feature_selector=None,
+            feature_selector_kwargs={},
+            preprocessor=None,
+            preprocessor_kwargs={},
+            model=FastCoxRegression,
+            model_kwargs={},
+            model_cv_ranges=[],
+            model_cv_folds=0,
+            scoring_functions=scoring_functions,
+            main_scoring_function='concordance_index',
+            main_scoring_threshold=0.0,
+            random_state=0,
+            verbose=False,
+        )
+        features_subset = ['feature_0', 'feature_1']
+        fitted_model, _ = model.fit_model(features_subset)
+
+        y_train = self.ann.loc[self.ann['Dataset type'] == 'Training', ['Event', 'Time to event']]
+        for dataset_type in ['Training', 'Validation']:
+            x = self.data.loc[self.ann['Dataset type'] == dataset_type, features_subset]
+            y = self.ann.loc[self.ann['Dataset type'] == dataset_type, ['Event', 'Time to event']]
+
+            scores = model.score_model(fitted_model, x, y)
+            y_pred = fitted_model.predict(x)
+            expected = {
+                'concordance_index': concordance_index(y, y_pred),
+                'dynamic_auc': dynamic_auc(y_train, y, y_pred),
+                'hazard_ratio': hazard_ratio(y, x, fitted_model.coefs),
+                'logrank': logrank(y, x, fitted_model.coefs),
+            }
+            for s in scoring_functions:
+                self.assertAlmostEqual(scores[s], expected[s], msg=(dataset_type, s))
+
+
+if __name__ == '__main__':
+    unittest.main()